@@ -0,0 +1,45 @@
+"""Latency of PrefixIndex.complete, the index behind the /autocomplete endpoint, for growing numbers of names.
+
+Run from the project root:
+
+    python -m benchmarks.bench_autocomplete
+"""
+import random
+import string
+import time
+
+from movie.adapters.autocomplete import PrefixIndex
+
+SIZES = (10_000, 100_000, 1_000_000)
+QUERIES = 2_000
+
+
+def random_name(rng: random.Random) -> str:
+    first = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))).capitalize()
+    last = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))).capitalize()
+    return f'{first} {last}'
+
+
+def main():
+    rng = random.Random(235)
+    print(f'{"names":>10} {"build s":>9} {"mean us":>9} {"max us":>9}   (top 10 completions of 1-3 letter prefixes)')
+    for size in SIZES:
+        index = PrefixIndex()
+        names = [random_name(rng) for _ in range(size)]
+        start = time.perf_counter()
+        for name in names:
+            index.add(name)
+        index.complete('a')
+        build = time.perf_counter() - start
+
+        timings = list()
+        for _ in range(QUERIES):
+            prefix = rng.choice(names)[:rng.randint(1, 3)]
+            start = time.perf_counter()
+            index.complete(prefix, 10)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+        print(f'{size:>10} {build:>9.2f} {sum(timings) / len(timings):>9.1f} {max(timings):>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
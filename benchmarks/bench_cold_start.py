@@ -0,0 +1,63 @@
+"""Cold start of a populated MemoryRepository from the CSV files and from a snapshot.
+
+Each start runs in a fresh interpreter, so imports and allocation are measured the way the application pays for them.
+Run from the project root:
+
+    python -m benchmarks.bench_cold_start [runs]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+DATA_PATH = os.path.join('movie', 'adapters', 'data')
+RUNS = 5
+
+START_SCRIPT = '''
+import sys
+import time
+started = time.perf_counter()
+from movie.adapters.memory_repository import MemoryRepository, populate
+imported = time.perf_counter()
+repo = MemoryRepository()
+populate(sys.argv[1], repo, sys.argv[2] if len(sys.argv) > 2 else None)
+print(imported - started, time.perf_counter() - imported, repo.get_number_of_movies())
+'''
+
+
+def start(*arguments):
+    # Returns the seconds spent importing and populating.
+    output = subprocess.run([sys.executable, '-c', START_SCRIPT, DATA_PATH, *arguments], check=True,
+                            capture_output=True, text=True).stdout
+    import_seconds, populate_seconds, movies = output.split()
+    assert int(movies) > 0
+    return float(import_seconds), float(populate_seconds)
+
+
+def median(values: list) -> float:
+    return sorted(values)[len(values) // 2]
+
+
+def report(label: str, timings: list):
+    imports = [import_seconds for import_seconds, populate_seconds in timings]
+    populates = [populate_seconds for import_seconds, populate_seconds in timings]
+    totals = [import_seconds + populate_seconds for import_seconds, populate_seconds in timings]
+    print(f'{label:<16} {median(imports) * 1000:>12.1f} {median(populates) * 1000:>14.1f} '
+          f'{median(totals) * 1000:>10.1f}')
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, 'repository.snapshot')
+        # The first start with a snapshot path builds the snapshot.
+        start(snapshot_path)
+        print(f'Snapshot size: {os.path.getsize(snapshot_path) / 2 ** 20:.1f} MiB, {runs} runs each')
+
+        print(f'{"start":<16} {"import ms":>12} {"populate ms":>14} {"total ms":>10}   (medians)')
+        report('from CSV files', [start() for _ in range(runs)])
+        report('from snapshot', [start(snapshot_path) for _ in range(runs)])
+
+
+if __name__ == '__main__':
+    main()
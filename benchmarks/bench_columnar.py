@@ -0,0 +1,77 @@
+"""Vectorised MovieColumns queries against the equivalent loops over Movie objects.
+
+Run from the project root:
+
+    python -m benchmarks.bench_columnar [movies]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from movie.adapters.columnar import MovieColumns
+from movie.domain.model import Movie
+
+MOVIES = 2_000_000
+
+
+def build(count: int):
+    rng = random.Random(235)
+    movies = list()
+    columns = MovieColumns()
+    for i in range(1, count + 1):
+        movie = Movie(f'Movie {i}', rng.randint(1950, 2020), i)
+        movie.runtime_minutes = rng.randint(80, 180)
+        movie.rating = round(rng.uniform(1, 10), 1)
+        movies.append(movie)
+        columns.append(movie)
+    return movies, columns
+
+
+def timed(label: str, function):
+    start = time.perf_counter()
+    function()
+    print(f'  {label:<40} {(time.perf_counter() - start) * 1000:>10.1f} ms')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else MOVIES
+    movies, columns = build(count)
+    print(f'{count} movies')
+
+    timed('loop: ids released 2000-2009', lambda: [m.id for m in movies if 2000 <= m.release_year <= 2009])
+    timed('columns: ids released 2000-2009', lambda: columns.movie_ids(columns.filter(release_year=(2000, 2009))))
+
+    timed('loop: mean runtime', lambda: sum(m.runtime_minutes for m in movies) / len(movies))
+    timed('columns: mean runtime', lambda: columns.stats('runtime_minutes'))
+
+    timed('loop: movies per year', lambda: _count_years(movies))
+    timed('columns: movies per year', lambda: columns.count_by('release_year'))
+
+    timed('loop: 10 longest movies', lambda: sorted(movies, key=lambda m: -m.runtime_minutes)[:10])
+    timed('columns: 10 longest movies', lambda: columns.top_movie_ids('runtime_minutes', 10))
+
+    # Leaderboards read rows presorted once per change, rather than sorting the matching rows per query.
+    year_mask = columns.filter(release_year=(2014, 2014))
+    timed('loop: 10 highest rated of 2014', lambda: sorted(
+        (m for m in movies if m.release_year == 2014), key=lambda m: (-m.rating, m.id))[:10])
+    timed('columns: sort 2014 by rating per query', lambda: _sort_per_query(columns, year_mask))
+    timed('columns: presort by rating (once)', lambda: columns.ranked_rows('rating'))
+    timed('columns: 10 highest rated of 2014', lambda: columns.top_movie_ids('rating', 10, year_mask))
+
+
+def _sort_per_query(columns: MovieColumns, mask: np.ndarray):
+    ids, ratings = columns.column('id')[mask], columns.column('rating')[mask]
+    return ids[np.lexsort((ids, -ratings))][:10].tolist()
+
+
+def _count_years(movies):
+    counts = dict()
+    for movie in movies:
+        counts[movie.release_year] = counts.get(movie.release_year, 0) + 1
+    return counts
+
+
+if __name__ == '__main__':
+    main()
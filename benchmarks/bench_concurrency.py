@@ -0,0 +1,75 @@
+"""Read throughput of a MemoryRepository shared by threads, with and without concurrent writers.
+
+Reader threads serve a mix of repository reads for a fixed time while writer threads add Movies, Users and Reviews.
+Run from the project root:
+
+    python -m benchmarks.bench_concurrency [seconds]
+"""
+import sys
+import threading
+import time
+
+from movie.adapters.memory_repository import MemoryRepository, populate
+from movie.domain.model import Movie, User, Genre, add_review
+
+DATA_PATH = 'movie/adapters/data'
+SECONDS = 3.0
+READERS = 8
+
+
+def read(repo: MemoryRepository, stop: threading.Event, counts: list, reader: int):
+    reads = 0
+    movie_count = repo.get_number_of_movies()
+    while not stop.is_set():
+        movie_ids = repo.get_movie_ids_by_genre('Drama')
+        repo.get_movies_by_id(movie_ids[reads % 100:reads % 100 + 3])
+        repo.get_movie(1 + reads % movie_count)
+        repo.get_actor_names_by_prefix('chr', 10)
+        repo.get_user('thorke')
+        reads += 5
+    counts[reader] = reads
+
+
+def write(repo: MemoryRepository, stop: threading.Event, counts: list, writer: int, pause: float):
+    writes = 0
+    while not stop.is_set():
+        movie = Movie(f'Benchmark {writer}-{writes}', 2020)
+        movie.add_genre(Genre('Drama'))
+        repo.add_movie(movie)
+        repo.add_movie_index(movie)
+        user = User(f'benchmark{writer}x{writes}', 'abcdefgh1')
+        repo.add_user(user)
+        repo.add_review(add_review('Benchmarked', user, movie, 3))
+        writes += 1
+        time.sleep(pause)
+    counts[writer] = writes
+
+
+def run(seconds: float, writers: int, pause: float):
+    repo = MemoryRepository()
+    populate(DATA_PATH, repo)
+    stop = threading.Event()
+    read_counts, write_counts = [0] * READERS, [0] * writers
+    threads = [threading.Thread(target=read, args=(repo, stop, read_counts, reader)) for reader in range(READERS)]
+    threads += [threading.Thread(target=write, args=(repo, stop, write_counts, writer, pause))
+                for writer in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(read_counts) / seconds, sum(write_counts) / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else SECONDS
+    print(f'{READERS} reader threads, {seconds:.0f} s per run')
+    print(f'{"writers":>8} {"write pause ms":>15} {"reads/s":>10} {"writes/s":>10}')
+    for writers, pause in ((0, 0.0), (1, 0.001), (4, 0.001), (4, 0.0)):
+        reads_per_second, writes_per_second = run(seconds, writers, pause)
+        print(f'{writers:>8} {pause * 1000:>15.0f} {reads_per_second:>10.0f} {writes_per_second:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Build time and query latency of the co-star graph, on a synthetic catalog with millions of co-star pairs.
+
+Casts of five are drawn from a pool of actors with a long tail, so a few actors are in many Movies, as in real
+catalogs. Run from the project root:
+
+    python -m benchmarks.bench_costar [movies]
+"""
+import sys
+import time
+
+import numpy as np
+
+from movie.adapters.costar import CoStarGraph
+
+MOVIES = 400000
+ACTORS = 200000
+CAST_SIZE = 5
+QUERIES = 200
+
+
+def synthetic_catalog(movies: int, rng: np.random.Generator) -> dict:
+    # Zipf-like popularity: actor k is cast with weight 1 / (k + 10).
+    weights = 1 / (np.arange(ACTORS) + 10)
+    casts = rng.choice(ACTORS, size=(movies, CAST_SIZE), p=weights / weights.sum())
+    movie_ids_by_actor = dict()
+    for movie_id, cast in enumerate(casts.tolist(), start=1):
+        for actor in cast:
+            movie_ids_by_actor.setdefault(f'Actor {actor}', list()).append(movie_id)
+    return movie_ids_by_actor
+
+
+def main():
+    movies = int(sys.argv[1]) if len(sys.argv) > 1 else MOVIES
+    rng = np.random.default_rng(1)
+    movie_ids_by_actor = synthetic_catalog(movies, rng)
+
+    started = time.perf_counter()
+    graph = CoStarGraph(movie_ids_by_actor)
+    built = time.perf_counter() - started
+    print(f'{len(graph)} actors, {graph.edges} co-star pairs, built in {built:.2f} s')
+
+    names = list(movie_ids_by_actor)
+    pairs = [(names[a], names[b]) for a, b in rng.integers(len(names), size=(QUERIES, 2))]
+
+    started = time.perf_counter()
+    for actor_name, colleague_name in pairs:
+        graph.worked_with(actor_name, colleague_name)
+    worked_with = (time.perf_counter() - started) / QUERIES
+
+    latencies, degrees = list(), list()
+    for actor_name, colleague_name in pairs:
+        started = time.perf_counter()
+        path = graph.path(actor_name, colleague_name)
+        latencies.append(time.perf_counter() - started)
+        degrees.append(len(path) - 1 if path is not None else -1)
+
+    print(f'worked with: {worked_with * 1e6:.1f} us per query')
+    print(f'shortest path: median {np.median(latencies) * 1e3:.2f} ms, 99th percentile '
+          f'{np.percentile(latencies, 99) * 1e3:.2f} ms, mean degrees {np.mean([d for d in degrees if d >= 0]):.2f}')
+
+
+if __name__ == '__main__':
+    main()
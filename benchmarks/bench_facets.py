@@ -0,0 +1,92 @@
+"""Multi-facet FacetIndex queries against the equivalent loops over the Movies' values.
+
+Run from the project root:
+
+    python -m benchmarks.bench_facets [movies]
+"""
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from movie.adapters.facets import FacetIndex
+
+MOVIES = 1_000_000
+GENRES = ['Action', 'Adventure', 'Animation', 'Biography', 'Comedy', 'Crime', 'Drama', 'Family', 'Fantasy', 'History',
+          'Horror', 'Music', 'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Sport', 'Thriller', 'War', 'Western']
+
+
+def build(count: int):
+    # Up to three genres, one of 70 years and one of count / 20 directors per movie; four actors drawn from count / 4,
+    # a few of them much busier than the rest.
+    rng = np.random.default_rng(235)
+    movie_ids = np.arange(1, count + 1)
+    genres = rng.integers(0, len(GENRES), (count, 3))
+    years = rng.integers(1950, 2020, count)
+    directors = rng.integers(0, count // 20, count)
+    actors = np.minimum(rng.zipf(1.3, (count, 4)), count // 4)
+
+    movie_ids_by_value = {
+        'genre': _group(np.repeat(movie_ids, 3), genres.ravel(), GENRES.__getitem__),
+        'year': _group(movie_ids, years, int),
+        'director': _group(movie_ids, directors, lambda code: f'Director {code}'),
+        'actor': _group(np.repeat(movie_ids, 4), actors.ravel(), lambda code: f'Actor {code}'),
+    }
+    values_by_movie = [
+        (set(GENRES[genre] for genre in movie_genres), int(year), f'Director {director}',
+         set(f'Actor {actor}' for actor in movie_actors))
+        for movie_genres, year, director, movie_actors in zip(genres.tolist(), years, directors, actors.tolist())
+    ]
+    return movie_ids, movie_ids_by_value, values_by_movie
+
+
+def _group(movie_ids: np.ndarray, codes: np.ndarray, value_of):
+    order = np.lexsort((movie_ids, codes))
+    movie_ids, codes = movie_ids[order], codes[order]
+    starts = np.flatnonzero(np.diff(codes, prepend=-1))
+    ends = np.append(starts[1:], len(codes))
+    return {value_of(int(codes[start])): np.unique(movie_ids[start:end]).tolist()
+            for start, end in zip(starts, ends)}
+
+
+def timed(label: str, function, repeats: int = 20):
+    times = list()
+    for number in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    print(f'  {label:<52} {statistics.median(times) * 1000:>10.3f} ms')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else MOVIES
+    movie_ids, movie_ids_by_value, values_by_movie = build(count)
+    print(f'{count} movies')
+
+    start = time.perf_counter()
+    index = FacetIndex(movie_ids, movie_ids_by_value)
+    print(f'  {"build index":<52} {(time.perf_counter() - start) * 1000:>10.1f} ms')
+
+    timed('loop: Drama and Romance, not 2010', lambda: [
+        movie_id for movie_id, (genres, year, director, actors) in enumerate(values_by_movie, 1)
+        if 'Drama' in genres and 'Romance' in genres and year != 2010], repeats=1)
+    timed('index: Drama and Romance, not 2010', lambda: index.query(
+        {'genre': ['Drama', 'Romance']}, none_of={'year': [2010]}, facet_limit=0), repeats=3)
+    timed('index: ... with facet counts', lambda: index.query(
+        {'genre': ['Drama', 'Romance']}, none_of={'year': [2010]}), repeats=3)
+
+    # Queries with an actor or a director start from a few hundred ids, whatever the size of the other facets.
+    timed('loop: Actor 100, Sci-Fi or Horror, 2000 or 2001', lambda: [
+        movie_id for movie_id, (genres, year, director, actors) in enumerate(values_by_movie, 1)
+        if 'Actor 100' in actors and genres & {'Sci-Fi', 'Horror'} and year in (2000, 2001)], repeats=1)
+    timed('index: Actor 100, Sci-Fi or Horror, 2000 or 2001', lambda: index.query(
+        {'actor': ['Actor 100']}, {'genre': ['Sci-Fi', 'Horror'], 'year': [2000, 2001]}))
+    timed('index: Director 7 or 8, not Drama', lambda: index.query(
+        any_of={'director': ['Director 7', 'Director 8']}, none_of={'genre': ['Drama']}))
+    timed('index: Actor 2, Comedy, not Actor 3', lambda: index.query(
+        {'actor': ['Actor 2'], 'genre': ['Comedy']}, none_of={'actor': ['Actor 3']}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Shared and private resident memory of pre-forked workers serving a 'memory' repository.
+
+Emulates a pre-forking server: a master process builds the application on a synthetic catalog and forks workers, with
+and without the preload hooks of movie/preload.py. Each worker serves a mix of requests, then the shared and private
+RSS of every worker is read from /proc (Linux only). Run from the project root:
+
+    python -m benchmarks.bench_fork_sharing [synthetic_rows] [workers] [requests_per_worker]
+
+To report on the workers of a running server instead, pass their process ids:
+
+    python -m benchmarks.bench_fork_sharing --pids PID [PID ...]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_population_memory import write_synthetic_file, GENRES
+
+DATA_PATH = os.path.join('movie', 'adapters', 'data')
+SYNTHETIC_ROWS = 50_000
+WORKERS = 4
+REQUESTS_PER_WORKER = 500
+
+SERVER_SCRIPT = '''
+import os
+import random
+import sys
+
+data_path, mode, workers, requests = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+genres, years = sys.argv[5].split(','), range(1950, 2021)
+
+from movie import create_app, preload
+if mode == 'preload':
+    preload.before_preload()
+app = create_app({'TESTING': True, 'REPOSITORY': 'memory', 'TEST_DATA_PATH': data_path,
+                  'MEMORY_SNAPSHOT_PATH': None, 'WTF_CSRF_ENABLED': False})
+if mode == 'preload':
+    preload.before_fork()
+
+pids = list()
+for worker in range(workers):
+    ready_read, ready_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        if mode == 'preload':
+            preload.after_fork()
+        rng = random.Random(worker)
+        client = app.test_client()
+        try:
+            for request in range(requests):
+                kind = request % 4
+                if kind == 0:
+                    client.get(f'/movies_by_genre?genre={rng.choice(genres)}&cursor={rng.randrange(0, 200) * 3}')
+                elif kind == 1:
+                    client.get(f'/movies_by_year?release_year={rng.choice(years)}')
+                elif kind == 2:
+                    client.get(f'/autocomplete?q=actor {rng.randrange(0, 1000)}')
+                else:
+                    client.get(f'/search?q=movie {rng.randrange(0, 1000)}')
+        finally:
+            os.write(ready_write, b'.')
+        # Stay alive, as a server worker would, until the master has been measured.
+        os.read(0, 1)
+        os._exit(0)
+    pids.append(pid)
+    os.read(ready_read, 1)
+
+print(' '.join(str(pid) for pid in [os.getpid()] + pids), flush=True)
+sys.stdin.read()
+'''
+
+
+def memory_of(pid: int) -> dict:
+    # KiB by field, from the kernel's summary of the process' mappings.
+    fields = dict()
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'shared': fields['Shared_Clean'] + fields['Shared_Dirty'],
+        'private': fields['Private_Clean'] + fields['Private_Dirty']
+    }
+
+
+def report(label: str, pids: list):
+    print(f'{label:<16} {"pid":>8} {"RSS MiB":>10} {"PSS MiB":>10} {"shared MiB":>11} {"private MiB":>12}')
+    total_private = 0
+    for pid in pids:
+        memory = memory_of(pid)
+        total_private += memory['private']
+        print(f'{"":<16} {pid:>8} {memory["rss"] / 1024:>10.1f} {memory["pss"] / 1024:>10.1f} '
+              f'{memory["shared"] / 1024:>11.1f} {memory["private"] / 1024:>12.1f}')
+    print(f'{"":<16} {"total private MiB":>30} {total_private / 1024:>.1f}')
+
+
+def run_server(data_path: str, mode: str, workers: int, requests: int):
+    server = subprocess.Popen(
+        [sys.executable, '-c', SERVER_SCRIPT, data_path, mode, str(workers), str(requests), ','.join(GENRES)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        master, *worker_pids = [int(pid) for pid in server.stdout.readline().split()]
+        report(f'{mode} master', [master])
+        report(f'{mode} workers', worker_pids)
+    finally:
+        server.stdin.close()
+        server.wait()
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--pids':
+        report('processes', [int(pid) for pid in sys.argv[2:]])
+        return
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else SYNTHETIC_ROWS
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else WORKERS
+    requests = int(sys.argv[3]) if len(sys.argv) > 3 else REQUESTS_PER_WORKER
+    with tempfile.TemporaryDirectory() as data_path:
+        write_synthetic_file(data_path, rows)
+        for file_name in ('users.csv', 'reviews.csv'):
+            shutil.copy(os.path.join(DATA_PATH, file_name), data_path)
+
+        print(f'{rows} movies, {workers} workers, {requests} requests per worker')
+        for mode in ('default', 'preload'):
+            run_server(data_path, mode, workers, requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Latency of TrigramIndex.closest for misspelled names as the number of indexed names grows.
+
+Names combine random first and last names, so trigrams repeat across names the way real names do. Run from the
+project root:
+
+    python -m benchmarks.bench_fuzzy
+"""
+import random
+import string
+import time
+
+from movie.adapters.fuzzy import TrigramIndex
+
+SIZES = (10_000, 100_000, 1_000_000)
+QUERIES = 500
+
+
+def random_word(rng: random.Random) -> str:
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))).capitalize()
+
+
+def misspell(rng: random.Random, name: str) -> str:
+    position = rng.randrange(len(name))
+    return name[:position] + name[position + 1:]
+
+
+def main():
+    rng = random.Random(235)
+    first_names = [random_word(rng) for _ in range(5_000)]
+    last_names = [random_word(rng) for _ in range(50_000)]
+
+    print(f'{"names":>10} {"mean ms":>9} {"found":>7}   (one letter dropped from an indexed name)')
+    for size in SIZES:
+        index = TrigramIndex()
+        names = [f'{rng.choice(first_names)} {rng.choice(last_names)}' for _ in range(size)]
+        for name in names:
+            index.add(name)
+
+        found = 0
+        start = time.perf_counter()
+        for _ in range(QUERIES):
+            name = rng.choice(names)
+            found += index.closest(misspell(rng, name)) == [name]
+        mean = (time.perf_counter() - start) / QUERIES * 1000
+        print(f'{size:>10} {mean:>9.2f} {found / QUERIES:>7.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Durable Review throughput of a journaled MemoryRepository, and the cost of replaying its journal on start up.
+
+Writer threads add Reviews to a repository whose journal lives in a temporary directory, so the results depend on how
+fast that file system syncs. The fsyncs per Review show how many additions group commit folds into one sync. Run from
+the project root:
+
+    python -m benchmarks.bench_journal [reviews_per_writer]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from movie.adapters import journal
+from movie.adapters.memory_repository import MemoryRepository, populate
+from movie.domain.model import User, add_review
+
+DATA_PATH = os.path.join('movie', 'adapters', 'data')
+REVIEWS_PER_WRITER = 200
+
+
+def write(repo: MemoryRepository, writer: int, reviews: int):
+    user = User(f'journaled{writer}', 'abcdefgh1')
+    repo.add_user(user)
+    for number in range(reviews):
+        movie = repo.get_movie(1 + (writer * reviews + number) % repo.get_number_of_movies())
+        repo.add_review(add_review(f'Review {number}', user, movie, 1 + number % 10))
+
+
+def run(journal_path: str, writers: int, reviews: int):
+    repo = MemoryRepository()
+    populate(DATA_PATH, repo, password_workers=1, journal_path=journal_path)
+
+    fsyncs = [0]
+    fsync = os.fsync
+
+    def counted_fsync(descriptor):
+        fsyncs[0] += 1
+        fsync(descriptor)
+
+    journal.os.fsync = counted_fsync
+    threads = [threading.Thread(target=write, args=(repo, writer, reviews)) for writer in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    journal.os.fsync = fsync
+    repo.journal.close()
+    return writers * (reviews + 1) / elapsed, fsyncs[0] / (writers * (reviews + 1))
+
+
+def main():
+    reviews = int(sys.argv[1]) if len(sys.argv) > 1 else REVIEWS_PER_WRITER
+    print(f'{"writers":>8} {"additions/s":>12} {"fsyncs/addition":>16}')
+    with tempfile.TemporaryDirectory() as directory:
+        for writers in (1, 4, 16):
+            additions_per_second, fsyncs_per_addition = run(os.path.join(directory, f'{writers}.journal'), writers,
+                                                            reviews)
+            print(f'{writers:>8} {additions_per_second:>12.0f} {fsyncs_per_addition:>16.2f}')
+
+        journal_path = os.path.join(directory, '16.journal')
+        started = time.perf_counter()
+        repo = MemoryRepository()
+        populate(DATA_PATH, repo, password_workers=1)
+        populated = time.perf_counter()
+        repo = MemoryRepository()
+        populate(DATA_PATH, repo, password_workers=1, journal_path=journal_path)
+        replayed = time.perf_counter()
+        print(f'populate {populated - started:.2f} s, populate and replay {repo.journal_sequence} records '
+              f'{replayed - populated:.2f} s')
+        repo.journal.close()
+
+
+if __name__ == '__main__':
+    main()
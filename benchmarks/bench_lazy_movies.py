@@ -0,0 +1,69 @@
+"""Start up time and resident memory (Linux) of a MemoryRepository with eagerly and lazily made Movies.
+
+Each start runs in a fresh interpreter on a synthetic moviefile.csv, first without a snapshot and then with one, and
+then touches a working set of Movies. Run from the project root:
+
+    python -m benchmarks.bench_lazy_movies [synthetic_rows]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_population_memory import write_synthetic_file
+
+DATA_PATH = os.path.join('movie', 'adapters', 'data')
+SYNTHETIC_ROWS = 200_000
+WORKING_SET = 1000
+
+START_SCRIPT = '''
+import gc
+import os
+import sys
+import time
+from movie.adapters.memory_repository import MemoryRepository, populate
+data_path, snapshot_path, lazy, working_set = sys.argv[1], sys.argv[2] or None, sys.argv[3] == 'lazy', int(sys.argv[4])
+started = time.perf_counter()
+repo = MemoryRepository()
+populate(data_path, repo, snapshot_path, lazy_movies=lazy, movie_cache_size=working_set)
+populated = time.perf_counter()
+movie_count = repo.get_number_of_movies()
+for movie_id in range(1, movie_count + 1, max(1, movie_count // working_set)):
+    repo.get_movie(movie_id).title
+accessed = time.perf_counter()
+gc.collect()
+with open('/proc/self/statm') as statm:
+    resident_pages = int(statm.read().split()[1])
+print(populated - started, accessed - populated, resident_pages * os.sysconf('SC_PAGE_SIZE') // 1024)
+'''
+
+
+def start(data_path: str, snapshot_path: str, mode: str):
+    output = subprocess.run([sys.executable, '-c', START_SCRIPT, data_path, snapshot_path, mode, str(WORKING_SET)],
+                            check=True, capture_output=True, text=True).stdout
+    populate_seconds, access_seconds, rss_kib = output.split()
+    return float(populate_seconds), float(access_seconds), int(rss_kib)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else SYNTHETIC_ROWS
+    with tempfile.TemporaryDirectory() as data_path:
+        write_synthetic_file(data_path, rows)
+        for file_name in ('users.csv', 'reviews.csv'):
+            shutil.copy(os.path.join(DATA_PATH, file_name), data_path)
+
+        print(f'{rows} movies, {WORKING_SET} movies touched after start up')
+        print(f'{"movies":<8} {"start":<17} {"populate s":>10} {"access ms":>10} {"RSS MiB":>12}')
+        for mode in ('eager', 'lazy'):
+            snapshot_path = os.path.join(data_path, f'{mode}.snapshot')
+            # The first run builds the snapshot (and, when lazy, the row offsets).
+            for label, path in (('from CSV files', ''), ('building snapshot', snapshot_path),
+                                ('from snapshot', snapshot_path)):
+                populate_seconds, access_seconds, rss_kib = start(data_path, path, mode)
+                print(f'{mode:<8} {label:<17} {populate_seconds:>10.2f} {access_seconds * 1000:>10.1f} '
+                      f'{rss_kib / 1024:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Lookup latency of MemoryRepository.get_user, get_actor and get_director as the repository grows.
+
+Run from the project root:
+
+    python -m benchmarks.bench_lookups
+"""
+import random
+import timeit
+
+from movie.adapters.memory_repository import MemoryRepository
+from movie.domain.model import User, Actor, Director
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+LOOKUPS = 10_000
+
+
+def build_repository(size: int) -> MemoryRepository:
+    repo = MemoryRepository()
+    for i in range(size):
+        # Password hashing is not what is being measured here, so store a placeholder hash.
+        repo.add_user(User(f'user{i}', 'pbkdf2:sha256:placeholder'))
+        repo.add_actor(Actor(f'Actor {i}'))
+        repo.add_director(Director(f'Director {i}'))
+    return repo
+
+
+def time_lookups(lookup, keys) -> float:
+    # Returns the mean latency of one lookup, in microseconds.
+    seconds = timeit.timeit(lambda: [lookup(key) for key in keys], number=1)
+    return seconds / len(keys) * 1_000_000
+
+
+def main():
+    print(f'{"entities":>10} {"get_user":>12} {"get_actor":>12} {"get_director":>14}   (mean us per lookup)')
+    for size in SIZES:
+        repo = build_repository(size)
+        picks = [random.randrange(size) for _ in range(LOOKUPS)]
+        user_time = time_lookups(repo.get_user, [f'user{i}' for i in picks])
+        actor_time = time_lookups(repo.get_actor, [f'Actor {i}' for i in picks])
+        director_time = time_lookups(repo.get_director, [f'Director {i}' for i in picks])
+        print(f'{size:>10} {user_time:>12.3f} {actor_time:>12.3f} {director_time:>14.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Bytes per Movie and Movie hash/equality throughput, in the default and the compact domain model.
+
+COMPACT_MODEL is read when movie.domain.model is imported, so each mode is measured in its own interpreter. Run from
+the project root:
+
+    python -m benchmarks.bench_model_footprint
+"""
+import os
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+MOVIES = 100_000
+
+
+def build_movies(count: int):
+    from movie.domain.model import Movie
+
+    movies = list()
+    for i in range(count):
+        movie = Movie(f'Movie {i}', 1950 + i % 70)
+        movie.id = i + 1
+        movie.description = 'A movie.'
+        movie.runtime_minutes = 90
+        movies.append(movie)
+    return movies
+
+
+def measure():
+    from movie.domain.model import COMPACT_MODEL
+
+    tracemalloc.start()
+    movies = build_movies(MOVIES)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Equal but distinct instances, so membership tests go through __hash__ and __eq__.
+    lookups = build_movies(MOVIES)
+    catalog = set(movies)
+    seconds = timeit.timeit(lambda: [movie in catalog for movie in lookups], number=5)
+
+    mode = 'compact' if COMPACT_MODEL else 'default'
+    print(f'{mode:<8} {current / MOVIES:>14.1f} {5 * MOVIES / seconds / 1_000_000:>22.2f}')
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        measure()
+        return
+
+    print(f'{"mode":<8} {"bytes/movie":>14} {"set lookups (M/s)":>22}')
+    for compact in ('False', 'True'):
+        env = dict(os.environ, COMPACT_MODEL=compact)
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_model_footprint', '--measure'], env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Time to load users.csv into a MemoryRepository as password hashing is spread over more processes.
+
+Each hash takes tens of milliseconds by design, so the default user counts run for a long time on few cores. Run from
+the project root:
+
+    python -m benchmarks.bench_password_hashing [users ...]
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+
+from movie.adapters.memory_repository import MemoryRepository, load_users_and_ids
+from movie.adapters.passwords import password_workers
+
+USER_COUNTS = (10_000, 100_000)
+
+
+def write_users_file(data_path: str, users: int):
+    with open(os.path.join(data_path, 'users.csv'), 'w', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(['id', 'username', 'password'])
+        for user_id in range(1, users + 1):
+            writer.writerow([user_id, f'user{user_id}', f'password-{user_id}'])
+
+
+def worker_counts():
+    # 1, 2, 4, ... up to one worker per CPU.
+    counts = [1]
+    while counts[-1] * 2 <= password_workers(None):
+        counts.append(counts[-1] * 2)
+    if counts[-1] != password_workers(None):
+        counts.append(password_workers(None))
+    return counts
+
+
+def main():
+    user_counts = [int(argument) for argument in sys.argv[1:]] or USER_COUNTS
+    print(f'{os.cpu_count()} CPUs')
+    print(f'{"users":>8} {"workers":>8} {"seconds":>10} {"users/s":>10} {"speedup":>8}')
+    for users in user_counts:
+        with tempfile.TemporaryDirectory() as data_path:
+            write_users_file(data_path, users)
+            serial_seconds = None
+            for workers in worker_counts():
+                started = time.perf_counter()
+                load_users_and_ids(data_path, MemoryRepository(), workers)
+                seconds = time.perf_counter() - started
+                serial_seconds = serial_seconds or seconds
+                print(f'{users:>8} {workers:>8} {seconds:>10.2f} {users / seconds:>10.0f} '
+                      f'{serial_seconds / seconds:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
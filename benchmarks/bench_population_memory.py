@@ -0,0 +1,98 @@
+"""Memory used by MemoryRepository population with and without the shared EntityRegistry.
+
+Reports traced allocations and entity counts for the bundled 1000-movie file and for a synthetic file with many
+more rows. Run from the project root:
+
+    python -m benchmarks.bench_population_memory [synthetic_rows]
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+from movie.adapters.memory_repository import MemoryRepository, load_movies_and_ids, read_csv_file
+from movie.domain.model import Movie, Director, Genre, Actor
+
+DATA_PATH = os.path.join('movie', 'adapters', 'data')
+SYNTHETIC_ROWS = 1_000_000
+
+HEADER = ['Rank', 'Title', 'Genre', 'Description', 'Director', 'Actors', 'Year', 'Runtime (Minutes)', 'Rating',
+          'Votes', 'Revenue (Millions)', 'Metascore']
+GENRES = ['Action', 'Adventure', 'Sci-Fi', 'Mystery', 'Horror', 'Thriller', 'Animation', 'Comedy', 'Family',
+          'Fantasy', 'Drama', 'Music', 'Biography', 'Romance', 'History', 'Crime', 'Western', 'War', 'Sport']
+
+
+def load_without_registry(data_path: str, repo: MemoryRepository):
+    # The loading loop as it was before the registry: new entities per row, actors once per genre.
+    for row in read_csv_file(os.path.join(data_path, 'moviefile.csv')):
+        movie = Movie(row[1], int(row[6]))
+        movie.description = row[3]
+        movie.runtime_minutes = int(row[7])
+
+        director = Director(row[4])
+        repo.add_director(director)
+        movie.director = director
+
+        for genre_string in row[2].split(','):
+            genre = Genre(genre_string)
+            movie.add_genre(genre)
+            repo.add_genre(genre)
+
+            for actor_string in row[5].split(','):
+                actor = Actor(actor_string)
+                repo.add_actor(actor)
+                movie.add_actor(actor)
+
+        repo.add_movie(movie)
+        repo.add_movie_index(movie)
+
+
+def write_synthetic_file(data_path: str, rows: int):
+    # Names are drawn from pools sized like a real catalog, so they repeat across rows.
+    rng = random.Random(235)
+    actor_pool = [f'Actor {i}' for i in range(max(rows // 4, 100))]
+    director_pool = [f'Director {i}' for i in range(max(rows // 16, 10))]
+
+    with open(os.path.join(data_path, 'moviefile.csv'), 'w', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(HEADER)
+        for rank in range(1, rows + 1):
+            writer.writerow([
+                rank, f'Movie {rank}', ','.join(rng.sample(GENRES, rng.randint(1, 3))), 'A synthetic movie.',
+                rng.choice(director_pool), ', '.join(rng.sample(actor_pool, 4)), rng.randint(1950, 2020),
+                rng.randint(80, 180), 7.0, 1000, 10.0, 50
+            ])
+
+
+def measure(loader, data_path: str):
+    repo = MemoryRepository()
+    tracemalloc.start()
+    with repo.batch():
+        loader(data_path, repo)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak, len(repo.get_actors()), len(repo._directors), len(repo.get_genres())
+
+
+def report(label: str, data_path: str):
+    print(label)
+    print(f'  {"loader":<18} {"retained MiB":>13} {"peak MiB":>10} {"actors":>10} {"directors":>10} {"genres":>8}')
+    for name, loader in (('without registry', load_without_registry), ('with registry', load_movies_and_ids)):
+        current, peak, actors, directors, genres = measure(loader, data_path)
+        print(f'  {name:<18} {current / 2 ** 20:>13.1f} {peak / 2 ** 20:>10.1f} {actors:>10} {directors:>10} '
+              f'{genres:>8}')
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else SYNTHETIC_ROWS
+    report('Bundled moviefile.csv (1000 movies)', DATA_PATH)
+
+    with tempfile.TemporaryDirectory() as data_path:
+        write_synthetic_file(data_path, rows)
+        report(f'Synthetic moviefile.csv ({rows} movies)', data_path)
+
+
+if __name__ == '__main__':
+    main()
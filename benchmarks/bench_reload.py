@@ -0,0 +1,78 @@
+"""Time to apply a small change to moviefile.csv by incremental reload, against populating from scratch.
+
+Ten rows are retitled, one removed and one added in a copy of the bundled data files, and the change is applied to a
+MemoryRepository and to a SQLite database. Run from the project root:
+
+    python -m benchmarks.bench_reload
+"""
+import csv
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from movie.adapters import database_repository, memory_repository
+from movie.adapters.memory_repository import MemoryRepository
+from movie.adapters.orm import metadata, map_model_to_tables
+from movie.adapters.snapshot import DATA_FILES
+
+DATA_PATH = os.path.join('movie', 'adapters', 'data')
+
+
+def change_movie_file(data_path: str):
+    file_name = os.path.join(data_path, 'moviefile.csv')
+    with open(file_name, encoding='utf-8-sig') as infile:
+        rows = list(csv.reader(infile))
+    for row in rows[100:110]:
+        row[1] += ' (Director\'s Cut)'
+    del rows[500]
+    rows.append([str(len(rows) + 1), 'Benchmark', 'Drama', 'A benchmark.', 'A Director', 'An Actor', '2020', '90',
+                 '5.0', '10', '', ''])
+    with open(file_name, 'w', newline='', encoding='utf-8') as outfile:
+        csv.writer(outfile).writerows(rows)
+
+
+def time_memory(data_path: str):
+    repo = MemoryRepository()
+    started = time.perf_counter()
+    memory_repository.populate(data_path, repo, password_workers=1)
+    populated = time.perf_counter()
+    change_movie_file(data_path)
+    memory_repository.reload_movies(data_path, repo)
+    return populated - started, time.perf_counter() - populated
+
+
+def time_database(data_path: str, database_path: str):
+    engine = create_engine(f'sqlite:///{database_path}')
+    clear_mappers()
+    metadata.create_all(engine)
+    map_model_to_tables()
+    repo = database_repository.SqlAlchemyRepository(sessionmaker(bind=engine))
+    started = time.perf_counter()
+    database_repository.populate(engine, data_path, password_workers=1)
+    populated = time.perf_counter()
+    change_movie_file(data_path)
+    database_repository.reload_movies(engine, data_path, repo)
+    return populated - started, time.perf_counter() - populated
+
+
+def main():
+    print(f'{"repository":<10} {"populate s":>11} {"reload s":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ('memory', 'database'):
+            data_path = os.path.join(directory, name)
+            os.mkdir(data_path)
+            for file_name in DATA_FILES:
+                shutil.copy(os.path.join(DATA_PATH, file_name), data_path)
+            if name == 'memory':
+                populate_seconds, reload_seconds = time_memory(data_path)
+            else:
+                populate_seconds, reload_seconds = time_database(data_path, os.path.join(directory, 'movie.db'))
+            print(f'{name:<10} {populate_seconds:>11.3f} {reload_seconds:>9.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Query latency of the SearchIndex behind MemoryRepository.search_movie_ids on a synthetic catalog.
+
+Titles and descriptions are drawn from a Zipf-like vocabulary, so some words are common and most are rare. Run from
+the project root:
+
+    python -m benchmarks.bench_search [movies]
+"""
+import itertools
+import random
+import sys
+import time
+
+from movie.adapters.search import SearchIndex
+from movie.domain.model import Movie
+
+MOVIES = 1_000_000
+VOCABULARY = [f'word{i}' for i in range(50_000)]
+CUMULATIVE_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+
+def build(count: int) -> SearchIndex:
+    rng = random.Random(235)
+    all_words = rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=22 * count)
+    index = SearchIndex()
+    for i in range(1, count + 1):
+        words = all_words[22 * (i - 1):22 * i]
+        movie = Movie(' '.join(words[:3]), 2000, i)
+        movie.description = ' '.join(words[3:])
+        index.add(movie)
+    return index
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else MOVIES
+    start = time.perf_counter()
+    index = build(count)
+    print(f'{count} movies indexed in {time.perf_counter() - start:.1f} s')
+
+    for label, query in (('rare word', 'word40000'), ('two rare words', 'word20000 word30000'),
+                         ('mid-frequency word', 'word500'), ('common word', 'word10')):
+        # The first query for a term builds its posting arrays; later queries reuse them.
+        timings = list()
+        for attempt in range(2):
+            start = time.perf_counter()
+            ids, total = index.search(query, 0, 10)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f'  {label:<20} {total:>8} matches {timings[0]:>8.2f} ms first, {timings[1]:>8.2f} ms repeated')
+
+
+if __name__ == '__main__':
+    main()
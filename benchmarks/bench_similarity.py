@@ -0,0 +1,58 @@
+"""Building a SimilarityIndex of a large catalog, and reading a Movie's most similar Movies from it.
+
+Run from the project root:
+
+    python -m benchmarks.bench_similarity [movies]
+"""
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from movie.adapters.similarity import SimilarityIndex
+
+MOVIES = 1_000_000
+GENRES = 20
+
+
+def build(count: int):
+    # Up to three of 20 genres and four actors per movie, the actors drawn from count / 4, a few much busier than the
+    # rest, as the features of each movie.
+    rng = np.random.default_rng(235)
+    movie_ids = np.arange(1, count + 1)
+    genres = rng.integers(0, GENRES, (count, 3))
+    actors = GENRES + np.minimum(rng.zipf(1.3, (count, 4)), count // 4)
+    features = np.concatenate((genres, actors), axis=1).ravel()
+    feature_movie_ids = np.repeat(movie_ids, 7)
+
+    order = np.argsort(features, kind='stable')
+    features, feature_movie_ids = features[order], feature_movie_ids[order]
+    starts = np.flatnonzero(np.diff(features, prepend=-1))
+    return movie_ids, np.split(feature_movie_ids, starts[1:])
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else MOVIES
+    movie_ids, movie_ids_by_feature = build(count)
+    print(f'{count} movies, {len(movie_ids_by_feature)} features')
+
+    start = time.perf_counter()
+    index = SimilarityIndex(movie_ids, movie_ids_by_feature)
+    print(f'  {"build index":<40} {(time.perf_counter() - start) * 1000:>10.1f} ms')
+
+    rng = random.Random(235)
+    times = list()
+    for number in range(1000):
+        movie_id = rng.randint(1, count)
+        start = time.perf_counter()
+        index.similar_movie_ids(movie_id, 6)
+        times.append(time.perf_counter() - start)
+    print(f'  {"6 most similar movies (median)":<40} {statistics.median(times) * 1e6:>10.1f} µs')
+    found = sum(len(index.similar(movie_id, 1)) for movie_id in movie_ids[:10000].tolist())
+    print(f'  {"movies with a similar movie, of 10000":<40} {found:>10}')
+
+
+if __name__ == '__main__':
+    main()
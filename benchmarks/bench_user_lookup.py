@@ -0,0 +1,99 @@
+"""Login latency of SqlAlchemyRepository as the users table grows, against reading every User as get_user used to.
+
+Each login is served as a request is, from a new session: the User is found through the unique index on
+normalized_username and its password checked. Passwords are hashed with a single PBKDF2 iteration, so the lookup rather
+than the hashing is what is timed. Run from the project root:
+
+    python -m benchmarks.bench_user_lookup [users]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+from werkzeug.security import generate_password_hash
+
+from movie.adapters import database_repository
+from movie.adapters.orm import metadata, map_model_to_tables, normalize_username
+from movie.authentication import services
+from movie.domain.model import User
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+LOGINS = 1_000
+
+# Reading every User gets slow enough that it is only timed up to this many Users, and for fewer lookups.
+SCAN_SIZE_LIMIT = 10_000
+SCAN_LOOKUPS = 20
+
+PASSWORD = 'cLQ^C#oFXloS'
+
+
+def build_database(database_path: str, size: int, password_hash: str) -> database_repository.SqlAlchemyRepository:
+    engine = create_engine(f'sqlite:///{database_path}')
+    clear_mappers()
+    metadata.create_all(engine)
+    map_model_to_tables()
+    conn = engine.raw_connection()
+    conn.cursor().executemany(
+        'INSERT INTO users (id, username, password, normalized_username) VALUES (?, ?, ?, ?)',
+        ((i + 1, f'User{i}', password_hash, normalize_username(f'User{i}')) for i in range(size)))
+    conn.commit()
+    conn.close()
+    return database_repository.SqlAlchemyRepository(sessionmaker(bind=engine))
+
+
+def scan_for_user(repo: database_repository.SqlAlchemyRepository, username: str):
+    # get_user as it was: every User read, and their usernames compared here.
+    username = username.lower()
+    for user in repo._session_cm.session.query(User).all():
+        if user.username == username:
+            return user
+    return None
+
+
+def time_logins(repo, usernames, login) -> float:
+    # Returns the mean latency of one login, each from a new session, in microseconds.
+    started = time.perf_counter()
+    for username in usernames:
+        repo.reset_session()
+        login(username)
+    return (time.perf_counter() - started) / len(usernames) * 1_000_000
+
+
+def time_repeated_lookups(repo, usernames) -> float:
+    # Returns the mean latency of finding a User again in the same session, in microseconds. The Users are kept, as a
+    # request keeps the User it is serving, since the session's identity map only holds Users still referenced.
+    repo.reset_session()
+    users = [repo.get_user(username) for username in usernames]
+    started = time.perf_counter()
+    for username in usernames:
+        repo.get_user(username)
+    return (time.perf_counter() - started) / len(usernames) * 1_000_000
+
+
+def main():
+    sizes = [int(sys.argv[1])] if len(sys.argv) > 1 else SIZES
+    password_hash = generate_password_hash(PASSWORD, method='pbkdf2:sha256:1')
+    rng = random.Random(235)
+
+    print(f'{"users":>10} {"login us":>10} {"get_user us":>12} {"again us":>9} {"scan get_user us":>17}')
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            repo = build_database(os.path.join(directory, f'users-{size}.db'), size, password_hash)
+            usernames = [f'user{rng.randrange(size)}' for _ in range(LOGINS)]
+
+            login_time = time_logins(repo, usernames, lambda name: services.authenticate_user(name, PASSWORD, repo))
+            lookup_time = time_logins(repo, usernames, repo.get_user)
+            again_time = time_repeated_lookups(repo, usernames)
+            scan_time = ''
+            if size <= SCAN_SIZE_LIMIT:
+                scan_time = f'{time_logins(repo, usernames[:SCAN_LOOKUPS], lambda name: scan_for_user(repo, name)):.1f}'
+            print(f'{size:>10} {login_time:>10.1f} {lookup_time:>12.1f} {again_time:>9.1f} {scan_time:>17}')
+            repo.close_session()
+
+
+if __name__ == '__main__':
+    main()
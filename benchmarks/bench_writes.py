@@ -0,0 +1,67 @@
+"""Latency of single MemoryRepository writes, outside a batch, as the catalog grows.
+
+Each size adds that many Users, Actors and Movies to the bundled data in one batch, then times writes that each publish
+a version of their own. A write copies only the parts of the structures it changes, so its latency should stay about
+the same from size to size. Run from the project root:
+
+    python -m benchmarks.bench_writes [largest size]
+"""
+import gc
+import sys
+import time
+
+from movie.adapters.memory_repository import MemoryRepository, populate
+from movie.domain.model import Movie, User, Actor, Genre, add_review
+
+DATA_PATH = 'movie/adapters/data'
+SIZES = (1_000, 10_000, 100_000, 300_000)
+WRITES = 200
+
+
+def build_repository(size: int) -> MemoryRepository:
+    repo = MemoryRepository()
+    populate(DATA_PATH, repo)
+    with repo.batch():
+        for number in range(size):
+            repo.add_user(User(f'bulk{number}', 'abcdefgh1'))
+            repo.add_actor(Actor(f'Bulk Actor {number}'))
+            movie = Movie(f'Bulk {number}', 2000 + number % 20)
+            movie.add_genre(Genre('Drama'))
+            movie.add_actor(Actor(f'Bulk Actor {number}'))
+            repo.add_movie(movie)
+    # Collect now rather than during the first timed writes.
+    gc.collect()
+    return repo
+
+
+def time_writes(write) -> float:
+    # Returns the mean latency of one write, in microseconds.
+    started = time.perf_counter()
+    for number in range(WRITES):
+        write(number)
+    return (time.perf_counter() - started) / WRITES * 1e6
+
+
+def add_movie(repo: MemoryRepository, number: int):
+    movie = Movie(f'Timed {number}', 2020)
+    movie.add_genre(Genre('Drama'))
+    repo.add_movie(movie)
+
+
+def main():
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    print(f'mean microseconds per write, {WRITES} writes each')
+    print(f'{"size":>8} {"add_user":>10} {"add_actor":>10} {"add_review":>11} {"add_movie":>10}')
+    for size in (size for size in SIZES if size <= largest):
+        repo = build_repository(size)
+        movie = repo.get_movie(1)
+        user = time_writes(lambda number: repo.add_user(User(f'timed{number}', 'abcdefgh1')))
+        actor = time_writes(lambda number: repo.add_actor(Actor(f'Timed Actor {number}')))
+        review = time_writes(lambda number: repo.add_review(add_review('Timed', repo.get_user(f'timed{number}'),
+                                                                       movie, 3)))
+        movie_write = time_writes(lambda number: add_movie(repo, number))
+        print(f'{size:>8} {user:>10.0f} {actor:>10.0f} {review:>11.0f} {movie_write:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -21,4 +21,14 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     REPOSITORY = environ.get('REPOSITORY')
+    MEMORY_SNAPSHOT_PATH = environ.get('MEMORY_SNAPSHOT_PATH')
+    PASSWORD_HASH_WORKERS = int(environ.get('PASSWORD_HASH_WORKERS') or 0)
+    LAZY_MOVIES = environ.get('LAZY_MOVIES') == 'True'
+    MOVIE_CACHE_SIZE = int(environ.get('MOVIE_CACHE_SIZE') or 1024)
+    MEMORY_JOURNAL_PATH = environ.get('MEMORY_JOURNAL_PATH')
+    MEMORY_JOURNAL_COMPACT_RECORDS = int(environ.get('MEMORY_JOURNAL_COMPACT_RECORDS') or 1000)
+    PREBUILD_INDEXES = environ.get('PREBUILD_INDEXES') == 'True'
+    MOVIE_FILE_RELOAD_SECONDS = float(environ.get('MOVIE_FILE_RELOAD_SECONDS') or 0)
+    SIDEBAR_POOL_SIZE = int(environ.get('SIDEBAR_POOL_SIZE') or 256)
+    MOVIES_PER_PAGE = int(environ.get('MOVIES_PER_PAGE') or 3)
 
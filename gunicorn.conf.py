@@ -0,0 +1,28 @@
+"""Gunicorn settings for serving the application from pre-forked workers.
+
+The application, and with it the repository, is built once in the master process and shared with the workers; see
+movie/preload.py. Run from the project root:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+
+from config import Config
+from movie import preload
+
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+if Config.REPOSITORY == 'memory' and Config.MEMORY_JOURNAL_PATH:
+    # The journal must have a single writer.
+    workers = 1
+
+# The configuration is read before the application is preloaded.
+preload.before_preload()
+
+
+def when_ready(server):
+    preload.before_fork()
+
+
+def post_fork(server, worker):
+    preload.after_fork()
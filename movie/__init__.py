@@ -10,7 +10,9 @@ from sqlalchemy.pool import NullPool
 
 import movie.adapters.repository as repo
 from movie.adapters import memory_repository, database_repository
+from movie.adapters.catalog_reload import MovieFileWatcher
 from movie.adapters.orm import metadata, map_model_to_tables
+from movie.utilities.sampler import MovieSampler, SimilarMovieCache
 
 
 def create_app(test_config=None):
@@ -27,13 +29,26 @@ def create_app(test_config=None):
         app.config.from_mapping(test_config)
         data_path = app.config['TEST_DATA_PATH']
 
+    # With a reload interval, changes to moviefile.csv are applied to the running repository; see MovieFileWatcher.
+    reload_seconds = app.config.get('MOVIE_FILE_RELOAD_SECONDS') or 0
+    movie_file_path = os.path.join(data_path, 'moviefile.csv')
+    movie_file_watcher = None
+
     # Here the "magic" of our repository pattern happens. We can easily switch between in memory data and
     # persistent database data storage for our application.
 
     if app.config['REPOSITORY'] == 'memory':
         # Create the MemoryRepository instance for a memory-based repository.
         repo.repo_instance = memory_repository.MemoryRepository()
-        memory_repository.populate(data_path, repo.repo_instance)
+        memory_repository.populate(data_path, repo.repo_instance, app.config.get('MEMORY_SNAPSHOT_PATH'),
+                                   app.config.get('PASSWORD_HASH_WORKERS'), app.config.get('LAZY_MOVIES', False),
+                                   app.config.get('MOVIE_CACHE_SIZE', 1024), app.config.get('MEMORY_JOURNAL_PATH'),
+                                   app.config.get('MEMORY_JOURNAL_COMPACT_RECORDS', 1000),
+                                   app.config.get('PREBUILD_INDEXES', False))
+        if reload_seconds > 0 and not app.config.get('LAZY_MOVIES', False):
+            movie_file_watcher = MovieFileWatcher(
+                movie_file_path, lambda: memory_repository.reload_movies(data_path, repo.repo_instance), reload_seconds
+            )
 
     elif app.config['REPOSITORY'] == 'database':
         # Configure database.
@@ -58,17 +73,41 @@ def create_app(test_config=None):
             # Generate mappings that map domain model classes to the database tables.
             map_model_to_tables()
 
-            database_repository.populate(database_engine, data_path)
+            database_repository.populate(database_engine, data_path, app.config.get('PASSWORD_HASH_WORKERS'))
 
         else:
             # Solely generate mappings that map domain model classes to the database tables.
             map_model_to_tables()
 
+            # A database made before the review totals existed gets them, totalled from the reviews stored.
+            database_repository.add_review_stats(database_engine)
+
+            # And the users' normalized usernames, which they are looked up by.
+            database_repository.add_normalized_usernames(database_engine)
+
+            # And the search index over the movies' titles and descriptions.
+            database_repository.add_search_index(database_engine)
+
+            # A database made before the score columns existed gets them, and the scores, from moviefile.csv.
+            if database_repository.add_score_columns(database_engine) or reload_seconds > 0:
+                # Apply changes made to moviefile.csv since the database was populated.
+                database_repository.reload_movies(database_engine, data_path)
+
+            # A database made before any of the indexes existed gets them.
+            database_repository.add_indexes(database_engine)
+
         # Create the database session factory using sessionmaker (this has to be done once, in a global manner)
         session_factory = sessionmaker(autocommit=False, autoflush=True, bind=database_engine)
         # Create the SQLAlchemy DatabaseRepository instance for an sqlite3-based repository.
         repo.repo_instance = database_repository.SqlAlchemyRepository(session_factory)
 
+        if reload_seconds > 0:
+            movie_file_watcher = MovieFileWatcher(
+                movie_file_path,
+                lambda: database_repository.reload_movies(database_engine, data_path, repo.repo_instance),
+                reload_seconds
+            )
+
 
 
     # Build the application - these steps require an application context.
@@ -87,17 +126,31 @@ def create_app(test_config=None):
         from .utilities import utilities
         app.register_blueprint(utilities.utilities_blueprint)
 
+        # Fill the sidebar's ring of random movies now, so that no request waits on the repository for them.
+        utilities.movie_sampler = MovieSampler(utilities.sample_movies, app.config.get('SIDEBAR_POOL_SIZE', 256))
+        utilities.movie_sampler.refill()
+        # The movies like each page's are looked up in the background, the first time the page is shown.
+        utilities.similar_movie_cache = SimilarMovieCache(utilities.similar_movies, 2 * app.config['MOVIES_PER_PAGE'])
+
         # Register a callback the makes sure that database sessions are associated with http requests
         # We reset the session inside the database repository before a new flask request is generated
         @app.before_request
         def before_flask_http_request_function():
+            if movie_file_watcher is not None:
+                movie_file_watcher.check()
+
             if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
                 repo.repo_instance.reset_session()
+            elif isinstance(repo.repo_instance, memory_repository.MemoryRepository):
+                # Serve the whole request from one version of the repository.
+                repo.repo_instance.pin()
 
         # Register a tear-down method that will be called after each request has been processed.
         @app.teardown_appcontext
         def shutdown_session(exception=None):
             if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
                 repo.repo_instance.close_session()
+            elif isinstance(repo.repo_instance, memory_repository.MemoryRepository):
+                repo.repo_instance.unpin()
 
     return app
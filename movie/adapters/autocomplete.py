@@ -0,0 +1,99 @@
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import List
+
+
+class PrefixIndex:
+    """ Completes names from a prefix typed by the user.
+
+    Every word of a name is a way in, so 'pra' completes 'Chris Pratt' as well as 'Pratt' does. Keys are kept sorted,
+    as (lowercased key, name) pairs, in chunks of up to 2 * CHUNK_SIZE pairs; a prefix is completed by bisecting to
+    the first key that starts with it and reading forward. A copy shares the chunks until it adds a key to one, so
+    adding a name to a copy costs a copy of the list of chunks and of the chunks its keys go in, not of every key.
+    """
+
+    CHUNK_SIZE = 256
+
+    def __init__(self):
+        self._chunks = list()
+        # The first key of each chunk, to bisect for the chunk a key belongs in.
+        self._firsts = list()
+        # The ids of the chunks this index may change in place, or None while it shares its list of chunks.
+        self._owned = set()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __copy__(self):
+        index = PrefixIndex()
+        index._chunks = self._chunks
+        index._firsts = self._firsts
+        index._owned = self._owned = None
+        index._size = self._size
+        return index
+
+    def __setstate__(self, state):
+        # Chunk ids only mean something in the process that made the chunks.
+        vars(self).update(state, _owned=None)
+
+    def add(self, name: str):
+        if name is None:
+            return
+        words = name.lower().split()
+        if self._contains((' '.join(words), name)):
+            return
+
+        for position in range(len(words)):
+            self._insert((' '.join(words[position:]), name))
+        self._size += 1
+
+    def _contains(self, pair: tuple) -> bool:
+        if len(self._chunks) == 0:
+            return False
+        chunk = self._chunks[max(bisect_right(self._firsts, pair) - 1, 0)]
+        position = bisect_left(chunk, pair)
+        return position < len(chunk) and chunk[position] == pair
+
+    def _insert(self, pair: tuple):
+        if self._owned is None:
+            self._chunks = list(self._chunks)
+            self._firsts = list(self._firsts)
+            self._owned = set()
+        if len(self._chunks) == 0:
+            self._chunks.append(list())
+            self._firsts.append(pair)
+            self._owned.add(id(self._chunks[0]))
+
+        number = max(bisect_right(self._firsts, pair) - 1, 0)
+        chunk = self._chunks[number]
+        if id(chunk) not in self._owned:
+            chunk = self._chunks[number] = list(chunk)
+            self._owned.add(id(chunk))
+        insort(chunk, pair)
+        self._firsts[number] = chunk[0]
+
+        if len(chunk) > 2 * self.CHUNK_SIZE:
+            second_half = chunk[self.CHUNK_SIZE:]
+            del chunk[self.CHUNK_SIZE:]
+            self._chunks.insert(number + 1, second_half)
+            self._firsts.insert(number + 1, second_half[0])
+            self._owned.add(id(second_half))
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """ Returns up to limit distinct names that have a word starting with prefix, in alphabetical key order. """
+        prefix = ' '.join(prefix.lower().split())
+        if prefix == '' or limit <= 0:
+            return list()
+
+        names = list()
+        first_chunk = max(bisect_left(self._firsts, (prefix,)) - 1, 0)
+        for chunk in islice(self._chunks, first_chunk, None):
+            for key, name in islice(chunk, bisect_left(chunk, (prefix,)), None):
+                if not key.startswith(prefix):
+                    return names
+                if name not in names:
+                    names.append(name)
+                    if len(names) == limit:
+                        return names
+        return names
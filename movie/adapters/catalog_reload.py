@@ -0,0 +1,93 @@
+import csv
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+# The rows of a changed movie file, compared with the Movies loaded: rows whose Rank is new, rows whose Rank is known
+# but whose fields differ, and the Ranks no longer in the file.
+CatalogChanges = namedtuple('CatalogChanges', ('inserted', 'updated', 'deleted'))
+
+
+def row_digest(row: List[str]) -> bytes:
+    # A short digest of a row's fields, to tell whether a row changed without keeping the row.
+    return hashlib.blake2b('\x1f'.join(row).encode('utf-8'), digest_size=8).digest()
+
+
+def parse_number(text: str, number_type):
+    # Blank and 'N/A' cells mean the value is unknown.
+    if text in ('', 'N/A'):
+        return None
+    return number_type(text)
+
+
+def read_movie_rows(data_path: str) -> Dict[int, List[str]]:
+    """ Returns the rows of moviefile.csv by Rank, with leading and trailing white space stripped from every field. """
+    with open(os.path.join(data_path, 'moviefile.csv'), encoding='utf-8-sig') as infile:
+        reader = csv.reader(infile)
+        next(reader)
+        rows = ([item.strip() for item in row] for row in reader)
+        return {int(row[0]): row for row in rows if len(row) > 0}
+
+
+def diff_movie_rows(digests: Dict[int, bytes], rows: Dict[int, List[str]],
+                    digest: Callable[[List[str]], bytes] = row_digest) -> CatalogChanges:
+    """ Compares the digests of the loaded rows, by Rank, with the rows of a movie file, in ascending Rank order. """
+    inserted, updated = list(), list()
+    for rank in sorted(rows):
+        row = rows[rank]
+        if rank not in digests:
+            inserted.append(row)
+        elif digests[rank] != digest(row):
+            updated.append(row)
+    deleted = sorted(rank for rank in digests if rank not in rows)
+    return CatalogChanges(inserted, updated, deleted)
+
+
+class MovieFileWatcher:
+    """ Calls reload() when a movie file has changed, as seen by check() at most once every interval seconds.
+
+    check() is meant to be called often, e.g. before every request: between checks it costs a clock read, and a check
+    costs a stat() of the file. Only one thread reloads at a time; the others carry on without waiting for it. A
+    failed reload is logged, and tried again at the next check.
+    """
+
+    def __init__(self, file_name: str, reload: Callable[[], CatalogChanges], interval: float = 5.0):
+        self._file_name = file_name
+        self._reload = reload
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._stamp = self._read_stamp()
+        self._next_check = time.monotonic() + interval
+
+    def check(self):
+        if time.monotonic() < self._next_check or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = time.monotonic() + self._interval
+            stamp = self._read_stamp()
+            if stamp == self._stamp:
+                return
+
+            changes = self._reload()
+            self._stamp = stamp
+            logger.info('Reloaded %s: %d inserted, %d updated, %d deleted', self._file_name, len(changes.inserted),
+                        len(changes.updated), len(changes.deleted))
+        except Exception:
+            # A file caught half written, for instance; the catalog is left as it was.
+            logger.exception('Reloading %s failed', self._file_name)
+        finally:
+            self._lock.release()
+
+    def _read_stamp(self):
+        try:
+            status = os.stat(self._file_name)
+        except OSError:
+            return None
+        return status.st_size, status.st_mtime_ns
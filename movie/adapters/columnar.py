@@ -0,0 +1,229 @@
+from typing import List
+
+import numpy as np
+
+from movie.domain.model import Movie
+
+
+class MovieColumns:
+    """ Scalar Movie attributes held in typed NumPy arrays, one row per Movie.
+
+    Rows are appended in the order Movies are added to the repository, so row i holds the Movie with id i + 1 when
+    ids are allocated densely. Values that may be unknown are held as NaN in the float columns (rating, revenue,
+    metascore) and as MISSING in the integer columns (release_year, runtime_minutes, votes); queries leave them out.
+
+    For top-k queries, the rows are kept presorted by each column they are ranked by: a permutation of the rows, in
+    rank order, made on first use after the columns change and reused by every query until they change again.
+    """
+
+    INTEGER_COLUMNS = ('id', 'release_year', 'runtime_minutes', 'votes')
+    FLOAT_COLUMNS = ('rating', 'revenue', 'metascore')
+
+    # No Movie has a negative year, runtime or number of votes.
+    MISSING = -1
+
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._columns = dict()
+        for name in self.INTEGER_COLUMNS:
+            self._columns[name] = np.zeros(capacity, dtype=np.int32)
+        for name in self.FLOAT_COLUMNS:
+            self._columns[name] = np.full(capacity, np.nan, dtype=np.float64)
+        # Copies share their arrays. The number of rows any of them has filled is kept in a list they share too, so
+        # that only the copy holding every filled row appends in place; anything else copies the arrays first.
+        self._shared = False
+        self._filled = [0]
+        # Rows in rank order, by (column name, descending); see ranked_rows().
+        self._orders = dict()
+
+    def __len__(self):
+        return self._size
+
+    def __copy__(self):
+        columns = MovieColumns(capacity=0)
+        columns._size = self._size
+        columns._columns = dict(self._columns)
+        columns._filled = self._filled
+        columns._shared = self._shared = True
+        columns._orders = dict(self._orders)
+        return columns
+
+    def column(self, name: str) -> np.ndarray:
+        """ Returns a read-only view of the populated part of a column. """
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def append(self, movie: Movie):
+        if self._size == len(self._columns['id']):
+            self._grow()
+        elif self._shared and self._filled[0] != self._size:
+            self._own()
+
+        row = self._size
+        self._columns['id'][row] = movie.id
+        for name in ('release_year', 'runtime_minutes', 'votes'):
+            value = getattr(movie, name)
+            self._columns[name][row] = self.MISSING if value is None else value
+        for name in self.FLOAT_COLUMNS:
+            value = getattr(movie, name)
+            self._columns[name][row] = np.nan if value is None else value
+        self._size += 1
+        self._filled[0] = self._size
+        self._orders = dict()
+
+    def remove(self, movie_id: int):
+        # Later rows move up one; the arrays are copied, so copies sharing them are unaffected.
+        row = self._row_of(movie_id)
+        self._columns = {name: np.delete(values, row) for name, values in self._columns.items()}
+        self._size -= 1
+        self._shared = False
+        self._filled = [self._size]
+        self._orders = dict()
+
+    def set_scores(self, movie_id: int, rating: float = None, votes: int = None, revenue: float = None,
+                   metascore: int = None):
+        row = self._row_of(movie_id)
+        if self._shared:
+            self._own()
+        if rating is not None:
+            self._columns['rating'][row] = rating
+        if votes is not None:
+            self._columns['votes'][row] = votes
+        if revenue is not None:
+            self._columns['revenue'][row] = revenue
+        if metascore is not None:
+            self._columns['metascore'][row] = metascore
+        self._orders = dict()
+
+    def filter(self, **ranges) -> np.ndarray:
+        """ Returns a boolean mask of the rows whose columns fall within the given inclusive ranges.
+
+        Each keyword names a column and gives a (low, high) pair; None leaves that end of the range open, e.g.
+        filter(release_year=(2010, 2014), rating=(8.0, None)).
+        """
+        mask = np.ones(self._size, dtype=bool)
+        for name, (low, high) in ranges.items():
+            values = self._columns[name][:self._size]
+            if values.dtype.kind == 'i':
+                mask &= values != self.MISSING
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return mask
+
+    def mask_of(self, movie_ids) -> np.ndarray:
+        """ Returns a boolean mask of the rows holding the given Movie ids. """
+        ids = np.asarray(movie_ids, dtype=np.int64)
+        mask = np.zeros(self._size, dtype=bool)
+        rows = ids - 1
+        in_place = (rows >= 0) & (rows < self._size)
+        in_place[in_place] = self._columns['id'][rows[in_place]] == ids[in_place]
+        mask[rows[in_place]] = True
+        if not in_place.all():
+            # Ids are not dense, fall back to a scan of the id column for the rest.
+            mask |= np.isin(self._columns['id'][:self._size], ids[~in_place])
+        return mask
+
+    def movie_ids(self, mask: np.ndarray = None) -> List[int]:
+        ids = self._columns['id'][:self._size]
+        if mask is not None:
+            ids = ids[mask]
+        return ids.tolist()
+
+    def top_movie_ids(self, name: str, limit: int, mask: np.ndarray = None, descending: bool = True) -> List[int]:
+        """ Returns the ids of up to limit Movies with the highest (or lowest) values in a column.
+
+        Rows with missing values are never returned. Nothing is sorted: the presorted rows are read in rank
+        order, in growing chunks when a mask leaves some out, until limit of them are found.
+        """
+        rows = self.ranked_rows(name, descending)
+        if mask is not None:
+            found = list()
+            count, start, chunk = 0, 0, max(4 * limit, 64)
+            while count < limit and start < len(rows):
+                chunk_rows = rows[start:start + chunk]
+                chunk_rows = chunk_rows[mask[chunk_rows]]
+                found.append(chunk_rows)
+                count += len(chunk_rows)
+                start += chunk
+                chunk *= 2
+            rows = np.concatenate(found) if found else rows[:0]
+        return self._columns['id'][rows[:limit]].tolist()
+
+    def ranked_rows(self, name: str, descending: bool = True) -> np.ndarray:
+        """ Returns the rows with a value in a column, from the highest value to the lowest (or the reverse).
+
+        Ties are in ascending id order. The permutation is made once per change to the columns.
+        """
+        key = (name, descending)
+        rows = self._orders.get(key)
+        if rows is None:
+            values = self._values(name)
+            rows = np.flatnonzero(~np.isnan(values))
+            values = values[rows]
+            rows = rows[np.lexsort((self._columns['id'][rows], -values if descending else values))]
+            rows.flags.writeable = False
+            self._orders[key] = rows
+        return rows
+
+    def stats(self, name: str, mask: np.ndarray = None) -> dict:
+        """ Returns the count, mean, minimum and maximum of a column, ignoring missing values. """
+        values = self._values(name)
+        if mask is not None:
+            values = values[mask]
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return {'count': 0, 'mean': None, 'min': None, 'max': None}
+        return {
+            'count': int(len(values)),
+            'mean': float(values.mean()),
+            'min': float(values.min()),
+            'max': float(values.max())
+        }
+
+    def count_by(self, name: str, mask: np.ndarray = None) -> dict:
+        """ Returns the number of rows holding each distinct value of an integer column, e.g. Movies per year. """
+        values = self._columns[name][:self._size]
+        if mask is not None:
+            values = values[mask]
+        values = values[values != self.MISSING]
+        distinct, counts = np.unique(values, return_counts=True)
+        return dict(zip(distinct.tolist(), counts.tolist()))
+
+    def _values(self, name: str) -> np.ndarray:
+        # A column's populated values as floats, with missing ones as NaN.
+        values = self._columns[name][:self._size].astype(np.float64)
+        if name in self.INTEGER_COLUMNS:
+            values[self._columns[name][:self._size] == self.MISSING] = np.nan
+        return values
+
+    def _row_of(self, movie_id: int) -> int:
+        row = movie_id - 1
+        ids = self._columns['id']
+        if 0 <= row < self._size and ids[row] == movie_id:
+            return row
+
+        # Ids are not dense, fall back to a scan of the id column.
+        rows = np.flatnonzero(ids[:self._size] == movie_id)
+        if len(rows) == 0:
+            raise KeyError(movie_id)
+        return int(rows[0])
+
+    def _grow(self):
+        for name, values in self._columns.items():
+            grown = np.zeros(max(2 * len(values), 16), dtype=values.dtype)
+            if values.dtype.kind == 'f':
+                grown[:] = np.nan
+            grown[:len(values)] = values
+            self._columns[name] = grown
+        self._shared = False
+        self._filled = [self._size]
+        self._orders = dict()
+
+    def _own(self):
+        # Copy the arrays before changing rows another copy may read.
+        self._columns = {name: values.copy() for name, values in self._columns.items()}
+        self._shared = False
+        self._filled = [self._size]
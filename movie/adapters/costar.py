@@ -0,0 +1,162 @@
+from typing import Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+class CoStarGraph:
+    """ The graph of actors who appeared in a Movie together, in compressed sparse row form.
+
+    Actors are numbered 0 to n - 1 in the order they are given. The co-stars of actor a are
+    neighbours[offsets[a]:offsets[a + 1]], in ascending order, and movies at the same positions hold the id of a Movie
+    the two appeared in. The graph is built in one pass over each actor's Movie ids, with the pairs of co-stars made
+    per Movie by NumPy rather than by Python loops, and is never changed afterwards.
+    """
+
+    def __init__(self, movie_ids_by_actor: Mapping[str, Iterable[int]]):
+        self._names = list(movie_ids_by_actor)
+        self._ids = {name: actor_id for actor_id, name in enumerate(self._names)}
+        movie_ids, counts = list(), list()
+        for actor_movie_ids in movie_ids_by_actor.values():
+            movie_ids.extend(actor_movie_ids)
+            counts.append(len(actor_movie_ids))
+        actor_ids = np.repeat(np.arange(len(self._names), dtype=np.int64), counts)
+
+        sources, targets, edge_movies = self._co_star_pairs(actor_ids, np.array(movie_ids, dtype=np.int64))
+
+        # Sort the pairs by source and target, keeping one Movie per pair.
+        keys = sources * len(self._names) + targets
+        order = np.argsort(keys)
+        keys = keys[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        sources = sources[order][first]
+
+        self._neighbours = targets[order][first].astype(np.int32)
+        self._movies = edge_movies[order][first].astype(np.int32)
+        self._offsets = np.zeros(len(self._names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(self._names)), out=self._offsets[1:])
+
+    @staticmethod
+    def _co_star_pairs(actor_ids: np.ndarray, movie_ids: np.ndarray):
+        # Group the (actor, Movie) roles by Movie, then pair every role with every other role of the same Movie.
+        order = np.argsort(movie_ids)
+        actor_ids, movie_ids = actor_ids[order], movie_ids[order]
+        if len(movie_ids) == 0:
+            return actor_ids, actor_ids, movie_ids
+
+        group_starts = np.flatnonzero(np.concatenate(([True], movie_ids[1:] != movie_ids[:-1])))
+        group_sizes = np.diff(np.append(group_starts, len(movie_ids)))
+        role_group_starts = np.repeat(group_starts, group_sizes)
+        role_group_sizes = np.repeat(group_sizes, group_sizes)
+
+        left = np.repeat(np.arange(len(movie_ids)), role_group_sizes)
+        pair_starts = np.cumsum(role_group_sizes) - role_group_sizes
+        right = np.repeat(role_group_starts, role_group_sizes) + np.arange(len(left)) - np.repeat(
+            pair_starts, role_group_sizes)
+        # Leaves out each role paired with itself, and an actor listed twice for one Movie.
+        distinct = actor_ids[left] != actor_ids[right]
+        left, right = left[distinct], right[distinct]
+        return actor_ids[left], actor_ids[right], movie_ids[left]
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def edges(self) -> int:
+        # Each pair of co-stars counts once.
+        return len(self._neighbours) // 2
+
+    def actor_id(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def actor_name(self, actor_id: int) -> str:
+        return self._names[actor_id]
+
+    def co_stars(self, actor_id: int) -> np.ndarray:
+        return self._neighbours[self._offsets[actor_id]:self._offsets[actor_id + 1]]
+
+    def shared_movie_id(self, actor_id: int, colleague_id: int) -> Optional[int]:
+        """ Returns the id of a Movie both actors appeared in, or None if they never appeared together.
+
+        This is a binary search of the actor's sorted co-stars, so it takes time in the logarithm of one actor's
+        number of co-stars, whatever the size of the graph.
+        """
+        start, end = self._offsets[actor_id], self._offsets[actor_id + 1]
+        position = start + int(np.searchsorted(self._neighbours[start:end], colleague_id))
+        if position < end and self._neighbours[position] == colleague_id:
+            return int(self._movies[position])
+        return None
+
+    def worked_with(self, actor_name: str, colleague_name: str) -> bool:
+        actor_id, colleague_id = self.actor_id(actor_name), self.actor_id(colleague_name)
+        if actor_id is None or colleague_id is None:
+            return False
+        return self.shared_movie_id(actor_id, colleague_id) is not None
+
+    def shortest_path(self, actor_id: int, colleague_id: int, max_depth: int = None) -> Optional[List[int]]:
+        """ Returns the actor ids along a shortest chain of co-stars from actor to colleague, both included.
+
+        Returns None if there is no chain of at most max_depth co-star links. The search runs breadth first from both
+        ends, always growing the smaller frontier by a whole level, and stops at the level where the two meet.
+        """
+        if actor_id == colleague_id:
+            return [actor_id]
+
+        # Distances from each end, and the actor each one was reached from; -1 for actors not reached yet.
+        distances = [np.full(len(self), -1, dtype=np.int32), np.full(len(self), -1, dtype=np.int32)]
+        parents = [np.full(len(self), -1, dtype=np.int32), np.full(len(self), -1, dtype=np.int32)]
+        frontiers = [np.array([actor_id], dtype=np.int64), np.array([colleague_id], dtype=np.int64)]
+        distances[0][actor_id] = 0
+        distances[1][colleague_id] = 0
+        depths = [0, 0]
+
+        while len(frontiers[0]) > 0 and len(frontiers[1]) > 0:
+            if max_depth is not None and depths[0] + depths[1] >= max_depth:
+                return None
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            other = 1 - side
+
+            sources, reached = self._expand(frontiers[side])
+            new = distances[side][reached] == -1
+            reached, first = np.unique(reached[new], return_index=True)
+            depths[side] += 1
+            distances[side][reached] = depths[side]
+            parents[side][reached] = sources[new][first]
+            frontiers[side] = reached
+
+            met = reached[distances[other][reached] != -1]
+            if len(met) > 0:
+                middle = int(met[np.argmin(distances[other][met])])
+                return self._walk(parents[0], middle)[::-1] + self._walk(parents[1], middle)[1:]
+        return None
+
+    def _expand(self, frontier: np.ndarray):
+        # Returns every (actor, co-star) pair for the actors of the frontier, as two arrays.
+        starts = self._offsets[frontier]
+        counts = self._offsets[frontier + 1] - starts
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return np.repeat(frontier, counts), self._neighbours[positions].astype(np.int64)
+
+    @staticmethod
+    def _walk(parents: np.ndarray, actor_id: int) -> List[int]:
+        path = [actor_id]
+        while parents[path[-1]] != -1:
+            path.append(int(parents[path[-1]]))
+        return path
+
+    def path(self, actor_name: str, colleague_name: str, max_depth: int = None) -> Optional[List[Tuple[str, int]]]:
+        """ Returns a shortest chain of co-stars from actor to colleague as (actor name, Movie id) pairs.
+
+        Each Movie id is that of a Movie the actor shared with the one before; the first pair's is None. Returns None
+        if either actor is unknown or there is no chain of at most max_depth links.
+        """
+        actor_id, colleague_id = self.actor_id(actor_name), self.actor_id(colleague_name)
+        if actor_id is None or colleague_id is None:
+            return None
+        actor_ids = self.shortest_path(actor_id, colleague_id, max_depth)
+        if actor_ids is None:
+            return None
+        return [(self._names[actor_ids[0]], None)] + [
+            (self._names[current], self.shared_movie_id(previous, current))
+            for previous, current in zip(actor_ids, actor_ids[1:])
+        ]
@@ -3,18 +3,29 @@ import os
 from abc import ABC
 
 from datetime import date
-from typing import List
+from typing import Dict, List, Tuple
 
-from sqlalchemy import desc, asc
+import numpy as np
+
+from sqlalchemy import desc, asc, func, or_, case, select
 from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
-from werkzeug.security import generate_password_hash
-
 from sqlalchemy.orm import scoped_session
 from flask import _app_ctx_stack
 
 from movie.domain.model import User, Movie, Review, Genre, Actor
-from movie.adapters.repository import AbstractRepository
+from movie.adapters.autocomplete import PrefixIndex
+from movie.adapters import orm
+from movie.adapters.catalog_reload import CatalogChanges, diff_movie_rows, parse_number, read_movie_rows, row_digest
+from movie.adapters.costar import CoStarGraph
+from movie.adapters.facets import FacetIndex, FacetResult
+from movie.adapters.fuzzy import TrigramIndex
+from movie.adapters.passwords import hash_passwords
+from movie.adapters.repository import AbstractRepository, MoviePage, RepositoryException, SCORE_NAMES
+from movie.adapters.review_stats import RATINGS, ReviewStats
+from movie.adapters.search import rank, term_frequencies, tokenize
+from movie.adapters.similarity import SimilarityIndex
 
 genres = None
 
@@ -58,6 +69,13 @@ class SqlAlchemyRepository(AbstractRepository):
 
     def __init__(self, session_factory):
         self._session_cm = SessionContextManager(session_factory)
+        self._actor_names = None
+        self._director_names = None
+        self._actor_trigrams = None
+        self._costar_graph = None
+        self._facet_index = None
+        self._similarity_index = None
+        self._name_indexes_generation = 0
 
     def close_session(self):
         self._session_cm.close_current_session()
@@ -70,18 +88,32 @@ class SqlAlchemyRepository(AbstractRepository):
             scm.session.add(user)
             scm.commit()
 
-    def get_user(self, nusername) -> User:
-        nusername = nusername.lower()
-        users = self._session_cm.session.query(User).all()
-        for user in users:
-            if user.username == nusername:
+    def get_user(self, username) -> User:
+        # Found through the unique index on normalized_username. The ids of Users found are remembered for the
+        # session, which is the request's, so finding a User again takes it from the session's identity map.
+        normalized_username = orm.normalize_username(username)
+        session = self._session_cm.session
+        user_ids = session.info.setdefault('user_ids', dict())
+        if normalized_username in user_ids:
+            user = session.query(User).get(user_ids[normalized_username])
+            if user is not None:
                 return user
-        return None
+        user = session.query(User).filter(orm.users.c.normalized_username == normalized_username).one_or_none()
+        if user is not None:
+            user_ids[normalized_username] = user.id
+        return user
 
     def add_movie(self, movie: Movie):
         with self._session_cm as scm:
             scm.session.add(movie)
+            scm.session.flush()
+            term_records, document_records = search_records([(movie.id, movie.title, movie.description)])
+            if len(term_records) > 0:
+                scm.session.execute(INSERT_SEARCH_TERMS, term_records)
+            scm.session.execute(INSERT_SEARCH_DOCUMENTS, document_records)
             scm.commit()
+        # The name, co-star, facet and similarity indexes are built again on next use, with the movie.
+        self.clear_name_indexes()
 
     def get_movie(self, id: int) -> Movie:
         movie = None
@@ -93,9 +125,152 @@ class SqlAlchemyRepository(AbstractRepository):
 
         return movie
 
+    def get_actor_names_by_prefix(self, prefix: str, limit: int) -> List[str]:
+        actor_names = self._actor_names
+        if actor_names is None:
+            actor_names, director_names, actor_trigrams = self._build_name_indexes()
+        return actor_names.complete(prefix, limit)
+
+    def get_director_names_by_prefix(self, prefix: str, limit: int) -> List[str]:
+        director_names = self._director_names
+        if director_names is None:
+            actor_names, director_names, actor_trigrams = self._build_name_indexes()
+        return director_names.complete(prefix, limit)
+
+    def _build_name_indexes(self):
+        # Actors and directors are stored as text on the movies table, so the prefix indexes are built from one pass
+        # over those two columns, on first use.
+        generation = self._name_indexes_generation
+        actor_names = PrefixIndex()
+        director_names = PrefixIndex()
+        actor_trigrams = TrigramIndex()
+        rows = self._session_cm.session.execute('SELECT director, actors FROM movies').fetchall()
+        for director, actors in rows:
+            if director:
+                director_names.add(director.strip())
+            for actor in split_actors(actors):
+                actor_names.add(actor)
+                actor_trigrams.add(actor)
+        if generation != self._name_indexes_generation:
+            # The movies were reloaded meanwhile; use the indexes for this call only.
+            return actor_names, director_names, actor_trigrams
+        self._actor_names = actor_names
+        self._director_names = director_names
+        self._actor_trigrams = actor_trigrams
+        return actor_names, director_names, actor_trigrams
+
+    def clear_name_indexes(self):
+        # Call when the movies table changes; the indexes are built again on next use.
+        self._name_indexes_generation += 1
+        self._actor_names = None
+        self._director_names = None
+        self._actor_trigrams = None
+        self._costar_graph = None
+        self._facet_index = None
+        self._similarity_index = None
+
+    def actors_worked_together(self, actor_name: str, colleague_name: str) -> bool:
+        return self._get_costar_graph().worked_with(actor_name, colleague_name)
+
+    def get_costar_path(self, actor_name: str, colleague_name: str, max_depth: int = None):
+        return self._get_costar_graph().path(actor_name, colleague_name, max_depth)
+
+    def _get_costar_graph(self) -> CoStarGraph:
+        # Built from one pass over the actors column on first use, like the name indexes.
+        graph = self._costar_graph
+        if graph is not None:
+            return graph
+        generation = self._name_indexes_generation
+        movie_ids_by_actor = dict()
+        rows = self._session_cm.session.execute('SELECT id, actors FROM movies ORDER BY id ASC').fetchall()
+        for id, actors in rows:
+            for actor in split_actors(actors):
+                movie_ids_by_actor.setdefault(actor, list()).append(id)
+        graph = CoStarGraph(movie_ids_by_actor)
+        if generation == self._name_indexes_generation:
+            self._costar_graph = graph
+        return graph
+
+    def get_faceted_movie_ids(self, all_of: dict = None, any_of: dict = None, none_of: dict = None,
+                              facet_limit: int = 10) -> FacetResult:
+        try:
+            return self._get_facet_index().query(all_of, any_of, none_of, facet_limit)
+        except KeyError as error:
+            raise RepositoryException(f'Movies have no facet {error}')
+
+    def _get_facet_index(self) -> FacetIndex:
+        # Built from one pass over the movies table on first use, like the co-star graph.
+        index = self._facet_index
+        if index is not None:
+            return index
+        generation = self._name_indexes_generation
+        movie_ids = list()
+        movie_ids_by_value = {'genre': dict(), 'year': dict(), 'director': dict(), 'actor': dict()}
+        rows = self._session_cm.session.execute(
+            'SELECT id, genres, director, actors, release_year FROM movies ORDER BY id ASC').fetchall()
+        for id, genres, director, actors, release_year in rows:
+            movie_ids.append(id)
+            for genre in dict.fromkeys(genre.strip() for genre in (genres or '').split(',')):
+                if genre != '':
+                    movie_ids_by_value['genre'].setdefault(genre, list()).append(id)
+            if release_year is not None:
+                movie_ids_by_value['year'].setdefault(release_year, list()).append(id)
+            if director is not None and director.strip() != '':
+                movie_ids_by_value['director'].setdefault(director.strip(), list()).append(id)
+            for actor in dict.fromkeys(split_actors(actors)):
+                movie_ids_by_value['actor'].setdefault(actor, list()).append(id)
+        index = FacetIndex(movie_ids, movie_ids_by_value)
+        if generation == self._name_indexes_generation:
+            self._facet_index = index
+        return index
+
+    def get_similar_movie_ids(self, movie_id: int, limit: int):
+        return self._get_similarity_index().similar_movie_ids(movie_id, limit)
+
+    def _get_similarity_index(self) -> SimilarityIndex:
+        # Built from one pass over the genres and actors columns on first use, like the co-star graph.
+        index = self._similarity_index
+        if index is not None:
+            return index
+        generation = self._name_indexes_generation
+        movie_ids = list()
+        movie_ids_by_feature = dict()
+        rows = self._session_cm.session.execute('SELECT id, genres, actors FROM movies ORDER BY id ASC').fetchall()
+        for id, genres, actors in rows:
+            movie_ids.append(id)
+            genre_names = [genre.strip() for genre in (genres or '').split(',') if genre.strip() != '']
+            for feature in dict.fromkeys([('genre', name) for name in genre_names] +
+                                         [('actor', name) for name in split_actors(actors)]):
+                movie_ids_by_feature.setdefault(feature, list()).append(id)
+        index = SimilarityIndex(movie_ids, movie_ids_by_feature.values())
+        if generation == self._name_indexes_generation:
+            self._similarity_index = index
+        return index
+
     def get_movie_ids_for_title(self, title: str):
-        movies = self._session_cm.session.query(Movie).filter(Movie._Movie__id.in_(title)).all()
-        return [movie.id for movie in movies]
+        rows = self._session_cm.session.query(Movie._Movie__id).filter(Movie._Movie__title == title).order_by(
+            Movie._Movie__id).all()
+        return [row[0] for row in rows]
+
+    def search_movie_ids(self, query: str, offset: int, limit: int):
+        # Ranked with BM25 over the search_terms and search_documents tables, as the memory repository's SearchIndex
+        # ranks its Movies. Each query term's postings are read along the search_terms primary key.
+        session = self._session_cm.session
+        postings = list()
+        for term in set(tokenize(query)):
+            rows = session.execute(
+                'SELECT search_terms.movie_id, search_terms.frequency, search_documents.length FROM search_terms '
+                'JOIN search_documents ON search_documents.movie_id = search_terms.movie_id WHERE search_terms.term = '
+                ':term', {'term': term}).fetchall()
+            if len(rows) > 0:
+                columns = np.array(rows, dtype=np.float64)
+                postings.append((columns[:, 0].astype(np.int64), columns[:, 1], columns[:, 2]))
+        if len(postings) == 0:
+            return list(), 0
+
+        document_count, total_length = session.execute(
+            'SELECT COUNT(*), SUM(length) FROM search_documents').fetchone()
+        return rank(postings, document_count, total_length, offset, limit)
 
     def get_id_of_previous_movie(self, movie: Movie):
         return movie.id - 1
@@ -112,6 +287,41 @@ class SqlAlchemyRepository(AbstractRepository):
             movies = self._session_cm.session.query(Movie).filter(Movie._Movie__release_year == release_year).all()
             return movies
 
+    def get_movie_ids_by_release_year_range(self, start_year: int, end_year: int) -> List[int]:
+        rows = self._session_cm.session.query(Movie._Movie__id).filter(
+            Movie._Movie__release_year.between(start_year, end_year)).order_by(
+            Movie._Movie__release_year, Movie._Movie__id).all()
+        return [row[0] for row in rows]
+
+    def get_top_movie_ids(self, score: str, limit: int, genre_name: str = None, release_year: int = None):
+        if score not in SCORE_NAMES:
+            raise RepositoryException(f'Movies cannot be ranked by {score}')
+        # With an index on the score column, SQLite reads the movies in score order and stops after limit matches.
+        conditions = [f'{score} IS NOT NULL']
+        parameters = {'limit': limit}
+        if genre_name is not None:
+            conditions.append('id IN (SELECT movie_genres.movie_id FROM movie_genres JOIN genres '
+                              'ON genres.id = movie_genres.genre_id WHERE genres.genre_name = :genre_name)')
+            parameters['genre_name'] = genre_name
+        if release_year is not None:
+            conditions.append('release_year = :release_year')
+            parameters['release_year'] = release_year
+        rows = self._session_cm.session.execute(
+            f'SELECT id FROM movies WHERE {" AND ".join(conditions)} ORDER BY {score} DESC, id ASC LIMIT :limit',
+            parameters
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_previous_release_year(self, release_year: int):
+        previous_year = self._session_cm.session.query(func.max(Movie._Movie__release_year)).filter(
+            Movie._Movie__release_year < release_year).scalar()
+        return previous_year
+
+    def get_next_release_year(self, release_year: int):
+        next_year = self._session_cm.session.query(func.min(Movie._Movie__release_year)).filter(
+            Movie._Movie__release_year > release_year).scalar()
+        return next_year
+
     def get_number_of_movies(self):
         number_of_movies = self._session_cm.session.query(Movie).count()
         return number_of_movies
@@ -128,9 +338,25 @@ class SqlAlchemyRepository(AbstractRepository):
         movies = self._session_cm.session.query(Movie).filter(Movie._Movie__id.in_(id_list)).all()
         return movies
 
-    def get_movie_ids_by_actor(self, actors):
-        movies = self._session_cm.session.query(Movie).filter(Movie._Movie__id.in_(actors)).all()
-        return [movie.id for movie in movies]
+    def get_movie_ids_by_actor(self, actor_name: str):
+        movie_ids = self._get_movie_ids_starring(actor_name)
+        if len(movie_ids) == 0:
+            # The name may be misspelled: fall back to the closest actor name, if any is close enough.
+            actor_trigrams = self._actor_trigrams
+            if actor_trigrams is None:
+                actor_names, director_names, actor_trigrams = self._build_name_indexes()
+            closest_names = actor_trigrams.closest(actor_name)
+            if closest_names:
+                movie_ids = self._get_movie_ids_starring(closest_names[0])
+        return movie_ids
+
+    def _get_movie_ids_starring(self, actor_name: str):
+        # Actors are stored as comma-separated text, so narrow the rows down in SQL and match whole names here.
+        rows = self._session_cm.session.execute(
+            'SELECT id, actors FROM movies WHERE actors LIKE :pattern ORDER BY id ASC',
+            {'pattern': f'%{actor_name}%'}
+        ).fetchall()
+        return [id for id, actors in rows if actor_name in split_actors(actors)]
 
     def get_movie_ids_by_genre(self, genre_name: str):
         movie_ids = []
@@ -154,6 +380,69 @@ class SqlAlchemyRepository(AbstractRepository):
 
         return movie_ids
 
+    def get_movie_ids_by_genre_page(self, genre_name: str, limit: int, after: int = None,
+                                    before: int = None) -> MoviePage:
+        # Seeks along the movie_genres_genre index, from the key, for the genre's movie ids.
+        return self._seek_movie_ids(
+            'SELECT movie_genres.movie_id FROM movie_genres JOIN genres ON genres.id = movie_genres.genre_id '
+            'WHERE genres.genre_name = :name', 'movie_genres.movie_id', {'name': genre_name}, limit, after, before)
+
+    def get_movie_ids_by_actor_page(self, actor_name: str, limit: int, after: int = None,
+                                    before: int = None) -> MoviePage:
+        page = self._seek_movie_ids_starring(actor_name, limit, after, before)
+        if len(page.movie_ids) == 0 and len(self._seek_movie_ids_starring(actor_name, 1).movie_ids) == 0:
+            # The name may be misspelled: fall back to the closest actor name, if any is close enough.
+            actor_trigrams = self._actor_trigrams
+            if actor_trigrams is None:
+                actor_names, director_names, actor_trigrams = self._build_name_indexes()
+            closest_names = actor_trigrams.closest(actor_name)
+            if closest_names:
+                page = self._seek_movie_ids_starring(closest_names[0], limit, after, before)
+        return page
+
+    def _seek_movie_ids_starring(self, actor_name: str, limit: int, after: int = None,
+                                 before: int = None) -> MoviePage:
+        # Actors are stored as comma-separated text, so rows are narrowed down in SQL, along the primary key from the
+        # key, and whole names are matched here.
+        return self._seek_movie_ids(
+            'SELECT id, actors FROM movies WHERE actors LIKE :pattern', 'id', {'pattern': f'%{actor_name}%'}, limit,
+            after, before, lambda row: actor_name in split_actors(row[1]))
+
+    def _seek_movie_ids(self, query: str, key: str, params: dict, limit: int, after: int = None, before: int = None,
+                        match=None) -> MoviePage:
+        # query selects movie ids, as its first column, with a WHERE clause; the page is read from an index on key,
+        # starting at after or before, and a second seek of one row finds whether there's a page on the other side.
+        # match, if given, filters the rows read, which are then read in batches until enough match.
+        def seek(operator: str, bound, count: int) -> List[int]:
+            order = 'ASC' if operator == '>' else 'DESC'
+            movie_ids = list()
+            while len(movie_ids) < count:
+                condition = f' AND {key} {operator} :bound' if bound is not None else ''
+                batch = count - len(movie_ids) if match is None else max(4 * count, 64)
+                rows = self._session_cm.session.execute(
+                    f'{query}{condition} ORDER BY {key} {order} LIMIT :batch',
+                    dict(params, bound=bound, batch=batch)).fetchall()
+                movie_ids.extend(row[0] for row in rows if match is None or match(row))
+                if len(rows) < batch:
+                    break
+                bound = rows[-1][0]
+            return movie_ids[:count]
+
+        if before is not None:
+            movie_ids = seek('<', before, limit + 1)
+            has_previous = len(movie_ids) > limit
+            movie_ids = movie_ids[:limit][::-1]
+            has_next = len(movie_ids) > 0 and len(seek('>', movie_ids[-1], 1)) > 0
+        else:
+            movie_ids = seek('>', after, limit + 1)
+            has_next = len(movie_ids) > limit
+            movie_ids = movie_ids[:limit]
+            has_previous = len(movie_ids) > 0 and len(seek('<', movie_ids[0], 1)) > 0
+
+        if len(movie_ids) == 0:
+            return MoviePage(movie_ids, None, None)
+        return MoviePage(movie_ids, movie_ids[0] if has_previous else None, movie_ids[-1] if has_next else None)
+
     def get_movies_by_genre(self, genre_name: str):
         movies = []
 
@@ -201,8 +490,94 @@ class SqlAlchemyRepository(AbstractRepository):
         super().add_review(review)
         with self._session_cm as scm:
             scm.session.add(review)
+            self._add_to_review_stats(scm.session, review)
             scm.commit()
 
+    def get_review_stats(self, movie_ids: List[int]) -> Dict[int, ReviewStats]:
+        review_stats = {movie_id: ReviewStats() for movie_id in movie_ids}
+        if len(review_stats) > 0:
+            rows = self._session_cm.session.execute(
+                select([orm.review_stats]).where(orm.review_stats.c.movie_id.in_(list(review_stats)))).fetchall()
+            for row in rows:
+                review_stats[row['movie_id']] = review_stats_from_row(row)
+        return review_stats
+
+    @staticmethod
+    def _add_to_review_stats(session, review: Review):
+        # Adds review to its movie's running totals in the review's transaction, inserting the totals if it's the
+        # movie's first review. The UPDATE takes the database's write lock, so no other review can insert them first.
+        table = orm.review_stats
+        values = {
+            'review_count': table.c.review_count + 1,
+            'latest_timestamp': case(
+                [(or_(table.c.latest_timestamp.is_(None), table.c.latest_timestamp < review.timestamp),
+                  review.timestamp)],
+                else_=table.c.latest_timestamp)
+        }
+        if review.rating is not None:
+            values['rating_count'] = table.c.rating_count + 1
+            values['rating_sum'] = table.c.rating_sum + review.rating
+            values[f'rating_{review.rating}'] = table.c[f'rating_{review.rating}'] + 1
+
+        result = session.execute(table.update().where(table.c.movie_id == review.movie.id).values(values))
+        if result.rowcount == 0:
+            review_stats = ReviewStats()
+            review_stats.add(review.rating, review.timestamp)
+            session.execute(table.insert().values(review_stats_row(review.movie.id, review_stats)))
+
+
+def review_stats_from_row(row) -> ReviewStats:
+    return ReviewStats(row['review_count'], row['rating_count'], row['rating_sum'],
+                       [row[f'rating_{rating}'] for rating in RATINGS], row['latest_timestamp'])
+
+
+def review_stats_row(movie_id: int, review_stats: ReviewStats) -> dict:
+    row = {
+        'movie_id': movie_id,
+        'review_count': review_stats.count,
+        'rating_count': review_stats.rating_count,
+        'rating_sum': review_stats.rating_sum,
+        'latest_timestamp': review_stats.latest
+    }
+    row.update((f'rating_{rating}', count) for rating, count in zip(RATINGS, review_stats.histogram))
+    return row
+
+
+# Totals the reviews of each reviewed movie into the review_stats table.
+SUM_REVIEW_STATS = f"""
+    INSERT INTO review_stats (
+    movie_id, review_count, rating_count, rating_sum, {', '.join(f'rating_{rating}' for rating in RATINGS)},
+    latest_timestamp)
+    SELECT movie_id, COUNT(*), COUNT(rating), COALESCE(SUM(rating), 0),
+    {', '.join(f'COUNT(CASE WHEN rating = {rating} THEN 1 END)' for rating in RATINGS)}, MAX(timestamp)
+    FROM reviews GROUP BY movie_id"""
+
+
+INSERT_SEARCH_TERMS = 'INSERT INTO search_terms (term, movie_id, frequency) VALUES (:term, :movie_id, :frequency)'
+INSERT_SEARCH_DOCUMENTS = 'INSERT INTO search_documents (movie_id, length) VALUES (:movie_id, :length)'
+
+
+def search_records(movie_rows) -> Tuple[List[dict], List[dict]]:
+    """ Returns the search_terms and search_documents records indexing (id, title, description) movie rows. """
+    term_records = list()
+    document_records = list()
+    for movie_id, title, description in movie_rows:
+        frequencies = term_frequencies(title, description)
+        term_records.extend({'term': term, 'movie_id': int(movie_id), 'frequency': frequency}
+                            for term, frequency in frequencies.items())
+        document_records.append({'movie_id': int(movie_id), 'length': sum(frequencies.values())})
+    return term_records, document_records
+
+
+def index_for_search(cursor, movie_rows):
+    term_records, document_records = search_records(movie_rows)
+    cursor.executemany(INSERT_SEARCH_TERMS, term_records)
+    cursor.executemany(INSERT_SEARCH_DOCUMENTS, document_records)
+
+
+def split_actors(actors: str):
+    return [actor.strip() for actor in (actors or '').split(',') if actor.strip() != '']
+
 
 def movie_record_generator(filename: str):
     with open(filename, mode='r', encoding='utf-8-sig') as infile:
@@ -220,7 +595,6 @@ def movie_record_generator(filename: str):
             # Strip any leading/trailing white space from data read.
             movie_data = [item.strip() for item in movie_data]
 
-            number_of_genres = len(movie_data) - 7
             movie_genres = movie_data[2].split(',')
 
             # Add any new genres; associate the current movie with genres.
@@ -229,8 +603,7 @@ def movie_record_generator(filename: str):
                     genres[genre] = list()
                 genres[genre].append(movie_key)
 
-            del movie_data[-number_of_genres:]
-            yield movie_data
+            yield movie_record(movie_data)
 
 
 def get_genre_records():
@@ -271,12 +644,16 @@ def generic_generator(filename, post_process=None):
             yield row
 
 
-def process_user(user_row):
-    user_row[2] = generate_password_hash(user_row[2])
-    return user_row
+def process_users(user_rows, password_workers: int = None):
+    user_rows = list(user_rows)
+    passwords = hash_passwords([user_row[2] for user_row in user_rows], password_workers)
+    for user_row, password in zip(user_rows, passwords):
+        user_row[2] = password
+        user_row.append(orm.normalize_username(user_row[1]))
+    return user_rows
 
 
-def populate(engine: Engine, data_path: str):
+def populate(engine: Engine, data_path: str, password_workers: int = None):
     conn = engine.raw_connection()
     cursor = conn.cursor()
 
@@ -285,9 +662,10 @@ def populate(engine: Engine, data_path: str):
 
     insert_movies = """
         INSERT INTO movies (
-        id, title, genres, description, director, actors, release_year)
-        VALUES (?, ?, ?, ?, ?, ?, ?)"""
+        id, title, genres, description, director, actors, release_year, rating, votes, revenue, metascore)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
     cursor.executemany(insert_movies, movie_record_generator(os.path.join(data_path, 'moviefile.csv')))
+    index_for_search(cursor, cursor.execute('SELECT id, title, description FROM movies').fetchall())
 
     insert_genres = """
         INSERT INTO genres (
@@ -303,9 +681,10 @@ def populate(engine: Engine, data_path: str):
 
     insert_users = """
         INSERT INTO users (
-        id, username, password)
-        VALUES (?, ?, ?)"""
-    cursor.executemany(insert_users, generic_generator(os.path.join(data_path, 'users.csv'), process_user))
+        id, username, password, normalized_username)
+        VALUES (?, ?, ?, ?)"""
+    cursor.executemany(insert_users, process_users(generic_generator(os.path.join(data_path, 'users.csv')),
+                                                   password_workers))
 
     insert_reviews = """
         INSERT INTO reviews (
@@ -313,5 +692,192 @@ def populate(engine: Engine, data_path: str):
         VALUES (?, ?, ?, ?, ?)"""
     cursor.executemany(insert_reviews, generic_generator(os.path.join(data_path, 'reviews.csv')))
 
+    cursor.execute(SUM_REVIEW_STATS)
+
     conn.commit()
     conn.close()
+
+
+def movie_record(row: List[str]) -> list:
+    # The fields of a movie file row stored in the movies table: Rank, Title, Genre, Description, Director, Actors and
+    # Year as text, then Rating, Votes, Revenue (Millions) and Metascore as numbers, or None when unknown.
+    return row[:7] + [parse_number(row[8], float), parse_number(row[9], int), parse_number(row[10], float),
+                      parse_number(row[11], int)]
+
+
+def record_digest(record: list) -> bytes:
+    # Digests a movies table record the same way whether it was read from the table or made by movie_record().
+    return row_digest(['' if value is None else str(value) for value in record])
+
+
+def add_score_columns(engine: Engine) -> bool:
+    """ Adds the score columns, and their indexes, to a movies table made before they existed.
+
+    Returns True if any column was added. The scores of the movies already stored are then unknown until the movies
+    are reloaded from the movie file.
+    """
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        existing_columns = {row[1] for row in cursor.execute('PRAGMA table_info(movies)').fetchall()}
+        added = False
+        for column in orm.movies.c:
+            if column.name not in existing_columns:
+                cursor.execute(f'ALTER TABLE movies ADD COLUMN {column.name} {column.type.compile(engine.dialect)}')
+                added = True
+        for index in orm.movies.indexes:
+            columns = ', '.join(column.name for column in index.columns)
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {index.name} ON movies ({columns})')
+        conn.commit()
+    finally:
+        conn.close()
+    return added
+
+
+def add_normalized_usernames(engine: Engine) -> bool:
+    """ Adds the users' normalized_username column, filled in from their usernames, to a database made before it
+    existed. Its index is added by add_indexes().
+
+    Returns True if the column was added.
+    """
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        existing_columns = {row[1] for row in cursor.execute('PRAGMA table_info(users)').fetchall()}
+        added = 'normalized_username' not in existing_columns
+        if added:
+            column = orm.users.c.normalized_username
+            cursor.execute(f'ALTER TABLE users ADD COLUMN {column.name} {column.type.compile(engine.dialect)}')
+            cursor.executemany('UPDATE users SET normalized_username = ? WHERE id = ?', [
+                (orm.normalize_username(username), id)
+                for id, username in cursor.execute('SELECT id, username FROM users').fetchall()
+            ])
+        conn.commit()
+    finally:
+        conn.close()
+    return added
+
+
+def add_indexes(engine: Engine):
+    """ Adds any of the tables' indexes missing from a database made before they existed. """
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        for table in orm.metadata.sorted_tables:
+            for index in table.indexes:
+                columns = ', '.join(column.name for column in index.columns)
+                unique = 'UNIQUE ' if index.unique else ''
+                cursor.execute(f'CREATE {unique}INDEX IF NOT EXISTS {index.name} ON {table.name} ({columns})')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def add_review_stats(engine: Engine) -> bool:
+    """ Adds the reviews' rating column, and the review_stats table totalling the reviews, to a database made before
+    they existed.
+
+    Returns True if the review_stats table was added.
+    """
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        existing_columns = {row[1] for row in cursor.execute('PRAGMA table_info(reviews)').fetchall()}
+        if 'rating' not in existing_columns:
+            cursor.execute(f'ALTER TABLE reviews ADD COLUMN rating {orm.reviews.c.rating.type.compile(engine.dialect)}')
+        added = len(cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'review_stats'").fetchall()) == 0
+        if added:
+            cursor.execute(str(CreateTable(orm.review_stats).compile(engine)))
+            cursor.execute(SUM_REVIEW_STATS)
+        conn.commit()
+    finally:
+        conn.close()
+    return added
+
+
+def add_search_index(engine: Engine) -> bool:
+    """ Adds the search_terms and search_documents tables, indexing the movies stored, to a database made before they
+    existed.
+
+    Returns True if the tables were added.
+    """
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        existing_tables = {row[0] for row in cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()}
+        added = not {'search_terms', 'search_documents'} <= existing_tables
+        if added:
+            for table in (orm.search_terms, orm.search_documents):
+                cursor.execute(f'DROP TABLE IF EXISTS {table.name}')
+                cursor.execute(str(CreateTable(table).compile(engine)))
+            index_for_search(cursor, cursor.execute('SELECT id, title, description FROM movies').fetchall())
+        conn.commit()
+    finally:
+        conn.close()
+    return added
+
+
+def reload_movies(engine: Engine, data_path: str, repo: SqlAlchemyRepository = None) -> CatalogChanges:
+    """ Brings the movies in the database in line with a changed moviefile.csv, and returns the changes made.
+
+    Rows are matched to movies by Rank, and only the movies whose rows were added, changed or removed are inserted,
+    updated or deleted, along with their genres; deleted movies take their reviews with them. All changes are made in
+    one transaction, which takes the database's write lock before reading, so requests being served see the movies
+    either before or after the reload, and concurrent reloads apply one after the other.
+    """
+    rows = read_movie_rows(data_path)
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+
+        stored_rows = cursor.execute(
+            'SELECT id, title, genres, description, director, actors, release_year, rating, votes, revenue, metascore '
+            'FROM movies').fetchall()
+        digests = {stored_row[0]: record_digest(stored_row) for stored_row in stored_rows}
+        changes = diff_movie_rows(digests, rows, lambda row: record_digest(movie_record(row)))
+
+        for movie_id in changes.deleted + [int(row[0]) for row in changes.updated]:
+            cursor.execute('DELETE FROM search_terms WHERE movie_id = ?', (movie_id,))
+            cursor.execute('DELETE FROM search_documents WHERE movie_id = ?', (movie_id,))
+
+        for movie_id in changes.deleted:
+            cursor.execute('DELETE FROM movie_genres WHERE movie_id = ?', (movie_id,))
+            cursor.execute('DELETE FROM reviews WHERE movie_id = ?', (movie_id,))
+            cursor.execute('DELETE FROM review_stats WHERE movie_id = ?', (movie_id,))
+            cursor.execute('DELETE FROM movies WHERE id = ?', (movie_id,))
+
+        for row in changes.updated:
+            record = movie_record(row)
+            cursor.execute("""
+                UPDATE movies SET title = ?, genres = ?, description = ?, director = ?, actors = ?, release_year = ?,
+                rating = ?, votes = ?, revenue = ?, metascore = ?
+                WHERE id = ?""", (*record[1:], record[0]))
+            cursor.execute('DELETE FROM movie_genres WHERE movie_id = ?', (record[0],))
+
+        cursor.executemany("""
+            INSERT INTO movies (
+            id, title, genres, description, director, actors, release_year, rating, votes, revenue, metascore)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", [movie_record(row) for row in changes.inserted])
+        index_for_search(cursor, [(row[0], row[1], row[3]) for row in changes.updated + changes.inserted])
+
+        genre_ids = dict(cursor.execute('SELECT genre_name, id FROM genres').fetchall())
+        for row in changes.updated + changes.inserted:
+            for genre_name in row[2].split(','):
+                if genre_name not in genre_ids:
+                    cursor.execute('INSERT INTO genres (genre_name) VALUES (?)', (genre_name,))
+                    genre_ids[genre_name] = cursor.lastrowid
+                cursor.execute('INSERT INTO movie_genres (movie_id, genre_id) VALUES (?, ?)',
+                               (row[0], genre_ids[genre_name]))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if repo is not None:
+        repo.clear_name_indexes()
+    return changes
@@ -0,0 +1,187 @@
+from collections import namedtuple
+from typing import Iterable, List, Mapping
+
+import numpy as np
+
+# The dimensions Movies can be filtered and counted by.
+FACET_NAMES = ('genre', 'year', 'director', 'actor')
+
+# The ids of the Movies a query matched, in ascending order, and for each facet the most common values among those
+# Movies, as (value, number of Movies) pairs.
+FacetResult = namedtuple('FacetResult', ('movie_ids', 'facet_counts'))
+
+WORD = np.dtype('<u8')
+
+
+class FacetIndex:
+    """ Sets of Movie ids per facet value, for filtering Movies on several facets at once and counting the results.
+
+    Each value of a facet (a genre name, a release year, a director or an actor name) has the set of ids of its
+    Movies, in whichever of two forms is smaller: a sorted array of ids for a value with few Movies, like most actors,
+    or a bitset with one bit per id, packed into 64-bit words, for a value with many, like a genre or a year. A query
+    starts from its smallest array and tests the candidates against the other sets, so it costs about the size of
+    that array; only a query of bitsets alone works on whole bitsets, a word at a time.
+
+    An index is built in one pass over the catalog's inverted indexes, and is never changed afterwards.
+    """
+
+    def __init__(self, movie_ids: Iterable[int], movie_ids_by_value: Mapping[str, Mapping[object, Iterable[int]]]):
+        ids = np.asarray(movie_ids, dtype=np.int64)
+        self._size = int(ids.max()) + 1 if len(ids) > 0 else 0
+        # An array of ids takes less memory than a bitset below this length.
+        self._sparse_limit = max(self._size // 32, 1)
+        self._universe = self._bitset(ids)
+
+        # For each facet: the values in code order, their codes, the ids of every value one after the other, where
+        # each value's ids start, the bitsets of values with many Movies by code, and, in compressed sparse row form,
+        # the codes of each Movie's values.
+        self._values = dict()
+        self._codes = dict()
+        self._value_ids = dict()
+        self._value_offsets = dict()
+        self._bitsets = dict()
+        self._movie_offsets = dict()
+        self._movie_codes = dict()
+        for facet in FACET_NAMES:
+            self._add_facet(facet, movie_ids_by_value.get(facet, dict()))
+
+    def _add_facet(self, facet: str, movie_ids_by_value: Mapping[object, Iterable[int]]):
+        values = list(movie_ids_by_value)
+        value_ids, counts = list(), list()
+        for value_movie_ids in movie_ids_by_value.values():
+            value_ids.extend(value_movie_ids)
+            counts.append(len(value_movie_ids))
+        value_ids = np.array(value_ids, dtype=np.int64)
+        value_offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(counts, out=value_offsets[1:])
+
+        self._values[facet] = values
+        self._codes[facet] = {value: code for code, value in enumerate(values)}
+        self._value_ids[facet] = value_ids
+        self._value_offsets[facet] = value_offsets
+        self._bitsets[facet] = {
+            int(code): self._bitset(value_ids[value_offsets[code]:value_offsets[code + 1]])
+            for code in np.flatnonzero(np.diff(value_offsets) >= self._sparse_limit)
+        }
+
+        codes = np.repeat(np.arange(len(values), dtype=np.int32), counts)
+        order = np.argsort(value_ids, kind='stable')
+        self._movie_codes[facet] = codes[order]
+        movie_offsets = np.zeros(self._size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(value_ids, minlength=self._size), out=movie_offsets[1:])
+        self._movie_offsets[facet] = movie_offsets
+
+    def __len__(self):
+        return int(self._count(self._universe))
+
+    def values(self, facet: str) -> List:
+        return self._values[facet]
+
+    def movie_ids(self, facet: str, value) -> np.ndarray:
+        """ Returns the set of ids of the Movies with value, as a sorted array of ids or as a bitset. """
+        code = self._codes[facet].get(value)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        bitset = self._bitsets[facet].get(code)
+        if bitset is not None:
+            return bitset
+        offsets = self._value_offsets[facet]
+        return self._value_ids[facet][offsets[code]:offsets[code + 1]]
+
+    def query(self, all_of: Mapping[str, Iterable] = None, any_of: Mapping[str, Iterable] = None,
+              none_of: Mapping[str, Iterable] = None, facet_limit: int = 10) -> FacetResult:
+        """ Returns the Movies matching facet filters, and the most common values of each facet among them.
+
+        Each filter maps facet names to values. A Movie matches if it has every value in all_of, at least one of the
+        values of each facet in any_of, and none of the values in none_of. Unknown facet names raise a KeyError.
+        """
+        # Each group is a set of alternatives, any of which a Movie must have.
+        groups = [[self.movie_ids(facet, value)] for facet, values in (all_of or dict()).items() for value in values]
+        groups.extend([self.movie_ids(facet, value) for value in values]
+                      for facet, values in (any_of or dict()).items() if len(values) > 0)
+        excluded = [self.movie_ids(facet, value) for facet, values in (none_of or dict()).items() for value in values]
+
+        sparse_groups = [group for group in groups if all(term.dtype != WORD for term in group)]
+        if len(sparse_groups) > 0:
+            # Start from the fewest candidates, and keep those every other group has.
+            first = min(sparse_groups, key=lambda group: sum(len(term) for term in group))
+            movie_ids = first[0] if len(first) == 1 else np.unique(np.concatenate(first))
+            for group in groups:
+                if group is not first:
+                    movie_ids = movie_ids[self._contains_any(group, movie_ids)]
+        else:
+            bitset = self._universe.copy()
+            for group in groups:
+                bitset &= self._union(group)
+            for term in excluded:
+                if term.dtype == WORD:
+                    bitset &= ~term
+            excluded = [term for term in excluded if term.dtype != WORD]
+            movie_ids = self._ids(bitset)
+        if len(excluded) > 0:
+            movie_ids = movie_ids[~self._contains_any(excluded, movie_ids)]
+
+        return FacetResult(movie_ids.tolist(), {facet: self._counts(facet, movie_ids, facet_limit)
+                                                for facet in FACET_NAMES})
+
+    def _counts(self, facet: str, movie_ids: np.ndarray, limit: int) -> list:
+        # Counts the values of the Movies' own lists of values, rather than intersecting the result with every value.
+        if limit <= 0:
+            return list()
+        offsets = self._movie_offsets[facet]
+        starts = offsets[movie_ids]
+        lengths = offsets[movie_ids + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        movie_codes = self._movie_codes[facet][positions]
+        if len(movie_codes) < len(self._values[facet]) // 16:
+            # A few Movies have few values, which sort faster than counting every value of the facet.
+            codes, counts = np.unique(movie_codes, return_counts=True)
+        else:
+            counts = np.bincount(movie_codes, minlength=len(self._values[facet]))
+            codes = np.flatnonzero(counts)
+            counts = counts[codes]
+
+        if len(codes) > limit:
+            # Only the codes tied with the limit-th count or above need sorting.
+            threshold = np.partition(counts, len(codes) - limit)[len(codes) - limit]
+            codes, counts = codes[counts >= threshold], counts[counts >= threshold]
+        # Most Movies first, then in the order the values were given.
+        order = np.lexsort((codes, -counts))[:limit]
+        values = self._values[facet]
+        return [(values[code], int(count)) for code, count in zip(codes[order], counts[order])]
+
+    def _union(self, terms: List[np.ndarray]) -> np.ndarray:
+        if len(terms) == 1 and terms[0].dtype == WORD:
+            return terms[0]
+        bitset = np.zeros_like(self._universe)
+        for term in terms:
+            bitset |= term if term.dtype == WORD else self._bitset(term)
+        return bitset
+
+    def _contains_any(self, terms: List[np.ndarray], movie_ids: np.ndarray) -> np.ndarray:
+        mask = self._contains(terms[0], movie_ids)
+        for term in terms[1:]:
+            mask |= self._contains(term, movie_ids)
+        return mask
+
+    def _contains(self, term: np.ndarray, movie_ids: np.ndarray) -> np.ndarray:
+        # Returns a boolean mask of the movie_ids in the set term.
+        if term.dtype == WORD:
+            return ((term[movie_ids >> 6] >> (movie_ids & 63).astype(WORD)) & WORD.type(1)).astype(bool)
+        if len(term) == 0:
+            return np.zeros(len(movie_ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(term, movie_ids), len(term) - 1)
+        return term[positions] == movie_ids
+
+    def _bitset(self, movie_ids: np.ndarray) -> np.ndarray:
+        bits = np.zeros(64 * ((self._size + 63) // 64), dtype=bool)
+        bits[movie_ids] = True
+        return np.packbits(bits, bitorder='little').view(WORD)
+
+    @staticmethod
+    def _ids(bitset: np.ndarray) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(bitset.view(np.uint8), bitorder='little').view(bool))
+
+    @staticmethod
+    def _count(bitset: np.ndarray) -> int:
+        return int(np.unpackbits(bitset.view(np.uint8)).sum())
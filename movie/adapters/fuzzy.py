@@ -0,0 +1,115 @@
+import copy
+import heapq
+from typing import List
+
+from movie.adapters.versioning import SharedDict, SharedList
+
+
+def trigrams(text: str) -> set:
+    # Padding makes the first and last letters count as much as the ones in between.
+    padded = f'  {text.lower()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(source: str, target: str) -> int:
+    """ Returns the Levenshtein distance between two strings. """
+    if len(source) < len(target):
+        source, target = target, source
+
+    previous = list(range(len(target) + 1))
+    for i, source_char in enumerate(source, 1):
+        current = [i]
+        for j, target_char in enumerate(target, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (source_char != target_char)))
+        previous = current
+    return previous[-1]
+
+
+class TrigramIndex:
+    """ Finds the indexed strings closest to a possibly misspelled query.
+
+    Candidates are the strings sharing the most trigrams with the query, found through per-trigram posting lists, so
+    only strings that look alike are ever compared. The best MAX_CANDIDATES of those are re-ranked by edit distance.
+    Trigrams shared by more than COMMON_TRIGRAM_POSTINGS strings are skipped when the query has rarer ones, which
+    keeps the work per query bounded as the index grows.
+    """
+
+    MAX_CANDIDATES = 50
+    COMMON_TRIGRAM_POSTINGS = 5000
+
+    def __init__(self):
+        self._texts = SharedList()
+        self._positions = SharedDict(ordered=False)
+        self._postings = SharedDict(ordered=False)
+        # Trigrams whose posting lists may be shared with a copy of this index, and must be copied before a change.
+        self._shared_postings = False
+        self._owned_postings = set()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __copy__(self):
+        # The copy shares the texts, the positions and the posting lists until it adds to them.
+        index = TrigramIndex()
+        index._texts = copy.copy(self._texts)
+        index._positions = copy.copy(self._positions)
+        index._postings = copy.copy(self._postings)
+        index._shared_postings = True
+        return index
+
+    def add(self, text: str):
+        if text is None or text in self._positions:
+            return
+
+        position = len(self._texts)
+        self._texts.append(text)
+        self._positions[text] = position
+        for trigram in trigrams(text):
+            postings = self._postings.get(trigram)
+            if postings is None:
+                postings = self._postings[trigram] = SharedList()
+            elif self._shared_postings and trigram not in self._owned_postings:
+                postings = self._postings[trigram] = copy.copy(postings)
+            if self._shared_postings:
+                self._owned_postings.add(trigram)
+            postings.append(position)
+
+    def remove(self, text: str):
+        # The posting lists keep the position, which is skipped from now on; adding the text again gives it a new one.
+        position = self._positions.pop(text, None)
+        if position is not None:
+            self._texts[position] = None
+
+    def closest(self, query: str, limit: int = 1, max_distance: int = None) -> List[str]:
+        """ Returns up to limit indexed strings, closest to query first.
+
+        Strings more than max_distance edits away are left out. By default a quarter of the query's length, and at
+        least one edit, is allowed.
+        """
+        if query is None or query.strip() == '':
+            return list()
+        query = query.strip()
+        if max_distance is None:
+            max_distance = max(1, len(query) // 4)
+
+        postings = [self._postings[trigram] for trigram in trigrams(query) if trigram in self._postings]
+        rare_postings = [positions for positions in postings if len(positions) <= self.COMMON_TRIGRAM_POSTINGS]
+        if len(rare_postings) > 0:
+            postings = rare_postings
+
+        shared = dict()
+        for positions in postings:
+            for position in positions:
+                shared[position] = shared.get(position, 0) + 1
+
+        candidates = heapq.nlargest(self.MAX_CANDIDATES, shared, key=shared.get)
+        ranked = list()
+        for position in candidates:
+            text = self._texts[position]
+            if text is None:
+                continue
+            distance = edit_distance(query.lower(), text.lower())
+            if distance <= max_distance:
+                ranked.append((distance, text))
+        ranked.sort()
+        return [text for distance, text in ranked[:limit]]
@@ -0,0 +1,226 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from typing import Callable, Iterator, Tuple
+
+
+# A journal file is a sequence of records, each a header of the record's sequence number, the length of its payload
+# and the CRC-32 of the payload, followed by the payload: the record as UTF-8 JSON. Sequence numbers start at 1 and
+# increase by one per record, across the journal and its archive.
+RECORD_HEADER = struct.Struct('>QII')
+
+ARCHIVE_SUFFIX = '.archive'
+
+
+class JournalException(Exception):
+    pass
+
+
+def read_records(path: str, after: int = 0) -> Iterator[Tuple[int, dict, int]]:
+    """ Yields the sequence number, record and end offset of each record in a journal file, in order.
+
+    Records numbered after or lower are skipped without being decoded. Reading stops at the end of the file, or at
+    the first record that is incomplete or fails its checksum, as the last one does if a write was interrupted.
+    """
+    try:
+        infile = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with infile:
+        while True:
+            header = infile.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            sequence, length, checksum = RECORD_HEADER.unpack(header)
+            if sequence <= after:
+                infile.seek(length, os.SEEK_CUR)
+                if infile.tell() > os.fstat(infile.fileno()).st_size:
+                    return
+                continue
+
+            payload = infile.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                return
+            yield sequence, json.loads(payload.decode('utf-8')), infile.tell()
+
+
+def encode_record(sequence: int, record: dict) -> bytes:
+    payload = json.dumps(record, separators=(',', ':')).encode('utf-8')
+    return RECORD_HEADER.pack(sequence, len(payload), zlib.crc32(payload)) + payload
+
+
+class Journal:
+    """ An append-only write-ahead log of records, with group commit.
+
+    append() writes a record to the file and returns its sequence number, and sync(sequence) returns once that record
+    is on disk. Threads that call sync() while another thread's fsync is under way wait for it and, if their records
+    were written after it started, share the next one, so a burst of writers costs a few fsyncs rather than one each.
+
+    archive(sequence) moves the records up to sequence, once they are saved elsewhere, to an archive file next to the
+    journal, which keeps the journal itself short. Opening a journal cuts off a record left incomplete by a crash.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._archive_path = path + ARCHIVE_SUFFIX
+        self._condition = threading.Condition()
+
+        # Continue numbering from the last intact record of the journal, or else of its archive.
+        self._sequence, self._logged, end = 0, 0, 0
+        for self._sequence, record, end in read_records(self._archive_path):
+            pass
+        self._cut_off(self._archive_path, end)
+        end = 0
+        for self._sequence, record, end in read_records(path, self._sequence):
+            self._logged += 1
+        self._cut_off(path, end)
+
+        self._descriptor = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._synced = self._sequence
+        self._syncing = False
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def sequence(self) -> int:
+        # The sequence number of the last record appended.
+        return self._sequence
+
+    @property
+    def logged(self) -> int:
+        # The number of records in the journal, not counting archived ones.
+        return self._logged
+
+    def records(self, after: int = 0) -> Iterator[Tuple[int, dict]]:
+        """ Yields the sequence number and record of every record numbered above after, archived ones first. """
+        for path in (self._archive_path, self._path):
+            for sequence, record, end in read_records(path, after):
+                after = sequence
+                yield sequence, record
+
+    def continue_from(self, sequence: int):
+        # Number the next record after sequence, at least.
+        with self._condition:
+            self._sequence = max(self._sequence, sequence)
+            self._synced = max(self._synced, sequence)
+
+    def append(self, record: dict) -> int:
+        with self._condition:
+            data = encode_record(self._sequence + 1, record)
+            end = os.lseek(self._descriptor, 0, os.SEEK_END)
+            try:
+                written = os.write(self._descriptor, data)
+                if written != len(data):
+                    raise OSError(f'Short write to journal {self._path}')
+            except OSError as error:
+                # Leave no partial record behind for the next one to follow.
+                os.ftruncate(self._descriptor, end)
+                raise JournalException(f'Journal {self._path} cannot be written: {error}')
+            self._sequence += 1
+            self._logged += 1
+            return self._sequence
+
+    def sync(self, sequence: int):
+        with self._condition:
+            while self._synced < sequence:
+                if self._syncing:
+                    self._condition.wait()
+                    continue
+
+                # Lead an fsync covering every record appended so far.
+                self._syncing = True
+                target = self._sequence
+                self._condition.release()
+                try:
+                    os.fsync(self._descriptor)
+                except OSError as error:
+                    raise JournalException(f'Journal {self._path} cannot be synced: {error}')
+                finally:
+                    self._condition.acquire()
+                    self._syncing = False
+                    self._condition.notify_all()
+                self._synced = max(self._synced, target)
+
+    def archive(self, sequence: int):
+        """ Moves the records numbered up to sequence from the journal to its archive. """
+        with self._condition:
+            while self._syncing:
+                self._condition.wait()
+
+            archived, kept = list(), list()
+            for record_sequence, record, end in read_records(self._path):
+                (archived if record_sequence <= sequence else kept).append(encode_record(record_sequence, record))
+            if len(archived) == 0:
+                return
+
+            # The archive is written first, so a crash in between leaves records in both files, never in neither;
+            # records are numbered, so a record found twice is read once.
+            with open(self._archive_path, 'ab') as outfile:
+                outfile.write(b''.join(archived))
+                outfile.flush()
+                os.fsync(outfile.fileno())
+
+            temporary_path = self._path + '.tmp'
+            with open(temporary_path, 'wb') as outfile:
+                outfile.write(b''.join(kept))
+                outfile.flush()
+                os.fsync(outfile.fileno())
+            os.replace(temporary_path, self._path)
+            self._sync_directory()
+
+            os.close(self._descriptor)
+            self._descriptor = os.open(self._path, os.O_RDWR | os.O_APPEND)
+            self._synced = self._sequence
+            self._logged = len(kept)
+
+    def close(self):
+        with self._condition:
+            os.close(self._descriptor)
+
+    @staticmethod
+    def _cut_off(path: str, end: int):
+        # Truncate a file after its last intact record, so the next record written follows it.
+        if os.path.exists(path) and os.path.getsize(path) > end:
+            os.truncate(path, end)
+
+    def _sync_directory(self):
+        # Make the rename itself durable.
+        descriptor = os.open(os.path.dirname(os.path.abspath(self._path)), os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+class JournalCompactor:
+    """ Runs compact() in a background thread whenever the journal holds compact_records or more records.
+
+    compact() is expected to save the repository's state and archive the records it covers. Only one compaction runs
+    at a time; a thread is started from whichever process appends, so a forked worker compacts its own journal.
+    """
+
+    def __init__(self, journal: Journal, compact: Callable[[], None], compact_records: int = 1000):
+        self._journal = journal
+        self._compact = compact
+        self._compact_records = compact_records
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def notify(self):
+        # Call after appending to the journal.
+        if self._journal.logged < self._compact_records:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._compact, name='journal-compactor', daemon=True)
+            self._thread.start()
+
+    def join(self):
+        thread = self._thread
+        if thread is not None:
+            thread.join()
@@ -1,76 +1,321 @@
 import csv
 import os
+from array import array
 
 from datetime import date, datetime
-from typing import List
+from typing import Dict, List
 
 from bisect import bisect, bisect_left, insort_left
-
-from werkzeug.security import generate_password_hash
-
-from movie.adapters.repository import AbstractRepository, RepositoryException
-from movie.domain.model import Movie, Director, User, Genre, Actor, WatchList, Review, add_review, make_genre_association
+from itertools import chain
+
+from movie.adapters.autocomplete import PrefixIndex
+from movie.adapters.catalog_reload import CatalogChanges, diff_movie_rows, parse_number, read_movie_rows, row_digest
+from movie.adapters.columnar import MovieColumns
+from movie.adapters.costar import CoStarGraph
+from movie.adapters.facets import FacetIndex, FacetResult
+from movie.adapters.fuzzy import TrigramIndex
+from movie.adapters.journal import Journal, JournalCompactor
+from movie.adapters.movie_file import MovieFile, LazyMovieList, LazyMovieIndex
+from movie.adapters.passwords import hash_passwords
+from movie.adapters.repository import AbstractRepository, MoviePage, RepositoryException, SCORE_NAMES, page_movie_ids
+from movie.adapters.review_stats import ReviewStats
+from movie.adapters.search import SearchIndex
+from movie.adapters.similarity import SimilarityIndex
+from movie.adapters.snapshot import SnapshotException, data_checksum, read_snapshot, write_snapshot
+from movie.adapters.versioning import CatalogVersion, SharedDict, SharedList, VersionedState, writes
+from movie.domain.model import Movie, Director, User, Genre, Actor, WatchList, Review, EntityRegistry, add_review, \
+    make_genre_association
 
 
 class MemoryRepository(AbstractRepository):
     # Movies ordered by Title, not id. id is assumed unique.
+    #
+    # The repository's lists and indexes live in a CatalogVersion, published through self._state. Methods that read
+    # take no lock: they work on the current version, which is never changed once published. Methods that add to the
+    # repository run one at a time, on a draft of the next version that shares every structure they don't touch, and
+    # publish it in one step; ids are allocated on the draft, so concurrent add_movie calls never share an id. The
+    # lists and dicts are SharedLists and SharedDicts, which the draft shares too, but for the parts it changes. Lists
+    # and indexes returned by read methods belong to a published version and must be treated as read-only.
 
     def __init__(self):
-        self._movies = list()
-        self._movies_title = list()
-        self._movies_index = dict()
-        self._actors = list()
-        self._users = list()
-        self._genres = list()
-        self._reviews = list()
-        self._directors = list()
-
-    def add_genre(self, genre: Genre):
+        self._state = VersionedState(CatalogVersion(
+            movies=SharedList(),
+            movies_title=SharedList(),
+            movies_index=SharedDict(),
+            actors=SharedList(),
+            users=SharedList(),
+            genres=SharedList(),
+            reviews=SharedList(),
+            directors=SharedList(),
+
+            # Secondary indexes, keyed by username and full name, kept in step with the lists above.
+            users_index=SharedDict(),
+            actors_index=SharedDict(),
+            directors_index=SharedDict(),
+
+            # Inverted indexes from actor, genre and director name to the ascending ids of their Movies.
+            movie_ids_by_actor=SharedDict(),
+            movie_ids_by_genre=SharedDict(),
+            movie_ids_by_director=SharedDict(),
+
+            # Release year index: the distinct years that have Movies, in ascending order, and the ids of each year's
+            # Movies.
+            release_years=SharedList(),
+            movie_ids_by_release_year=SharedDict(),
+
+            # ReviewStats of each reviewed Movie by id, updated as each Review is added.
+            review_stats=SharedDict(),
+
+            # Scalar Movie attributes in NumPy arrays, for vectorised filtering, sorting and aggregation.
+            columns=MovieColumns(),
+
+            # Exact titles and full-text search over titles and descriptions.
+            movie_ids_by_title=SharedDict(),
+            search_index=SearchIndex(),
+
+            # Actor and director names by prefix, for autocompletion.
+            actor_names=PrefixIndex(),
+            director_names=PrefixIndex(),
+
+            # Actor names and titles by trigram, to find the closest match to a misspelled query.
+            actor_trigrams=TrigramIndex(),
+            title_trigrams=TrigramIndex(),
+
+            # The co-star graph, built from movie_ids_by_actor on first use after the actors' Movies change.
+            costar_graph=None,
+
+            # Bitmaps for faceted queries, built from the inverted indexes on first use after the Movies change.
+            facet_index=None,
+
+            # The most similar Movies of each Movie, built from the genre and actor indexes on first use after the
+            # Movies change.
+            similarity_index=None,
+
+            # Set when Movies are made from the movie file on demand; see use_movie_file().
+            lazy_movies=None,
+
+            # The sequence number of the last journal record applied; see use_journal().
+            journal_sequence=0,
+
+            # A digest of the movie file row each Movie was made from, by id, to tell which rows a reload changes.
+            movie_digests=SharedDict()
+        ))
+
+        # Shared Actor, Director and Genre instances, one per name, used while loading Movies. Entities are only ever
+        # added to the registry, so it is shared by all versions.
+        self._registry = EntityRegistry()
+
+        self._journal = None
+        self._compactor = None
+
+    def __getattr__(self, name):
+        # Keeps the structures of the current version readable as the attributes they used to be, e.g. self._users.
+        state = vars(self).get('_state')
+        if state is None or not name.startswith('_') or name.startswith('__'):
+            raise AttributeError(name)
+        try:
+            return getattr(state.current(), name[1:])
+        except AttributeError:
+            raise AttributeError(name)
+
+    @writes
+    def add_genre(self, catalog: CatalogVersion, genre: Genre):
         super().add_genre(genre)
-        self._genres.append(genre)
+        catalog.mutable('genres').append(genre)
 
     def get_genres(self):
-        return self._genres
+        return self._state.current().genres
 
-    def add_review(self, review: Review):
+    @writes
+    def add_review(self, catalog: CatalogVersion, review: Review):
         super().add_review(review)
-        self._reviews.append(review)
+        catalog.mutable('reviews').append(review)
+        catalog.mutable_entry('review_stats', review.movie.id, ReviewStats).add(review.rating, review.timestamp)
+        if catalog.lazy_movies is not None:
+            catalog.lazy_movies.pin(review.movie)
+        self._journal_record(catalog, {
+            'type': 'review',
+            'username': review.user.username,
+            'movie_id': review.movie.id,
+            'review_text': review.review_text,
+            'rating': review.rating,
+            'timestamp': review.timestamp.isoformat()
+        })
 
     def get_reviews(self):
-        return self._reviews
+        return self._state.current().reviews
+
+    def get_review_stats(self, movie_ids: List[int]) -> Dict[int, ReviewStats]:
+        review_stats = self._state.current().review_stats
+        return {movie_id: review_stats.get(movie_id) or ReviewStats() for movie_id in movie_ids}
 
-    def add_user(self, user: User):
-        self._users.append(user)
+    @writes
+    def add_user(self, catalog: CatalogVersion, user: User):
+        catalog.mutable('users').append(user)
+        # The first User added under a username wins, matching a linear search over the users.
+        catalog.mutable('users_index').setdefault(user.username, user)
+        self._journal_record(catalog, {'type': 'user', 'username': user.username, 'password': user.password})
 
     def get_user(self, username) -> User:
-        return next((user for user in self._users if user.username == username), None)
+        return self._state.current().users_index.get(username)
 
-    def add_actor(self, actor: Actor):
-        self._actors.append(actor)
+    @writes
+    def add_actor(self, catalog: CatalogVersion, actor: Actor):
+        catalog.mutable('actors').append(actor)
+        catalog.mutable('actors_index').setdefault(actor.actor_full_name, actor)
+        catalog.mutable('actor_names').add(actor.actor_full_name)
+        catalog.mutable('actor_trigrams').add(actor.actor_full_name)
 
     def get_actor(self, actor_full_name):
-        return next((actor for actor in self._actors if actor.actor_full_name == actor_full_name), None)
+        return self._state.current().actors_index.get(actor_full_name)
 
     def get_actors(self):
-        return self._actors
+        return self._state.current().actors
 
-    def add_director(self, director: Director):
-        self._directors.append(director)
+    @writes
+    def add_director(self, catalog: CatalogVersion, director: Director):
+        catalog.mutable('directors').append(director)
+        catalog.mutable('directors_index').setdefault(director.director_full_name, director)
+        catalog.mutable('director_names').add(director.director_full_name)
 
     def get_director(self, director_full_name):
-        return next((director for director in self._directors if director.director_full_name == director_full_name),
-                    None)
-
-    def add_movie(self, movie: Movie):
-        movie.id = len(self._movies) + 1
-        self._movies.append(movie)
-        self._movies_title.append(movie)
+        return self._state.current().directors_index.get(director_full_name)
+
+    def get_actor_names_by_prefix(self, prefix: str, limit: int) -> List[str]:
+        return self._state.current().actor_names.complete(prefix, limit)
+
+    def get_director_names_by_prefix(self, prefix: str, limit: int) -> List[str]:
+        return self._state.current().director_names.complete(prefix, limit)
+
+    @writes
+    def add_movie(self, catalog: CatalogVersion, movie: Movie):
+        movie.id = catalog.movies[-1].id + 1 if len(catalog.movies) > 0 else 1
+        movies = catalog.mutable('movies')
+        movies.append(movie)
+        catalog.mutable('movies_title').append(movie)
+        if catalog.lazy_movies is not None:
+            # The draft has its own copy of the LazyMovieList, which the id index must read through.
+            catalog.replace('lazy_movies', movies)
+            catalog.replace('movies_index', LazyMovieIndex(movies))
+        else:
+            catalog.mutable('movies_index')[movie.id] = movie
+        self._index_movie(catalog, movie)
+
+    @writes
+    def index_movie(self, catalog: CatalogVersion, movie: Movie):
+        # Adds the Movie to every secondary index, without holding on to the Movie itself.
+        self._index_movie(catalog, movie)
+
+    def _index_movie(self, catalog: CatalogVersion, movie: Movie):
+        catalog.mutable('columns').append(movie)
+        insort_left(catalog.mutable_entry('movie_ids_by_title', movie.title), movie.id)
+        catalog.mutable('search_index').add(movie)
+        catalog.mutable('title_trigrams').add(movie.title)
+
+        for actor in movie.actors:
+            insort_left(catalog.mutable_entry('movie_ids_by_actor', actor.actor_full_name), movie.id)
+        if len(movie.actors) > 0:
+            catalog.replace('costar_graph', None)
+        for genre in movie.genres:
+            insort_left(catalog.mutable_entry('movie_ids_by_genre', genre.genre_name), movie.id)
+        if movie.director is not None:
+            insort_left(catalog.mutable_entry('movie_ids_by_director', movie.director.director_full_name), movie.id)
+        catalog.replace('facet_index', None)
+        catalog.replace('similarity_index', None)
+
+        if movie.release_year is not None:
+            if movie.release_year not in catalog.movie_ids_by_release_year:
+                insort_left(catalog.mutable('release_years'), movie.release_year)
+            insort_left(catalog.mutable_entry('movie_ids_by_release_year', movie.release_year), movie.id)
+
+    @writes
+    def put_movie(self, catalog: CatalogVersion, movie: Movie):
+        """ Adds movie under its own id, in place of the Movie with that id if there is one.
+
+        A replaced Movie's Reviews move to movie, but keep referring to the Movie they were written on, which has the
+        same id. Movies are kept in ascending id order.
+        """
+        if catalog.lazy_movies is not None:
+            raise RepositoryException('Movies made from the movie file on demand cannot be replaced')
+
+        movies = catalog.mutable('movies')
+        position = movie_position(movies, movie.id)
+        replaced_movie = catalog.movies_index.get(movie.id)
+        if replaced_movie is not None:
+            self._unindex_movie(catalog, replaced_movie)
+            movies[position] = movie
+            catalog.replace('movies_title', SharedList(stored_movie for stored_movie in catalog.movies_title
+                                                       if stored_movie is not replaced_movie))
+            for review in replaced_movie.reviews:
+                movie.add_review(review)
+        else:
+            movies.insert(position, movie)
+        catalog.mutable('movies_title').append(movie)
+        catalog.mutable('movies_index')[movie.id] = movie
+        self._index_movie(catalog, movie)
+
+    @writes
+    def remove_movie(self, catalog: CatalogVersion, movie_id: int):
+        # Removes the Movie with movie_id, if any, and its Reviews.
+        movie = catalog.movies_index.get(movie_id)
+        if movie is None:
+            return
+        if catalog.lazy_movies is not None:
+            raise RepositoryException('Movies made from the movie file on demand cannot be removed')
+
+        self._unindex_movie(catalog, movie)
+        del catalog.mutable('movies')[movie_position(catalog.movies, movie_id)]
+        del catalog.mutable('movies_index')[movie_id]
+        catalog.mutable('movie_digests').pop(movie_id, None)
+        catalog.replace('movies_title', SharedList(stored_movie for stored_movie in catalog.movies_title
+                                                   if stored_movie is not movie))
+        catalog.replace('reviews', SharedList(review for review in catalog.reviews if review.movie.id != movie_id))
+        catalog.mutable('review_stats').pop(movie_id, None)
+
+    def _unindex_movie(self, catalog: CatalogVersion, movie: Movie):
+        catalog.mutable('columns').remove(movie.id)
+        catalog.mutable('search_index').remove(movie.id)
+        self._remove_movie_id(catalog, 'movie_ids_by_title', movie.title, movie.id)
+        if movie.title not in catalog.movie_ids_by_title:
+            catalog.mutable('title_trigrams').remove(movie.title)
+
+        for actor in movie.actors:
+            self._remove_movie_id(catalog, 'movie_ids_by_actor', actor.actor_full_name, movie.id)
+        if len(movie.actors) > 0:
+            catalog.replace('costar_graph', None)
+        for genre in movie.genres:
+            self._remove_movie_id(catalog, 'movie_ids_by_genre', genre.genre_name, movie.id)
+        if movie.director is not None:
+            self._remove_movie_id(catalog, 'movie_ids_by_director', movie.director.director_full_name, movie.id)
+        catalog.replace('facet_index', None)
+        catalog.replace('similarity_index', None)
+
+        if movie.release_year is not None:
+            self._remove_movie_id(catalog, 'movie_ids_by_release_year', movie.release_year, movie.id)
+            if movie.release_year not in catalog.movie_ids_by_release_year:
+                catalog.mutable('release_years').remove(movie.release_year)
+
+    @staticmethod
+    def _remove_movie_id(catalog: CatalogVersion, name: str, key, movie_id: int):
+        # Removes movie_id from the ascending ids at key in the named index, and the key once it has no ids left.
+        if key not in getattr(catalog, name):
+            return
+        movie_ids = catalog.mutable_entry(name, key)
+        index = bisect_left(movie_ids, movie_id)
+        if index < len(movie_ids) and movie_ids[index] == movie_id:
+            del movie_ids[index]
+        if len(movie_ids) == 0:
+            del catalog.mutable(name)[key]
+
+    @writes
+    def set_movie_digest(self, catalog: CatalogVersion, movie_id: int, digest: bytes):
+        catalog.mutable('movie_digests')[movie_id] = digest
 
     def get_movie(self, id: int) -> Movie:
         movie = None
 
         try:
-            movie = self._movies[id - 1]
+            movie = self._state.current().movies_index[id]
         except KeyError:
             pass  # Ignore exception and return None.
         except IndexError:
@@ -82,7 +327,7 @@ class MemoryRepository(AbstractRepository):
         matching_movies = list()
 
         try:
-            for movie in self._movies:
+            for movie in self._state.current().movies:
                 if movie.title == title:
                     matching_movies.append(movie)
         except ValueError:
@@ -90,50 +335,109 @@ class MemoryRepository(AbstractRepository):
             pass
         return matching_movies
 
-    def add_movie_index(self, movie: Movie):
-        self._movies_index[movie.id] = movie
+    @writes
+    def add_movie_index(self, catalog: CatalogVersion, movie: Movie):
+        catalog.mutable('movies_index')[movie.id] = movie
 
     def get_movie_ids_for_title(self, title: str):
-        # Linear search, to find the first occurrence of a movie with the wanted title.
-        movie = next((movie for movie in self._movies if movie.title == title), None)
+        return list(self._state.current().movie_ids_by_title.get(title, list()))
 
-        # Retrieve the ids of movies associated with the title.
-        if movie is not None:
-            movie_ids = [movie.id for movie in movie.title]
-        else:
-            movie_ids = list()
+    def search_movie_ids(self, query: str, offset: int, limit: int):
+        catalog = self._state.current()
+        movie_ids, total = catalog.search_index.search(query, offset, limit)
+        if total > 0:
+            return movie_ids, total
 
-        return movie_ids
+        # Nothing matched, so the query may be a misspelled title: fall back to the closest titles.
+        movie_ids = list()
+        for title in catalog.title_trigrams.closest(query, limit=10):
+            movie_ids.extend(catalog.movie_ids_by_title.get(title, ()))
+        return movie_ids[offset:offset + limit], len(movie_ids)
 
-    def get_movie_ids_by_genre(self, genre_name: str):
-        # Linear search, to find the first occurrence of the wanted genre.
-        genre = next((genre for genre in self._genres if genre.genre_name == genre_name), None)
-
-        # Retrieve the ids of movies with the Genre
-        if genre is not None:
-            movie_ids = [movie.id for movie in self._movies if genre in movie.genres]
-        else:
-            # No movies with this particular genre, so return an empty list.
-            movie_ids = list()
+    # The id lists returned below are the indexes themselves, so callers can take a page with a slice without
+    # copying the whole list. They must be treated as read-only.
 
-        return movie_ids
+    def get_movie_ids_by_genre(self, genre_name: str):
+        return self._state.current().movie_ids_by_genre.get(genre_name, list())
 
     def get_movie_ids_by_actor(self, actor_name: str):
-        # Linear search, to find the first occurrence of the wanted actor
-        actor = next((actor for actor in self._actors if actor.actor_full_name == actor_name), None)
-
-        # Retrieve the ids of movies starring the actor.
-        if actor is not None:
-            movie_ids = [movie.id for movie in self._movies if actor in movie.actors]
-        else:
-            # No movie starring this actor, so return an empty list.
-            movie_ids = list()
-
+        catalog = self._state.current()
+        movie_ids = catalog.movie_ids_by_actor.get(actor_name)
+        if movie_ids is None:
+            # Unknown name, so it may be misspelled: fall back to the closest actor name, if any is close enough.
+            closest_names = catalog.actor_trigrams.closest(actor_name)
+            movie_ids = catalog.movie_ids_by_actor.get(closest_names[0], list()) if closest_names else list()
         return movie_ids
 
+    def get_movie_ids_by_genre_page(self, genre_name: str, limit: int, after: int = None,
+                                    before: int = None) -> MoviePage:
+        # The ids are kept in ascending order, so the page is bisected for.
+        return page_movie_ids(self.get_movie_ids_by_genre(genre_name), limit, after, before)
+
+    def get_movie_ids_by_actor_page(self, actor_name: str, limit: int, after: int = None,
+                                    before: int = None) -> MoviePage:
+        return page_movie_ids(self.get_movie_ids_by_actor(actor_name), limit, after, before)
+
+    def actors_worked_together(self, actor_name: str, colleague_name: str) -> bool:
+        return self._costar_graph().worked_with(actor_name, colleague_name)
+
+    def get_costar_path(self, actor_name: str, colleague_name: str, max_depth: int = None):
+        return self._costar_graph().path(actor_name, colleague_name, max_depth)
+
+    def _costar_graph(self) -> CoStarGraph:
+        catalog = self._state.current()
+        graph = catalog.costar_graph
+        if graph is None:
+            # The graph only depends on the version's movie_ids_by_actor, so building it is the same whichever
+            # reader does it first, and it can be kept on the published version.
+            graph = CoStarGraph(catalog.movie_ids_by_actor)
+            catalog.structures['costar_graph'] = graph
+        return graph
+
+    def get_top_movie_ids(self, score: str, limit: int, genre_name: str = None, release_year: int = None):
+        if score not in SCORE_NAMES:
+            raise RepositoryException(f'Movies cannot be ranked by {score}')
+        catalog = self._state.current()
+        mask = None
+        for index_name, key in (('movie_ids_by_genre', genre_name), ('movie_ids_by_release_year', release_year)):
+            if key is not None:
+                key_mask = catalog.columns.mask_of(getattr(catalog, index_name).get(key, ()))
+                mask = key_mask if mask is None else mask & key_mask
+        return catalog.columns.top_movie_ids(score, limit, mask)
+
+    def get_faceted_movie_ids(self, all_of: dict = None, any_of: dict = None, none_of: dict = None,
+                              facet_limit: int = 10) -> FacetResult:
+        try:
+            return self._facet_index().query(all_of, any_of, none_of, facet_limit)
+        except KeyError as error:
+            raise RepositoryException(f'Movies have no facet {error}')
+
+    def _facet_index(self) -> FacetIndex:
+        catalog = self._state.current()
+        index = catalog.facet_index
+        if index is None:
+            # Like the co-star graph, the index only depends on the version it is kept on.
+            index = FacetIndex(catalog.columns.column('id'), {
+                'genre': catalog.movie_ids_by_genre,
+                'year': catalog.movie_ids_by_release_year,
+                'director': catalog.movie_ids_by_director,
+                'actor': catalog.movie_ids_by_actor
+            })
+            catalog.structures['facet_index'] = index
+        return index
+
+    def get_similar_movie_ids(self, movie_id: int, limit: int) -> List[int]:
+        catalog = self._state.current()
+        index = catalog.similarity_index
+        if index is None:
+            index = SimilarityIndex(catalog.columns.column('id'), chain(catalog.movie_ids_by_genre.values(),
+                                                                        catalog.movie_ids_by_actor.values()))
+            catalog.structures['similarity_index'] = index
+        return index.similar_movie_ids(movie_id, limit)
+
     def get_movies_by_genre(self, target_genre: Genre) -> List[Movie]:
         # Linear search, to find the first occurrence of the wanted genre.
-        genre = next((genre for genre in self._genres if genre.genre_name == target_genre), None)
+        genre = next((genre for genre in self._state.current().genres if genre.genre_name == target_genre), None)
 
         # Retrieve the ids of movies with the Genre
         if genre is not None:
@@ -145,46 +449,72 @@ class MemoryRepository(AbstractRepository):
         return movies
 
     def get_movies_by_release_year(self, target_year: int) -> List[Movie]:
-        matching_movies = list()
+        catalog = self._state.current()
+        movie_ids = catalog.movie_ids_by_release_year.get(target_year, list())
+        return [catalog.movies_index[id] for id in movie_ids]
+
+    def get_movie_ids_by_release_year_range(self, start_year: int, end_year: int) -> List[int]:
+        # Bisect for the distinct years in [start_year, end_year], then gather their ids.
+        catalog = self._state.current()
+        start = bisect_left(catalog.release_years, start_year)
+        end = bisect(catalog.release_years, end_year)
+
+        movie_ids = list()
+        for year in catalog.release_years[start:end]:
+            movie_ids.extend(catalog.movie_ids_by_release_year[year])
+        return movie_ids
 
-        for movie in self._movies:
-            if movie.release_year == target_year:
-                matching_movies.append(movie)
-            else:
-                continue
-        return matching_movies
+    def get_previous_release_year(self, release_year: int):
+        release_years = self._state.current().release_years
+        index = bisect_left(release_years, release_year)
+        if index == 0:
+            # No Movies were released before release_year.
+            return None
+        return release_years[index - 1]
+
+    def get_next_release_year(self, release_year: int):
+        release_years = self._state.current().release_years
+        index = bisect(release_years, release_year)
+        if index == len(release_years):
+            # No Movies were released after release_year.
+            return None
+        return release_years[index]
 
     def get_number_of_movies(self):
-        return len(self._movies)
+        return len(self._state.current().movies)
 
     def get_first_movie(self):
 
-        return self._movies[0]
+        return self._state.current().movies[0]
 
     def get_last_movie(self):
-        return self._movies[-1]
+        return self._state.current().movies[-1]
 
     def get_movies_by_id(self, id_list):
+        movies_index = self._state.current().movies_index
+
         # Strip out any ids in id_list that don't represent Movie ids in the repository.
-        existing_ids = [id for id in id_list if id in self._movies_index.keys()]
+        existing_ids = [id for id in id_list if id in movies_index.keys()]
 
         # Fetch the Movies.
-        movies = [self._movies_index[id] for id in existing_ids]
+        movies = [movies_index[id] for id in existing_ids]
         return movies
 
     # Helper method to return movie index.
-    def movie_index(self, movie: Movie):
-        index = bisect_left(self._movies, movie)
-        if index != len(self._movies) and self._movies[index].release_year == movie.release_year:
+    def movie_index(self, movie: Movie, movies: List[Movie] = None):
+        movies = movies if movies is not None else self._state.current().movies
+        index = bisect_left(movies, movie)
+        if index != len(movies) and movies[index].release_year == movie.release_year:
             return index
         raise ValueError
 
     def get_id_of_previous_movie(self, movie: Movie):
+        movies = self._state.current().movies
         previous_id = None
 
         try:
-            index = self.movie_index(movie)
-            for stored_movie in reversed(self._movies[0:index]):
+            index = self.movie_index(movie, movies)
+            for stored_movie in reversed(movies[0:index]):
                 if stored_movie.id < movie.id:
                     previous_id = stored_movie.id
                     break
@@ -195,11 +525,12 @@ class MemoryRepository(AbstractRepository):
         return previous_id
 
     def get_id_of_next_movie(self, movie: Movie):
+        movies = self._state.current().movies
         next_id = None
 
         try:
-            index = self.movie_index(movie)
-            for stored_movie in self._movies[index + 1:len(self._movies)]:
+            index = self.movie_index(movie, movies)
+            for stored_movie in movies[index + 1:len(movies)]:
                 if stored_movie.id > movie.id:
                     next_id = stored_movie.id
                     break
@@ -209,13 +540,138 @@ class MemoryRepository(AbstractRepository):
 
         return next_id
 
+    @writes
+    def use_movie_file(self, catalog: CatalogVersion, movie_file: MovieFile, cache_size: int):
+        """ Makes the repository's Movies from the rows of movie_file on demand, instead of holding them all.
+
+        Movies are read through a LazyMovieList, which keeps the cache_size most recently used ones. The secondary
+        indexes are not built here: the rows must also be passed to index_movie(), unless the indexes were restored.
+        Movies with Reviews stay in memory, so their Reviews are not lost.
+        """
+        registry = self._registry
+        lazy_movies = LazyMovieList(movie_file, lambda row: movie_from_row(row, registry), cache_size)
+        catalog.replace('lazy_movies', lazy_movies)
+        catalog.replace('movies', lazy_movies)
+        catalog.replace('movies_index', LazyMovieIndex(lazy_movies))
+        for review in catalog.reviews:
+            lazy_movies.pin(review.movie)
+
+    def use_journal(self, journal: Journal, compactor: JournalCompactor = None):
+        """ Has every User and Review added from now on recorded in journal before the adding method returns.
+
+        A record is appended as the addition is published and is synced to disk, together with the records of any
+        concurrent additions, before add_user() or add_review() returns. The compactor, if any, is told of each one.
+        """
+        self._journal = journal
+        self._compactor = compactor
+
+    def _journal_record(self, catalog: CatalogVersion, record: dict):
+        journal = self._journal
+        if journal is None:
+            return
+        catalog.on_publish(lambda: catalog.replace('journal_sequence', journal.append(record)))
+        catalog.after_publish(lambda: self._journal_synced(journal, catalog.journal_sequence))
+
+    def _journal_synced(self, journal: Journal, sequence: int):
+        journal.sync(sequence)
+        if self._compactor is not None:
+            self._compactor.notify()
+
+    @writes
+    def set_journal_sequence(self, catalog: CatalogVersion, sequence: int):
+        catalog.replace('journal_sequence', sequence)
+
+    @writes
+    def compact_indexes(self, catalog: CatalogVersion):
+        """ Replaces the id lists of the inverted indexes with arrays of machine integers.
+
+        A list of ids holds a reference to an int object per id, and slicing the list writes to every int it copies.
+        An array holds the ids themselves, so reading an index never writes to memory shared with forked processes.
+        The arrays behave like the lists for every use the repository's callers make of them, but a Movie added
+        afterwards copies the whole array of each of its genres, actors, director, year and title.
+        """
+        for name in ('movie_ids_by_actor', 'movie_ids_by_genre', 'movie_ids_by_director', 'movie_ids_by_release_year',
+                     'movie_ids_by_title'):
+            catalog.replace(name, SharedDict((key, array('l', movie_ids))
+                                             for key, movie_ids in getattr(catalog, name).items()))
+
+    def batch(self):
+        """ Returns a context manager in which this thread's additions are published together, when it exits.
+
+        Each addition outside a batch publishes a new version, copying the parts of the structures it changes; a
+        batch copies each part once, so populating a repository costs little more than it would without versions.
+        """
+        return self._state.batch()
+
+    def pin(self):
+        # Has this thread read the version published now, and its own additions, until unpin() is called.
+        self._state.pin()
+
+    def unpin(self):
+        self._state.unpin()
+
+    def state(self) -> dict:
+        """ Returns the structures of the current version and the registry, to be saved and passed to restore(). """
+        return dict(self._state.current().structures, registry=self._registry)
+
+    @writes
+    def restore(self, catalog: CatalogVersion, state: dict):
+        for name, value in state.items():
+            if name == 'registry':
+                self._registry = value
+            else:
+                catalog.replace(name, value)
+
+    @property
+    def version(self) -> int:
+        return self._state.current().number
+
+    @property
+    def live_versions(self) -> int:
+        return self._state.live_versions
+
+    @property
+    def journal(self) -> Journal:
+        return self._journal
+
+    @property
+    def journal_sequence(self) -> int:
+        return self._state.current().journal_sequence
+
+    @property
+    def movie_digests(self) -> dict:
+        return self._state.current().movie_digests
+
+    @property
+    def columns(self) -> MovieColumns:
+        return self._state.current().columns
+
+    @property
+    def lazy_movies(self) -> LazyMovieList:
+        return self._state.current().lazy_movies
+
+    @property
+    def registry(self) -> EntityRegistry:
+        return self._registry
+
     @property
     def movies_index(self):
-        return self._movies_index
+        return self._state.current().movies_index
 
     @property
     def get_movies(self):
-        return self._movies
+        return self._state.current().movies
+
+def movie_position(movies: List[Movie], movie_id: int) -> int:
+    # Bisects Movies in ascending id order for the position of movie_id.
+    low, high = 0, len(movies)
+    while low < high:
+        middle = (low + high) // 2
+        if movies[middle].id < movie_id:
+            low = middle + 1
+        else:
+            high = middle
+    return low
 
 
 def read_csv_file(filename: str):
@@ -232,42 +688,100 @@ def read_csv_file(filename: str):
             yield row
 
 
+def movie_from_row(row: List[str], registry: EntityRegistry) -> Movie:
+    movie = Movie(row[1], int(row[6]))
+    movie.id = int(row[0])
+    movie.description = row[3]
+    movie.runtime_minutes = int(row[7])
+    movie.rating = parse_number(row[8], float)
+    movie.votes = parse_number(row[9], int)
+    movie.revenue = parse_number(row[10], float)
+    movie.metascore = parse_number(row[11], int)
+
+    movie.director = registry.director(row[4])
+
+    for genre_string in row[2].split(','):
+        movie.add_genre(registry.genre(genre_string))
+
+    for actor_string in row[5].split(','):
+        movie.add_actor(registry.actor(actor_string))
+    return movie
+
+
+def add_registry_entities(repo: MemoryRepository):
+    # Each distinct Director, Genre and Actor is added to the repository once, in order of first appearance.
+    registry = repo.registry
+    for director in registry.directors:
+        if repo.get_director(director.director_full_name) is None:
+            repo.add_director(director)
+    genres = set(repo.get_genres())
+    for genre in registry.genres:
+        if genre not in genres:
+            repo.add_genre(genre)
+    for actor in registry.actors:
+        if repo.get_actor(actor.actor_full_name) is None:
+            repo.add_actor(actor)
+
+
 def load_movies_and_ids(data_path: str, repo: MemoryRepository):
-    ids = dict()
     for row in read_csv_file(os.path.join(data_path, 'moviefile.csv')):
-        movie = Movie(row[1], int(row[6]))
-        movie.id = int(row[0])
-        movie.description = row[3]
-        movie.runtime_minutes = int(row[7])
-
-        director = Director(row[4])
-        repo.add_director(director)
-        movie.director = director
-
-        parsed_genres = row[2].split(',')
-        for genre_string in parsed_genres:
-            genre = Genre(genre_string)
-            movie.add_genre(genre)
-            repo.add_genre(genre)
+        movie = movie_from_row(row, repo.registry)
+
+        # Add the Movie to the repository under its Rank, which reload_movies() matches rows to Movies by.
+        repo.put_movie(movie)
+        repo.set_movie_digest(movie.id, row_digest(row))
+
+    add_registry_entities(repo)
+
+
+def reload_movies(data_path: str, repo: MemoryRepository) -> CatalogChanges:
+    """ Brings the repository's Movies in line with a changed moviefile.csv, and returns the changes made.
+
+    Rows are matched to Movies by Rank. Only Movies whose rows were added, changed or removed are made, replaced or
+    removed, and all changes are published together, so requests being served carry on with the Movies they started
+    with. Actors, Directors and Genres no Movie refers to any more are kept.
+    """
+    if repo.lazy_movies is not None:
+        raise RepositoryException('Movies made from the movie file on demand are reloaded by restarting')
 
-            parsed_actors = row[5].split(',')
-            for actor_string in parsed_actors:
-                actor = Actor(actor_string)
-                repo.add_actor(actor)
-                movie.add_actor(actor)
+    rows = read_movie_rows(data_path)
+    with repo.batch():
+        changes = diff_movie_rows(repo.movie_digests, rows)
+        for movie_id in changes.deleted:
+            repo.remove_movie(movie_id)
+        for row in changes.updated + changes.inserted:
+            movie = movie_from_row(row, repo.registry)
+            repo.put_movie(movie)
+            repo.set_movie_digest(movie.id, row_digest(row))
+        add_registry_entities(repo)
+    return changes
 
-        # Add the Movie to the repository.
-        repo.add_movie(movie)
-        repo.add_movie_index(movie)
 
+def load_movie_file(data_path: str, repo: MemoryRepository, cache_size: int, index_movies: bool = True):
+    # The lazy counterpart of load_movies_and_ids: Movies are made when they are first asked for.
+    movie_file = MovieFile(os.path.join(data_path, 'moviefile.csv'))
+    repo.use_movie_file(movie_file, cache_size)
+    if not index_movies:
+        return
 
-def load_users_and_ids(data_path: str, repo: MemoryRepository):
+    # Read every row once to build the indexes; the Movies made for this are dropped straight away.
+    for position, row in enumerate(movie_file.rows()):
+        movie = movie_from_row(row, repo.registry)
+        movie.id = position + 1
+        repo.index_movie(movie)
+
+    add_registry_entities(repo)
+
+
+def load_users_and_ids(data_path: str, repo: MemoryRepository, password_workers: int = None):
     users = dict()
 
-    for data_row in read_csv_file(os.path.join(data_path, 'users.csv')):
+    data_rows = list(read_csv_file(os.path.join(data_path, 'users.csv')))
+    passwords = hash_passwords([data_row[2] for data_row in data_rows], password_workers)
+    for data_row, password in zip(data_rows, passwords):
         user = User(
             username=data_row[1],
-            password=generate_password_hash(data_row[2])
+            password=password
         )
         repo.add_user(user)
         users[data_row[0]] = user
@@ -284,8 +798,108 @@ def load_reviews(data_path: str, repo: MemoryRepository, users):
         repo.add_review(review)
 
 
-def populate(data_path: str, repo: MemoryRepository):
-    # Load movies, users and reviews into the repository.
-    load_movies_and_ids(data_path, repo)
-    users = load_users_and_ids(data_path, repo)
-    load_reviews(data_path, repo, users)
+def apply_journal_record(repo: MemoryRepository, record: dict):
+    if record['type'] == 'user':
+        repo.add_user(User(record['username'], record['password']))
+
+    elif record['type'] == 'review':
+        user = repo.get_user(record['username'])
+        movie = repo.get_movie(record['movie_id'])
+        if user is None or movie is None:
+            # The data files no longer have the Review's User or Movie.
+            return
+
+        review = Review(movie, record['review_text'], record['rating'], user,
+                        datetime.fromisoformat(record['timestamp']))
+        # A snapshot taken while the Review was being added may already have it attached to its Movie.
+        attached_review = next((movie_review for movie_review in movie.reviews if movie_review == review), None)
+        if attached_review is None:
+            review = add_review(review.review_text, user, movie, review.rating, review.timestamp)
+        else:
+            review = attached_review
+            if review not in user.reviews:
+                user.add_review(review)
+        repo.add_review(review)
+
+
+def replay_journal(repo: MemoryRepository, journal: Journal):
+    # Apply the journal's records that are newer than the repository, and publish them together.
+    with repo.batch():
+        for sequence, record in journal.records(repo.journal_sequence):
+            apply_journal_record(repo, record)
+            repo.set_journal_sequence(sequence)
+
+    # Records numbered up to the repository's sequence may be gone from the journal, e.g. if it was deleted after a
+    # compaction; new records must still be numbered after them.
+    journal.continue_from(repo.journal_sequence)
+
+
+def compact_journal(data_path: str, repo: MemoryRepository, snapshot_path: str, lazy_movies: bool = False):
+    """ Saves the published state of the repository as a snapshot, then archives the journal records it holds. """
+    state = snapshot_state(repo)
+    repo.journal.sync(state['journal_sequence'])
+    write_snapshot(snapshot_path, data_checksum(data_path, 'lazy' if lazy_movies else ''), state)
+    repo.journal.archive(state['journal_sequence'])
+
+
+def snapshot_state(repo: MemoryRepository) -> dict:
+    # Lazily made Movies are read from the movie file again, rather than saved.
+    state = repo.state()
+    if repo.lazy_movies is not None:
+        for name in ('movies', 'movies_index', 'lazy_movies'):
+            del state[name]
+    return state
+
+
+def populate(data_path: str, repo: MemoryRepository, snapshot_path: str = None, password_workers: int = None,
+             lazy_movies: bool = False, movie_cache_size: int = 1024, journal_path: str = None,
+             journal_compact_records: int = 1000, prebuild_indexes: bool = False):
+    # With a snapshot path, reuse the snapshot of an earlier population from the same data if there is one.
+    restored = False
+    if snapshot_path is not None:
+        checksum = data_checksum(data_path, 'lazy' if lazy_movies else '')
+        try:
+            state = read_snapshot(snapshot_path, checksum)
+            with repo.batch():
+                repo.restore(state)
+                if lazy_movies:
+                    load_movie_file(data_path, repo, movie_cache_size, index_movies=False)
+            restored = True
+        except SnapshotException:
+            # Missing, stale or unreadable snapshot: populate from the CSV files and replace it.
+            pass
+
+    if not restored:
+        # Load movies, users and reviews into the repository, and publish them together.
+        with repo.batch():
+            if lazy_movies:
+                load_movie_file(data_path, repo, movie_cache_size)
+            else:
+                load_movies_and_ids(data_path, repo)
+            users = load_users_and_ids(data_path, repo, password_workers)
+            load_reviews(data_path, repo, users)
+
+    # With a journal path, add the Users and Reviews added since the snapshot, or since the data files were loaded.
+    if journal_path is not None:
+        journal = Journal(journal_path)
+        replay_journal(repo, journal)
+
+    if prebuild_indexes:
+        # Rank the Movies by each score, and build the facet bitmaps and similar Movies, now, so forked workers share
+        # them instead of each making its own. Otherwise each is built on first use.
+        for score in SCORE_NAMES:
+            repo.columns.ranked_rows(score)
+        repo.get_faceted_movie_ids(facet_limit=0)
+        repo.get_similar_movie_ids(0, 0)
+
+    if snapshot_path is not None and not restored:
+        write_snapshot(snapshot_path, checksum, snapshot_state(repo))
+
+    if journal_path is not None:
+        # Without a snapshot to compact into, the journal keeps every record.
+        compactor = None
+        if snapshot_path is not None:
+            compactor = JournalCompactor(
+                journal, lambda: compact_journal(data_path, repo, snapshot_path, lazy_movies), journal_compact_records
+            )
+        repo.use_journal(journal, compactor)
@@ -0,0 +1,202 @@
+import copy
+import csv
+import io
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping, Sequence
+from typing import Callable, Iterator, List
+
+import numpy as np
+
+from movie.adapters.versioning import SharedList
+from movie.domain.model import Movie
+
+
+class MovieFile:
+    """ Random access to the rows of a movie CSV file.
+
+    The file is memory-mapped and an array of row start offsets is built over it, so reading row i decodes only that
+    row. The offsets are saved next to the file, stamped with its size and modification time, and are memory-mapped
+    back in by later opens until the file changes.
+    """
+
+    OFFSETS_SUFFIX = '.offsets.npy'
+
+    def __init__(self, file_name: str, offsets_path: str = None):
+        self._file_name = file_name
+        self._offsets_path = offsets_path if offsets_path is not None else file_name + self.OFFSETS_SUFFIX
+        with open(file_name, 'rb') as infile:
+            self._map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(infile.fileno()).st_size \
+                else None
+        self._offsets = self._load_offsets()
+        if self._offsets is None:
+            self._offsets = self._build_offsets()
+            self._save_offsets()
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def row(self, position: int) -> List[str]:
+        """ Returns the fields of the row at position, counting from 0 after the header row. """
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        text = self._map[self._offsets[position]:self._offsets[position + 1]].decode('utf-8')
+        return [item.strip() for item in next(csv.reader(io.StringIO(text)))]
+
+    def rows(self) -> Iterator[List[str]]:
+        for position in range(len(self)):
+            yield self.row(position)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+
+    def _stamp(self) -> List[int]:
+        status = os.stat(self._file_name)
+        return [status.st_size, status.st_mtime_ns]
+
+    def _load_offsets(self):
+        # The saved array is the file's size and modification time followed by the row offsets.
+        try:
+            saved = np.load(self._offsets_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if saved.dtype != np.int64 or len(saved) < 3 or saved[:2].tolist() != self._stamp():
+            return None
+        return saved[2:]
+
+    def _save_offsets(self):
+        # Write to a temporary file first, so a concurrent open never maps a partial array.
+        temporary_path = self._offsets_path + '.tmp'
+        try:
+            with open(temporary_path, 'wb') as outfile:
+                np.save(outfile, np.concatenate((np.array(self._stamp(), dtype=np.int64), self._offsets)))
+            os.replace(temporary_path, self._offsets_path)
+        except OSError:
+            # The data directory may be read-only; the offsets are then rebuilt on every open.
+            pass
+
+    def _build_offsets(self) -> np.ndarray:
+        offsets = list()
+        if self._map is None:
+            return np.zeros(1, dtype=np.int64)
+
+        # Skip the byte order mark and the header row.
+        position = 3 if self._map[:3] == b'\xef\xbb\xbf' else 0
+        self._map.seek(position)
+        self._map.readline()
+        position = self._map.tell()
+
+        # A row ends at a line break outside quotes; an odd number of quotes on a line leaves a field open.
+        in_quotes = False
+        for line in iter(self._map.readline, b''):
+            if not in_quotes and line.strip() != b'':
+                offsets.append(position)
+            if line.count(b'"') % 2 == 1:
+                in_quotes = not in_quotes
+            position += len(line)
+        offsets.append(position)
+        return np.array(offsets, dtype=np.int64)
+
+
+class LazyMovieList(Sequence):
+    """ The Movies of a MovieFile, made from their rows on first access.
+
+    Movie i is at index i and has id i + 1. Made Movies are held in a least recently used cache of cache_size
+    Movies, so memory tracks the Movies in use rather than the size of the file. Pinned Movies, such as those with
+    Reviews, and Movies appended after the file's rows are never evicted.
+    """
+
+    def __init__(self, movie_file: MovieFile, make_movie: Callable[[List[str]], Movie], cache_size: int = 1024):
+        self._movie_file = movie_file
+        self._make_movie = make_movie
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        # Readers share the cache, so changes to it are serialised by a lock of its own.
+        self._cache_lock = threading.Lock()
+        self._pinned = dict()
+        self._appended = SharedList()
+
+    def __len__(self):
+        return len(self._movie_file) + len(self._appended)
+
+    def __copy__(self):
+        # Copies share the file, the cache, the pinned Movies and, until they append to it, the list of appended Movies.
+        movies = LazyMovieList.__new__(LazyMovieList)
+        vars(movies).update(vars(self))
+        movies._appended = copy.copy(self._appended)
+        return movies
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index >= len(self._movie_file):
+            return self._appended[index - len(self._movie_file)]
+
+        movie = self._pinned.get(index)
+        if movie is not None:
+            return movie
+        with self._cache_lock:
+            movie = self._cache.get(index)
+            if movie is not None:
+                self._cache.move_to_end(index)
+                return movie
+
+        movie = self._make_movie(self._movie_file.row(index))
+        movie.id = index + 1
+        with self._cache_lock:
+            # Another thread may have made the same Movie meanwhile; hand out a single instance.
+            movie = self._cache.setdefault(index, movie)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return movie
+
+    def append(self, movie: Movie):
+        self._appended.append(movie)
+
+    def pin(self, movie: Movie):
+        # Keep the Movie in memory for good, so that state added to it, like Reviews, is not lost on eviction.
+        index = movie.id - 1 if movie.id is not None else -1
+        if 0 <= index < len(self._movie_file):
+            self._pinned[index] = movie
+            with self._cache_lock:
+                self._cache.pop(index, None)
+
+    @property
+    def cached(self) -> int:
+        return len(self._cache)
+
+
+class LazyMovieIndex(MutableMapping):
+    """ Movies by id, read through a LazyMovieList. """
+
+    def __init__(self, movies: LazyMovieList):
+        self._movies = movies
+
+    def __getitem__(self, movie_id: int) -> Movie:
+        if type(movie_id) is not int or not 1 <= movie_id <= len(self._movies):
+            raise KeyError(movie_id)
+        return self._movies[movie_id - 1]
+
+    def __setitem__(self, movie_id: int, movie: Movie):
+        # Every Movie is already reachable through the list, so there is nothing to store.
+        pass
+
+    def __delitem__(self, movie_id: int):
+        raise KeyError(movie_id)
+
+    def __contains__(self, movie_id) -> bool:
+        return type(movie_id) is int and 1 <= movie_id <= len(self._movies)
+
+    def __iter__(self):
+        return iter(range(1, len(self._movies) + 1))
+
+    def __len__(self):
+        return len(self._movies)
@@ -1,29 +1,58 @@
 from sqlalchemy import (
-    Table, MetaData, Column, Integer, String, Date, DateTime,
-    ForeignKey
+    Table, MetaData, Column, Integer, Float, String, Date, DateTime,
+    ForeignKey, Index
 )
 from sqlalchemy.orm import mapper, relationship
 
+from movie.adapters.review_stats import RATINGS
 from movie.domain import model
 
 metadata = MetaData()
 
+
+
+def normalize_username(username: str) -> str:
+    # Usernames are matched the way User stores them: stripped and lowercased.
+    return username.strip().lower()
+
+
+def _normalized_username_default(context) -> str:
+    return normalize_username(context.get_current_parameters()['username'])
+
+
 users = Table(
     'users', metadata,
     Column('username', String(255), unique=True, nullable=False),
     Column('password', String(255), nullable=False),
-    Column('id', Integer, primary_key=True, autoincrement=True)
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    # Users are looked up by this, through its unique index, rather than by reading every username.
+    Column('normalized_username', String(255), nullable=True, default=_normalized_username_default)
 )
 
+Index('users_normalized_username', users.c.normalized_username, unique=True)
+
 reviews = Table(
     'reviews', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
     Column('user_id', ForeignKey('users.id')),
     Column('movie_id', ForeignKey('movies.id')),
     Column('review', String(1024), nullable=False),
+    Column('rating', Integer, nullable=True),
     Column('timestamp', DateTime, nullable=False)
 )
 
+# Running totals of each reviewed movie's reviews, updated with each review added, so that listing pages read one row
+# per movie rather than all its reviews. rating_<r> counts the reviews rated r.
+review_stats = Table(
+    'review_stats', metadata,
+    Column('movie_id', ForeignKey('movies.id'), primary_key=True),
+    Column('review_count', Integer, nullable=False),
+    Column('rating_count', Integer, nullable=False),
+    Column('rating_sum', Integer, nullable=False),
+    *[Column(f'rating_{rating}', Integer, nullable=False) for rating in RATINGS],
+    Column('latest_timestamp', DateTime, nullable=True)
+)
+
 movies = Table(
     'movies', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
@@ -32,9 +61,19 @@ movies = Table(
     Column('genres', String(1000), nullable=True),
     Column('description', String(1024), nullable=True),
     Column('director', String(255), nullable=True),
-    Column('actors', String(1024), nullable=True)
+    Column('actors', String(1024), nullable=True),
+    Column('rating', Float, nullable=True),
+    Column('votes', Integer, nullable=True),
+    Column('revenue', Float, nullable=True),
+    Column('metascore', Integer, nullable=True)
 )
 
+# Top-k queries read these in order, and stop after k rows, rather than sorting every movie.
+Index('movies_rating', movies.c.rating)
+Index('movies_votes', movies.c.votes)
+Index('movies_revenue', movies.c.revenue)
+Index('movies_metascore', movies.c.metascore)
+
 genres = Table(
     'genres', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
@@ -48,8 +87,32 @@ movie_genres = Table(
     Column('genre_id', ForeignKey('genres.id'))
 )
 
+# Pages of a genre's movies are read in movie id order from a key, rather than by skipping the movies before it. Genre
+# names being unique lets the pages be read straight from the index, without sorting.
+Index('genres_genre_name', genres.c.genre_name, unique=True)
+Index('movie_genres_genre', movie_genres.c.genre_id, movie_genres.c.movie_id)
+
+# The full-text search index over movie titles and descriptions: each movie's terms, with their weighted frequencies,
+# and the movie's document length, as movie.adapters.search makes them, so searches are ranked as the memory
+# repository ranks them. Each term's postings are read along the primary key.
+search_terms = Table(
+    'search_terms', metadata,
+    Column('term', String(64), primary_key=True),
+    Column('movie_id', ForeignKey('movies.id'), primary_key=True),
+    Column('frequency', Integer, nullable=False)
+)
+
+search_documents = Table(
+    'search_documents', metadata,
+    Column('movie_id', ForeignKey('movies.id'), primary_key=True),
+    Column('length', Integer, nullable=False)
+)
+
 
 def map_model_to_tables():
+    if model.COMPACT_MODEL:
+        raise model.ModelException('Compact domain model instances have no __dict__ and cannot be mapped')
+
     mapper(model.User, users, properties={
         '_User__username': users.c.username,
         '_User__password': users.c.password,
@@ -57,6 +120,7 @@ def map_model_to_tables():
     })
     mapper(model.Review, reviews, properties={
         '_Review__review': reviews.c.review,
+        '_Review__rating': reviews.c.rating,
         '_Review__timestamp': reviews.c.timestamp
     })
     movies_mapper = mapper(model.Movie, movies, properties={
@@ -67,6 +131,10 @@ def map_model_to_tables():
         '_Movie__description': movies.c.description,
         '_Movie__director': movies.c.director,
         '_Movie__actors': movies.c.actors,
+        '_Movie__rating': movies.c.rating,
+        '_Movie__votes': movies.c.votes,
+        '_Movie__revenue': movies.c.revenue,
+        '_Movie__metascore': movies.c.metascore,
         '_Movie__reviews': relationship(model.Review, backref='_movie')
     })
     mapper(model.Genre, genres, properties={
@@ -0,0 +1,30 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List
+
+from werkzeug.security import generate_password_hash
+
+
+def password_workers(workers: int = None) -> int:
+    """ Returns the number of processes to hash passwords with; None or 0 means one per CPU. """
+    if workers is None or workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def hash_passwords(passwords: Iterable[str], workers: int = None) -> List[str]:
+    """ Returns the hashes of passwords, in the same order.
+
+    Hashing is deliberately slow, so with more than one worker the passwords are spread over a pool of processes.
+    Starting a process costs far less than a hash, but a pool is only worth starting when every worker gets at least
+    two passwords.
+    """
+    passwords = list(passwords)
+    workers = min(password_workers(workers), len(passwords) // 2)
+    if workers <= 1:
+        return [generate_password_hash(password) for password in passwords]
+
+    # Chunks keep inter-process traffic down while leaving a few chunks per worker to even out the load.
+    chunk_size = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(generate_password_hash, passwords, chunksize=chunk_size))
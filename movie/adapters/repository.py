@@ -1,12 +1,23 @@
 import abc
-from typing import List
+from bisect import bisect, bisect_left
+from collections import namedtuple
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import date
 
+from movie.adapters.facets import FacetResult
+from movie.adapters.review_stats import ReviewStats
 from movie.domain.model import User, Director, Genre, Actor, Movie, Review, WatchList
 
 
 repo_instance = None
 
+# The Movie attributes Movies can be ranked by.
+SCORE_NAMES = ('rating', 'votes', 'revenue', 'metascore')
+
+# A page of Movie ids in ascending order, with the key of the page before it, to pass as before, and the key of the page
+# after it, to pass as after; either key is None when there is no such page.
+MoviePage = namedtuple('MoviePage', ('movie_ids', 'previous_key', 'next_key'))
+
 
 class RepositoryException(Exception):
 
@@ -69,9 +80,55 @@ class AbstractRepository(abc.ABC):
 
     @abc.abstractmethod
     def get_movie_ids_by_actor(self, actor_name: str) -> List[int]:
-        """ Returns a list of Movies that stars a particular actor.
+        """ Returns a list of ids of Movies that star a particular actor.
+
+        If actor_name is not a known actor, the Movies of the closest actor name within a few edits are returned, so
+        small misspellings still find the actor. If there is no such actor, this method returns an empty list.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_movie_ids_by_genre_page(self, genre_name: str, limit: int, after: Optional[int] = None,
+                                    before: Optional[int] = None) -> MoviePage:
+        """ Returns a MoviePage of up to limit ids of Movies that have a particular genre.
+
+        The page follows the key after, or precedes the key before, or is the first page if neither is given. Keys are
+        opaque, and come from the MoviePage of a neighbouring page. Each page is found by seeking to its key, so later
+        pages cost no more than the first.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_movie_ids_by_actor_page(self, actor_name: str, limit: int, after: Optional[int] = None,
+                                    before: Optional[int] = None) -> MoviePage:
+        """ Returns a MoviePage of up to limit ids of Movies that star a particular actor.
+
+        Pages follow after or precede before as for get_movie_ids_by_genre_page(), and an unknown actor_name falls back
+        to the closest actor name as for get_movie_ids_by_actor().
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def actors_worked_together(self, actor_name: str, colleague_name: str) -> bool:
+        """ Returns True if the two named actors appeared in a Movie together, and False otherwise. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_costar_path(self, actor_name: str, colleague_name: str, max_depth: int = None) -> List[Tuple[str, int]]:
+        """ Returns a shortest chain of co-stars linking two actors, as (actor name, Movie id) pairs.
 
-        If there are no Movies with the given actor, this method returns an empty list.
+        The chain starts with actor_name and ends with colleague_name, and each Movie id is that of a Movie the actor
+        appeared in with the actor before; the first pair's Movie id is None. If either actor is unknown, or there is
+        no chain of at most max_depth links, this method returns None.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_similar_movie_ids(self, movie_id: int, limit: int) -> List[int]:
+        """ Returns the ids of up to limit Movies most like the Movie with movie_id, most similar first.
+
+        Movies are alike by the genres and actors they share. The similar Movies are found ahead of time, so this
+        method only looks them up. If there is no such Movie, or no Movie is like it, this method returns an empty list.
         """
         raise NotImplementedError
 
@@ -80,6 +137,22 @@ class AbstractRepository(abc.ABC):
         """ Returns the actors stored in the repository. """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_actor_names_by_prefix(self, prefix: str, limit: int) -> List[str]:
+        """ Returns up to limit actor names with a word that starts with prefix, ignoring case.
+
+        If no actor name matches, this method returns an empty list.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_director_names_by_prefix(self, prefix: str, limit: int) -> List[str]:
+        """ Returns up to limit director names with a word that starts with prefix, ignoring case.
+
+        If no director name matches, this method returns an empty list.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_movie_ids_for_title(self, title: str):
         """ Returns a list of ids representing Movie with a title.
@@ -88,6 +161,15 @@ class AbstractRepository(abc.ABC):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def search_movie_ids(self, query: str, offset: int, limit: int) -> Tuple[List[int], int]:
+        """ Returns the ids of Movies whose title or description match query, best matches first.
+
+        Returns the page of up to limit ids that starts at offset, together with the total number of matches.
+        Repositories may fall back to the closest titles when nothing matches a misspelled query.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_movies_by_release_year(self, release_year: int) -> List[Movie]:
         """ Returns a list of Movies that were released in a given year.
@@ -96,6 +178,52 @@ class AbstractRepository(abc.ABC):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_movie_ids_by_release_year_range(self, start_year: int, end_year: int) -> List[int]:
+        """ Returns a list of ids of Movies released between start_year and end_year, inclusive.
+
+        If there are no Movies in the given range, this method returns an empty list.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_top_movie_ids(self, score: str, limit: int, genre_name: str = None, release_year: int = None) -> List[int]:
+        """ Returns the ids of up to limit Movies with the highest score, one of SCORE_NAMES, highest first.
+
+        When genre_name or release_year are given, only Movies with that genre and release year are ranked. Movies
+        whose score is unknown are left out, and ties are in ascending id order. If score is not one of SCORE_NAMES,
+        this method raises a RepositoryException.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_faceted_movie_ids(self, all_of: dict = None, any_of: dict = None, none_of: dict = None,
+                              facet_limit: int = 10) -> FacetResult:
+        """ Returns the ids of the Movies matching facet filters, in ascending order, and counts of their facet values.
+
+        Each filter maps facet names, from FACET_NAMES, to lists of values; release years are ints. A Movie matches if
+        it has every value in all_of, at least one of the values of each facet in any_of, and none of the values in
+        none_of. The counts give, for each facet, up to facet_limit of the values most common among the matching
+        Movies, with their numbers of Movies. An unknown facet name raises a RepositoryException.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_previous_release_year(self, release_year: int):
+        """ Returns the latest year before release_year in which at least one Movie was released.
+
+        If no Movies were released before release_year, this method returns None.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_next_release_year(self, release_year: int):
+        """ Returns the earliest year after release_year in which at least one Movie was released.
+
+        If no Movies were released after release_year, this method returns None.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_number_of_movies(self):
         """ Returns the number of Movies in the repository. """
@@ -146,6 +274,15 @@ class AbstractRepository(abc.ABC):
         """ Returns the Reviews stored in the repository. """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_review_stats(self, movie_ids: List[int]) -> Dict[int, ReviewStats]:
+        """ Returns the ReviewStats of each of the Movies with movie_ids, by id.
+
+        The totals are updated as each Review is added, so this method doesn't read the Reviews themselves. A Movie
+        without Reviews, or an id of no Movie, has empty ReviewStats.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_id_of_previous_movie(self, movie: Movie):
         """ Returns the id of an Movie that immediately precedes movie.
@@ -163,13 +300,17 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
 
-
-
-
-
-
-
-
-
-
-
+def page_movie_ids(movie_ids: Sequence[int], limit: int, after: Optional[int] = None,
+                   before: Optional[int] = None) -> MoviePage:
+    """ Returns the MoviePage of up to limit of movie_ids, which are in ascending order, that follows after or precedes
+    before, or the first page if neither is given. """
+    if before is not None:
+        end = bisect_left(movie_ids, before)
+        start = max(end - limit, 0)
+    else:
+        start = bisect(movie_ids, after) if after is not None else 0
+        end = min(start + limit, len(movie_ids))
+    page = [int(movie_id) for movie_id in movie_ids[start:end]]
+    if len(page) == 0:
+        return MoviePage(page, None, None)
+    return MoviePage(page, page[0] if start > 0 else None, page[-1] if end < len(movie_ids) else None)
@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import List, Optional
+
+# Reviews are rated from 1 to 10.
+RATINGS = range(1, 11)
+
+
+class ReviewStats:
+    """ Running totals of a Movie's Reviews, updated as each Review is added rather than counted from the Reviews.
+
+    Reviews without a rating count towards count and latest only. histogram[r - 1] is the number of Reviews rated r.
+    """
+    __slots__ = ('count', 'rating_count', 'rating_sum', 'histogram', 'latest')
+
+    def __init__(self, count: int = 0, rating_count: int = 0, rating_sum: int = 0, histogram: List[int] = None,
+                 latest: datetime = None):
+        self.count = count
+        self.rating_count = rating_count
+        self.rating_sum = rating_sum
+        self.histogram = list(histogram) if histogram is not None else [0] * len(RATINGS)
+        self.latest = latest
+
+    def add(self, rating: Optional[int], timestamp: Optional[datetime]):
+        self.count += 1
+        if rating is not None:
+            self.rating_count += 1
+            self.rating_sum += rating
+            self.histogram[rating - 1] += 1
+        if timestamp is not None and (self.latest is None or timestamp > self.latest):
+            self.latest = timestamp
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.rating_sum / self.rating_count if self.rating_count > 0 else None
+
+    def __copy__(self):
+        return ReviewStats(self.count, self.rating_count, self.rating_sum, self.histogram, self.latest)
+
+    def __getstate__(self):
+        return self.count, self.rating_count, self.rating_sum, self.histogram, self.latest
+
+    def __setstate__(self, state):
+        self.count, self.rating_count, self.rating_sum, self.histogram, self.latest = state
+
+    def __eq__(self, other):
+        if not isinstance(other, ReviewStats):
+            return False
+        return self.__getstate__() == other.__getstate__()
+
+    def __repr__(self):
+        return f'<ReviewStats {self.count} reviews, average {self.average}, latest {self.latest}>'
@@ -0,0 +1,208 @@
+import copy
+import math
+import re
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from movie.adapters.versioning import SharedDict
+from movie.domain.model import Movie
+
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Words too common to say anything about a Movie; leaving them out keeps their huge posting lists out of queries.
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'he', 'her', 'his', 'in', 'is', 'it',
+    'its', 'of', 'on', 'or', 'she', 'that', 'the', 'their', 'they', 'to', 'was', 'who', 'with'
+))
+
+
+# Title and description are scored as one document in which every title token counts TITLE_WEIGHT times.
+TITLE_WEIGHT = 3
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+
+# Readers add the arrays of the terms they query to a published index, whose dict of arrays a writer may be copying.
+POSTING_ARRAYS_LOCK = threading.Lock()
+
+
+def tokenize(text: str) -> List[str]:
+    if text is None:
+        return list()
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def term_frequencies(title: str, description: str) -> Dict[str, int]:
+    """ Returns the weighted frequency of each term of a Movie's title and description. """
+    frequencies = dict()
+    for token in tokenize(title):
+        frequencies[token] = frequencies.get(token, 0) + TITLE_WEIGHT
+    for token in tokenize(description):
+        frequencies[token] = frequencies.get(token, 0) + 1
+    return frequencies
+
+
+def rank(postings: List[Tuple[np.ndarray, np.ndarray, np.ndarray]], document_count: int, total_length: float,
+         offset: int, limit: int) -> Tuple[List[int], int]:
+    """ Ranks the Movies matching any query term with BM25, and returns a page of their ids and the number of matches.
+
+    postings holds the movie ids, weighted term frequencies and document lengths of each query term found in any
+    Movie. Ties are broken by ascending Movie id.
+    """
+    if len(postings) == 0:
+        return list(), 0
+
+    average_length = total_length / document_count
+    term_ids = list()
+    term_scores = list()
+    for ids, frequencies, lengths in postings:
+        idf = math.log(1 + (document_count - len(ids) + 0.5) / (len(ids) + 0.5))
+        normalisers = K1 * (1 - B + B * lengths / average_length)
+        term_ids.append(ids)
+        term_scores.append(idf * frequencies * (K1 + 1) / (frequencies + normalisers))
+
+    if len(postings) == 1:
+        ids, scores = term_ids[0], term_scores[0]
+    else:
+        # Sum the scores of Movies that match several terms.
+        ids, positions = np.unique(np.concatenate(term_ids), return_inverse=True)
+        scores = np.bincount(positions, weights=np.concatenate(term_scores))
+
+    # Only the requested page and the ones before it are ordered, not every match.
+    wanted = min(offset + limit, len(ids))
+    if wanted == 0:
+        return list(), len(ids)
+    if wanted < len(ids):
+        # Keep every Movie tied with the last one wanted, so the tie is broken by id rather than by postings order.
+        top = np.argpartition(-scores, wanted - 1)[:wanted]
+        top = np.flatnonzero(scores >= scores[top].min())
+    else:
+        top = np.arange(len(ids))
+    top = top[np.lexsort((ids[top], -scores[top]))]
+    return ids[top][offset:wanted].tolist(), len(ids)
+
+
+class SearchIndex:
+    """ Inverted index over Movie titles and descriptions, ranked with BM25.
+
+    Title and description are scored as one document in which every title token counts TITLE_WEIGHT times, so a
+    query word in the title outranks the same word in a description. Each term's postings are copied into NumPy arrays
+    the first time the term is queried after a change, and scoring runs over those arrays.
+    """
+
+    def __init__(self):
+        # term -> {movie id -> weighted term frequency}
+        self._postings = SharedDict(ordered=False)
+        # term -> (movie ids, term frequencies) as arrays, for terms whose postings haven't changed since last queried.
+        self._posting_arrays = SharedDict(ordered=False)
+        # movie id -> {term -> weighted term frequency}, kept so a Movie can be re-indexed or removed.
+        self._documents = SharedDict(ordered=False)
+        # Document length by movie id; ids without a document have length 0.
+        self._lengths = np.zeros(1024, dtype=np.float64)
+        self._total_length = 0
+        # Set on copies: the terms whose postings belong to this index; all others may be shared with another index.
+        self._owned_terms = None
+        # Copies share the lengths array too. The highest movie id any of them has written a length for is kept in a
+        # list they share, so that only lengths of new, higher ids are written in place.
+        self._shared_lengths = False
+        self._highest_id = [0]
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __copy__(self):
+        # Postings are shared with the copy until it changes them.
+        index = SearchIndex()
+        index._postings = copy.copy(self._postings)
+        with POSTING_ARRAYS_LOCK:
+            index._posting_arrays = copy.copy(self._posting_arrays)
+        index._documents = copy.copy(self._documents)
+        index._lengths = self._lengths
+        index._total_length = self._total_length
+        index._owned_terms = set()
+        index._highest_id = self._highest_id
+        index._shared_lengths = self._shared_lengths = True
+        return index
+
+    def _postings_to_change(self, term: str) -> SharedDict:
+        postings = self._postings.get(term)
+        if postings is None:
+            postings = self._postings[term] = SharedDict(ordered=False)
+        elif self._owned_terms is not None and term not in self._owned_terms:
+            postings = self._postings[term] = copy.copy(postings)
+        else:
+            return postings
+        if self._owned_terms is not None:
+            self._owned_terms.add(term)
+        return postings
+
+    def add(self, movie: Movie):
+        if movie.id in self._documents:
+            self.remove(movie.id)
+
+        frequencies = term_frequencies(movie.title, movie.description)
+        for term, frequency in frequencies.items():
+            self._postings_to_change(term)[movie.id] = frequency
+        # Nothing is cached while an index is being built up, before it is queried.
+        if len(self._posting_arrays) > 0:
+            for term in frequencies:
+                self._posting_arrays.pop(term, None)
+
+        length = sum(frequencies.values())
+        if movie.id >= len(self._lengths):
+            self._lengths = np.concatenate((self._lengths, np.zeros(max(movie.id + 1, 2 * len(self._lengths)))))
+            self._own_lengths()
+        self._set_length(movie.id, length)
+        self._documents[movie.id] = frequencies
+        self._total_length += length
+
+    def remove(self, movie_id: int):
+        frequencies = self._documents.pop(movie_id, None)
+        if frequencies is None:
+            return
+
+        for term in frequencies:
+            postings = self._postings_to_change(term)
+            del postings[movie_id]
+            if len(postings) == 0:
+                del self._postings[term]
+            self._posting_arrays.pop(term, None)
+        self._total_length -= self._lengths[movie_id]
+        self._set_length(movie_id, 0)
+
+    def _set_length(self, movie_id: int, length: float):
+        if self._shared_lengths and movie_id <= self._highest_id[0]:
+            self._lengths = self._lengths.copy()
+            self._own_lengths()
+        self._lengths[movie_id] = length
+        self._highest_id[0] = max(self._highest_id[0], movie_id)
+
+    def _own_lengths(self):
+        self._shared_lengths = False
+        self._highest_id = [self._highest_id[0]]
+
+    def search(self, query: str, offset: int = 0, limit: int = 10) -> Tuple[List[int], int]:
+        """ Returns the ids of the ranked matches from offset to offset + limit, and the total number of matches.
+
+        A Movie matches if it contains any query term. Ties are broken by ascending Movie id.
+        """
+        terms = [term for term in set(tokenize(query)) if term in self._postings]
+        postings = list()
+        for term in terms:
+            ids, frequencies = self._arrays_for(term)
+            postings.append((ids, frequencies, self._lengths[ids]))
+        return rank(postings, len(self._documents), self._total_length, offset, limit)
+
+    def _arrays_for(self, term: str):
+        arrays = self._posting_arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = (np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                      np.fromiter(postings.values(), dtype=np.float64, count=len(postings)))
+            with POSTING_ARRAYS_LOCK:
+                self._posting_arrays[term] = arrays
+        return arrays
@@ -0,0 +1,127 @@
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+# A prime above any feature number, for the hash functions (a * feature + b) mod PRIME.
+PRIME = (1 << 31) - 1
+
+# The number of Movie ids read at once when making signatures and comparing them, to bound the memory used.
+CHUNK = 1 << 16
+
+
+class SimilarityIndex:
+    """ The Movies most alike each Movie, by the Jaccard similarity of their sets of features, like genres and actors.
+
+    Comparing every pair of Movies is out of the question for a large catalog, so the index is built by locality
+    sensitive hashing. Each Movie gets a MinHash signature: for each of a number of hash functions, the smallest hash
+    of its features. Two Movies agree on any one of those minimums with probability equal to their Jaccard similarity.
+    The signatures are cut into bands of a few minimums, and Movies whose signatures are equal over a whole band
+    become candidates; the candidates are ranked by the fraction of minimums they agree on. A band shared by many
+    Movies only pairs each Movie with its nearest few in id order, since such Movies are all much alike anyway.
+
+    Every step works on NumPy arrays of all the Movies at once, or in chunks of them, and the most similar Movies of
+    each Movie are kept in compressed sparse row form. An index is never changed after it is built.
+    """
+
+    def __init__(self, movie_ids: Iterable[int], movie_ids_by_feature: Iterable[Iterable[int]], limit: int = 8,
+                 hashes: int = 48, bands: int = 24, window: int = 2, seed: int = 235):
+        self._movie_ids = np.unique(np.fromiter(movie_ids, dtype=np.int64))
+        signatures, has_features = self._signatures(movie_ids_by_feature, hashes, seed)
+
+        rows, others = self._candidates(signatures, has_features, bands, window, seed)
+        agreements = np.zeros(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), CHUNK):
+            end = start + CHUNK
+            agreements[start:end] = np.count_nonzero(signatures[rows[start:end]] == signatures[others[start:end]],
+                                                     axis=1)
+
+        # Keep each Movie's most similar Movies, most similar first, then in id order, sorting them all by one key.
+        size = len(self._movie_ids)
+        keys = np.sort(np.concatenate((
+            (rows * (hashes + 1) + hashes - agreements) * size + others,
+            (others * (hashes + 1) + hashes - agreements) * size + rows
+        )))
+        rows, others = keys // ((hashes + 1) * size), keys % size
+        agreements = hashes - keys // size % (hashes + 1)
+        counts = np.bincount(rows, minlength=size)
+        group_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        kept = np.arange(len(rows)) - group_starts < limit
+
+        self._neighbours = others[kept].astype(np.int32)
+        self._similarities = (agreements[kept] / hashes).astype(np.float32)
+        self._offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.minimum(counts, limit), out=self._offsets[1:])
+
+    def _signatures(self, movie_ids_by_feature: Iterable[Iterable[int]], hashes: int, seed: int):
+        # Returns a signature of hashes minimums per row, and which rows have any features to sign.
+        movie_ids = [np.asarray(feature_movie_ids, dtype=np.int64) for feature_movie_ids in movie_ids_by_feature]
+        counts = [len(feature_movie_ids) for feature_movie_ids in movie_ids]
+        features = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+        movie_ids = np.concatenate(movie_ids) if movie_ids else np.zeros(0, dtype=np.int64)
+
+        # Leaves out the features of Movies the index is not for.
+        size = len(self._movie_ids)
+        rows_by_id = np.full(max(self._movie_ids[-1] if size > 0 else 0, movie_ids.max(initial=0)) + 1, -1)
+        rows_by_id[self._movie_ids] = np.arange(size)
+        rows = rows_by_id[movie_ids]
+        rows, features = rows[rows >= 0], features[rows >= 0]
+        order = np.argsort(rows, kind='stable')
+        rows, features = rows[order], features[order]
+
+        rng = np.random.default_rng(seed)
+        a = rng.integers(1, PRIME, (hashes, 1), dtype=np.uint64)
+        b = rng.integers(0, PRIME, (hashes, 1), dtype=np.uint64)
+        feature_hashes = ((a * np.arange(len(counts), dtype=np.uint64) + b) % np.uint64(PRIME)).astype(np.uint32)
+
+        # One hash function at a time, the minimum over each Movie's run of features.
+        has_features = np.zeros(size, dtype=bool)
+        has_features[rows] = True
+        signed_rows = np.flatnonzero(has_features)
+        row_starts = np.searchsorted(rows, signed_rows)
+        signatures = np.zeros((size, hashes), dtype=np.uint32)
+        for hash_number in range(hashes):
+            signatures[signed_rows, hash_number] = np.minimum.reduceat(feature_hashes[hash_number][features],
+                                                                       row_starts)
+        return signatures, has_features
+
+    @staticmethod
+    def _candidates(signatures: np.ndarray, has_features: np.ndarray, bands: int, window: int, seed: int):
+        # Returns the distinct pairs of rows, lower row first, that share all the minimums of some band.
+        signed_rows = np.flatnonzero(has_features)
+        rows_per_band = signatures.shape[1] // bands
+        # Odd multipliers, to combine a band's minimums into one key.
+        multipliers = np.random.default_rng(seed + 1).integers(1, 1 << 63, rows_per_band, dtype=np.uint64)
+        multipliers |= np.uint64(1)
+        pairs = list()
+        for band in range(bands):
+            band_signatures = signatures[signed_rows, band * rows_per_band:(band + 1) * rows_per_band]
+            keys = (band_signatures.astype(np.uint64) * multipliers).sum(axis=1, dtype=np.uint64)
+            # Stable, so a band's Movies stay in id order.
+            order = np.argsort(keys, kind='stable')
+            keys, band_rows = keys[order], signed_rows[order]
+            for step in range(1, window + 1):
+                same = keys[step:] == keys[:-step]
+                pairs.append(band_rows[:-step][same] * len(has_features) + band_rows[step:][same])
+        pairs = np.sort(np.concatenate(pairs)) if pairs else np.zeros(0, dtype=np.int64)
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))] if len(pairs) > 0 else pairs
+        return pairs // len(has_features), pairs % len(has_features)
+
+    def __len__(self):
+        return len(self._movie_ids)
+
+    def similar(self, movie_id: int, limit: int = None) -> List[Tuple[int, float]]:
+        """ Returns the ids of the Movies most like the Movie with movie_id, with their estimated similarities.
+
+        The Movies come most similar first, at most limit of them, or as many as the index keeps if limit is None.
+        """
+        row = np.searchsorted(self._movie_ids, movie_id)
+        if row == len(self._movie_ids) or self._movie_ids[row] != movie_id:
+            return list()
+        start, end = self._offsets[row], self._offsets[row + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return list(zip(self._movie_ids[self._neighbours[start:end]].tolist(),
+                        self._similarities[start:end].tolist()))
+
+    def similar_movie_ids(self, movie_id: int, limit: int = None) -> List[int]:
+        return [similar_id for similar_id, similarity in self.similar(movie_id, limit)]
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+
+from movie.domain.model import COMPACT_MODEL
+
+
+# A snapshot file is MAGIC, the format version as an unsigned short, the 32-byte SHA-256 checksum of the inputs the
+# repository was populated from, and then the pickled repository state. Bump FORMAT_VERSION whenever the classes that
+# make up a populated repository change shape, so that older snapshots are rebuilt rather than loaded.
+MAGIC = b'MOVIESNAP'
+FORMAT_VERSION = 11
+HEADER = struct.Struct(f'>{len(MAGIC)}sH32s')
+
+DATA_FILES = ('moviefile.csv', 'users.csv', 'reviews.csv')
+
+
+class SnapshotException(Exception):
+    pass
+
+
+def data_checksum(data_path: str, variant: str = '') -> bytes:
+    """ Returns a SHA-256 digest of the CSV files a repository is populated from.
+
+    The digest also covers the snapshot format version, the domain model mode and a variant naming how the repository
+    was populated, which all change what a snapshot holds.
+    """
+    digest = hashlib.sha256(f'{FORMAT_VERSION}:{COMPACT_MODEL}:{variant}'.encode())
+    for file_name in DATA_FILES:
+        digest.update(file_name.encode())
+        with open(os.path.join(data_path, file_name), 'rb') as infile:
+            for block in iter(lambda: infile.read(1 << 20), b''):
+                digest.update(block)
+    return digest.digest()
+
+
+def write_snapshot(snapshot_path: str, checksum: bytes, state: dict):
+    # Write to a temporary file first, so a crash or a concurrent reader never sees a partial snapshot.
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as outfile:
+            outfile.write(HEADER.pack(MAGIC, FORMAT_VERSION, checksum))
+            pickle.dump(state, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, snapshot_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def read_snapshot(snapshot_path: str, checksum: bytes) -> dict:
+    """ Returns the state stored in a snapshot, or raises SnapshotException if it is missing, unreadable or stale. """
+    try:
+        with open(snapshot_path, 'rb') as infile:
+            header = infile.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise SnapshotException(f'Snapshot {snapshot_path} is truncated')
+
+            magic, version, snapshot_checksum = HEADER.unpack(header)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise SnapshotException(f'Snapshot {snapshot_path} has an unknown format')
+            if snapshot_checksum != checksum:
+                raise SnapshotException(f'Snapshot {snapshot_path} was built from different data')
+
+            return pickle.load(infile)
+    except OSError as error:
+        raise SnapshotException(f'Snapshot {snapshot_path} cannot be read: {error}')
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as error:
+        raise SnapshotException(f'Snapshot {snapshot_path} is corrupt: {error}')
@@ -0,0 +1,414 @@
+import copy
+import functools
+import threading
+import weakref
+from array import array
+from collections.abc import MutableMapping, MutableSequence
+from contextlib import contextmanager
+from itertools import chain, islice
+
+import numpy as np
+
+
+class SharedList(MutableSequence):
+    """ A list whose copies share its items, so that copying it costs nothing.
+
+    Copies hold the same underlying list and each reads only as many items as it had. A copy holding every item
+    appends in place, since no other copy reads that far; any other change, or an append by a copy that has fallen
+    behind, first copies the items it reads. The items may be an array instead of a list.
+    """
+
+    __slots__ = ('_items', '_length', '_owned')
+
+    def __init__(self, items=()):
+        self._items = items if isinstance(items, (list, array)) else list(items)
+        self._length = len(self._items)
+        # Whether no copy shares the items, so that they may be changed in place.
+        self._owned = True
+
+    def __copy__(self):
+        shared = SharedList.__new__(SharedList)
+        shared._items = self._items
+        shared._length = self._length
+        shared._owned = self._owned = False
+        return shared
+
+    def __getstate__(self):
+        return self._items[:self._length],
+
+    def __setstate__(self, state):
+        items, = state
+        self._items = items
+        self._length = len(items)
+        self._owned = True
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._items[slice(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('list index out of range')
+        return self._items[index]
+
+    def __iter__(self):
+        return islice(self._items, self._length)
+
+    def __reversed__(self):
+        return reversed(self._items[:self._length])
+
+    def __eq__(self, other):
+        if not isinstance(other, (SharedList, list, array)):
+            return NotImplemented
+        return len(self) == len(other) and all(item == other_item for item, other_item in zip(self, other))
+
+    def __repr__(self):
+        return f'SharedList({list(self)!r})'
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self._items[:self._length], dtype=dtype)
+
+    def append(self, item):
+        if not self._owned and len(self._items) != self._length:
+            self._own()
+        self._items.append(item)
+        self._length += 1
+
+    def insert(self, index, item):
+        if index >= self._length:
+            self.append(item)
+            return
+        self._own()
+        self._items.insert(index, item)
+        self._length += 1
+
+    def __setitem__(self, index, item):
+        self._own()
+        self._items[index] = item
+
+    def __delitem__(self, index):
+        self._own()
+        del self._items[index]
+        self._length = len(self._items)
+
+    def _own(self):
+        if not self._owned:
+            self._items = self._items[:self._length]
+            self._owned = True
+
+
+class SharedDict(MutableMapping):
+    """ A dict whose copies share its entries, so that a copy only copies the part of them it changes.
+
+    Entries are spread over shards by the hash of their keys, and copies share the shards until they change one.
+    Copying the dict costs a copy of the list of shards, and a change a copy of one shard, the first time: the number
+    of shards grows with the square root of the number of entries, so both stay small. Keys are iterated in insertion
+    order unless ordered is False, which saves keeping a list of them.
+    """
+
+    __slots__ = ('_shards', '_owned', '_length', '_order', '_removed')
+
+    def __init__(self, items=(), ordered: bool = True):
+        self._load(dict(items), ordered)
+
+    def _load(self, entries: dict, ordered: bool):
+        # Takes entries over as they are: a dict small enough makes the one shard.
+        count = 1
+        while len(entries) > 4 * count ** 2:
+            count *= 2
+        if count == 1:
+            self._shards = [entries]
+        else:
+            self._shards = [dict() for _ in range(count)]
+            for key, value in entries.items():
+                self._shards[hash(key) & (count - 1)][key] = value
+        # A bit per shard this dict may change in place, or None while it shares its list of shards.
+        self._owned = (1 << count) - 1
+        self._length = len(entries)
+        # Keys in insertion order. Removed keys stay in it until it is compacted, so a key may be in it more than
+        # once; only its last place counts.
+        self._order = SharedList(list(entries)) if ordered else None
+        self._removed = 0
+
+    def __copy__(self):
+        shared = SharedDict.__new__(SharedDict)
+        shared._shards = self._shards
+        shared._owned = self._owned = None
+        shared._length = self._length
+        shared._order = copy.copy(self._order)
+        shared._removed = self._removed
+        return shared
+
+    def __getstate__(self):
+        # The shards depend on the hashes of the keys, which differ from process to process, so the entries are saved
+        # as one dict, and spread over shards again when loaded.
+        if len(self._shards) == 1 and self._removed == 0:
+            # A shard shared with a copy is copied, so the two do not load as one dict.
+            shard = self._shards[0] if self._owned else dict(self._shards[0])
+            return shard, self._order is not None
+        entries = dict()
+        for shard in self._shards:
+            entries.update(shard)
+        if self._order is not None:
+            entries = {key: entries[key] for key in self}
+        return entries, self._order is not None
+
+    def __setstate__(self, state):
+        self._load(*state)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, key):
+        shards = self._shards
+        return shards[hash(key) & (len(shards) - 1)][key]
+
+    def __contains__(self, key):
+        shards = self._shards
+        return key in shards[hash(key) & (len(shards) - 1)]
+
+    def get(self, key, default=None):
+        shards = self._shards
+        return shards[hash(key) & (len(shards) - 1)].get(key, default)
+
+    def __iter__(self):
+        if self._order is None:
+            return chain.from_iterable(self._shards)
+        if self._removed == 0:
+            return iter(self._order)
+        return self._live_keys()
+
+    def _live_keys(self):
+        places = {key: place for place, key in enumerate(self._order)}
+        for place, key in enumerate(self._order):
+            if places[key] == place and key in self:
+                yield key
+
+    def __eq__(self, other):
+        if not isinstance(other, (SharedDict, dict)):
+            return NotImplemented
+        return len(self) == len(other) and all(key in other and other[key] == value for key, value in self.items())
+
+    def __repr__(self):
+        return f'SharedDict({dict(self.items())!r})'
+
+    def __setitem__(self, key, value):
+        shards = self._shards
+        number = hash(key) & (len(shards) - 1)
+        owned = self._owned
+        shard = shards[number] if owned is not None and owned >> number & 1 else self._shard_to_change(number)
+        if key not in shard:
+            self._length += 1
+            if self._order is not None:
+                self._order.append(key)
+            if self._length > 4 * len(self._shards) ** 2:
+                shard[key] = value
+                self._split()
+                return
+        shard[key] = value
+
+    def setdefault(self, key, default=None):
+        shards = self._shards
+        shard = shards[hash(key) & (len(shards) - 1)]
+        if key in shard:
+            return shard[key]
+        self[key] = default
+        return default
+
+    def pop(self, key, *default):
+        shards = self._shards
+        if key not in shards[hash(key) & (len(shards) - 1)]:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self[key]
+        del self[key]
+        return value
+
+    def __delitem__(self, key):
+        shard = self._shard_to_change(hash(key) & (len(self._shards) - 1))
+        del shard[key]
+        self._length -= 1
+        if self._order is not None:
+            self._removed += 1
+            if self._removed > self._length:
+                self._order = SharedList(self._live_keys())
+                self._removed = 0
+
+    def _shard_to_change(self, number: int) -> dict:
+        if self._owned is None:
+            self._shards = list(self._shards)
+            self._owned = 0
+        if not self._owned >> number & 1:
+            self._shards[number] = dict(self._shards[number])
+            self._owned |= 1 << number
+        return self._shards[number]
+
+    def _split(self):
+        # Doubles the number of shards; like a dict resizing, this costs a pass over every entry now and then.
+        shards = [dict() for _ in range(2 * len(self._shards))]
+        mask = len(shards) - 1
+        for shard in self._shards:
+            for key, value in shard.items():
+                shards[hash(key) & mask][key] = value
+        self._shards = shards
+        self._owned = (1 << len(shards)) - 1
+
+
+class CatalogVersion:
+    """ One version of a repository's state: a set of named structures, such as lists, dicts and indexes.
+
+    A published version is never changed. A writer derives a draft from it, which shares every structure until the
+    writer asks for one to change: mutable() then copies the structure, once per draft. Structures that grow with the
+    catalog, like SharedList, SharedDict and the indexes, copy themselves by sharing their contents, so a write pays
+    for what it changes rather than for the size of what it touches. Versions are reclaimed like any other object once
+    nothing refers to them.
+
+    A writer can also ask for callbacks to run when its draft is published: on_publish() ones run just before, still
+    one writer at a time, and after_publish() ones once the draft is published and the next writer may start.
+    """
+
+    def __init__(self, number: int = 0, **structures):
+        self.number = number
+        self.structures = structures
+        self.owned = set()
+        self.publish_callbacks = list()
+        self.published_callbacks = list()
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['structures'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def derive(self) -> 'CatalogVersion':
+        return CatalogVersion(self.number + 1, **self.structures)
+
+    def mutable(self, name: str):
+        """ Returns the named structure, first copying it if it is still shared with other versions. """
+        if name not in self.owned:
+            self.structures[name] = copy.copy(self.structures[name])
+            self.owned.add(name)
+        return self.structures[name]
+
+    def mutable_entry(self, name: str, key, default_factory=SharedList):
+        """ Returns the value at key in the named dict, first copying the dict and the value if they are shared. """
+        mapping = self.mutable(name)
+        owned_key = (name, key)
+        if owned_key not in self.owned or key not in mapping:
+            mapping[key] = copy.copy(mapping[key]) if key in mapping else default_factory()
+            self.owned.add(owned_key)
+        return mapping[key]
+
+    def replace(self, name: str, value):
+        self.structures[name] = value
+        self.owned.add(name)
+
+    def on_publish(self, callback):
+        self.publish_callbacks.append(callback)
+
+    def after_publish(self, callback):
+        self.published_callbacks.append(callback)
+
+
+class VersionedState:
+    """ Publishes CatalogVersions to readers that take no lock (read-copy-update).
+
+    Readers call current() and work on the version it returns. Writers run one at a time: write() derives a draft from
+    the published version, hands it to the writer and then publishes it with a single reference assignment, so a
+    reader sees either the whole write or none of it.
+
+    A thread can pin the published version, for instance for the duration of a request, so that all its reads see the
+    same version; its own writes move the pin forward. Inside batch(), a thread's writes all go to one draft, which it
+    reads from and which is published when the batch ends.
+    """
+
+    def __init__(self, version: CatalogVersion):
+        self._version = version
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._versions = weakref.WeakSet([version])
+
+    def current(self) -> CatalogVersion:
+        pinned = getattr(self._local, 'version', None)
+        return pinned if pinned is not None else self._version
+
+    @property
+    def published(self) -> CatalogVersion:
+        return self._version
+
+    @property
+    def live_versions(self) -> int:
+        # Versions not yet reclaimed, the published one included.
+        return len(self._versions)
+
+    def pin(self):
+        self._local.version = self._version
+
+    def unpin(self):
+        self._local.version = None
+
+    @contextmanager
+    def write(self):
+        with self._write_lock:
+            batch_draft = getattr(self._local, 'batch_draft', None)
+            if batch_draft is not None:
+                yield batch_draft
+                return
+
+            draft = self._version.derive()
+            yield draft
+            self._publish(draft)
+        self._published(draft)
+
+    @contextmanager
+    def batch(self):
+        with self._write_lock:
+            if getattr(self._local, 'batch_draft', None) is not None:
+                # Already batching; the outer batch publishes.
+                yield
+                return
+
+            draft = self._version.derive()
+            pinned = getattr(self._local, 'version', None)
+            self._local.batch_draft = draft
+            self._local.version = draft
+            try:
+                yield
+            finally:
+                self._local.batch_draft = None
+                self._local.version = pinned
+            self._publish(draft)
+        self._published(draft)
+
+    def _publish(self, draft: CatalogVersion):
+        # A callback that fails leaves the draft unpublished.
+        for callback in draft.publish_callbacks:
+            callback()
+        self._version = draft
+        self._versions.add(draft)
+        if getattr(self._local, 'version', None) is not None:
+            # Read your own writes.
+            self._local.version = draft
+
+    @staticmethod
+    def _published(draft: CatalogVersion):
+        # A published version is never changed, so what its writer owned no longer matters; after a batch that is
+        # worth freeing here rather than in the next write.
+        draft.owned = set()
+        callbacks, draft.published_callbacks = draft.published_callbacks, list()
+        draft.publish_callbacks = list()
+        for callback in callbacks:
+            callback()
+
+
+def writes(method):
+    # Runs a method of an object with a VersionedState in self._state, passing it the draft version to change.
+    @functools.wraps(method)
+    def writing_method(self, *args, **kwargs):
+        with self._state.write() as draft:
+            return method(self, draft, *args, **kwargs)
+    return writing_method
@@ -1,9 +1,24 @@
 import csv
+import os
 from datetime import datetime
 from typing import List, Iterable
 
 
+# In compact mode the domain classes are built with __slots__ only, so instances carry no __dict__. SQLAlchemy's
+# classical mapping keeps mapped column values in the instance __dict__ and tracks instances through weak references,
+# so compact mode is for the memory repository; by default mapped classes keep both. The classes are built on import,
+# before config.py loads .env, so COMPACT_MODEL has to be set in the real environment.
+COMPACT_MODEL = os.environ.get('COMPACT_MODEL', 'False') == 'True'
+
+
+def mapped_slots(*names):
+    if COMPACT_MODEL:
+        return names
+    return names + ('__dict__', '__weakref__')
+
+
 class Director:
+    __slots__ = ('__director_full_name',)
 
     def __init__(self, director_full_name: str):
         if director_full_name == "" or type(director_full_name) is not str:
@@ -31,6 +46,7 @@ class Director:
 
 
 class Actor:
+    __slots__ = ('__actor_full_name', '__actors_this_one_has_worked_with')
 
     def __init__(self, actor_full_name: str):
         if actor_full_name == "" or type(actor_full_name) is not str:
@@ -67,18 +83,27 @@ class Actor:
 
 
 class Movie:
+    __slots__ = mapped_slots('__id', '__title', '__release_year', '__description', '__director', '__actors',
+                             '__genres', '__runtime_minutes', '__rating', '__votes', '__revenue', '__metascore',
+                             '__reviews', '__identity_hash')
 
     def __set_title_internal(self, title: str):
         if title.strip() == "" or type(title) is not str:
             self.__title = None
         else:
             self.__title = title.strip()
+        self.__set_identity_internal()
 
     def __set_release_year_internal(self, release_year: int):
         if release_year >= 1900 and type(release_year) is int:
             self.__release_year = release_year
         else:
             self.__release_year = None
+        self.__set_identity_internal()
+
+    def __set_identity_internal(self):
+        # Title and release year identify a Movie; their hash is kept so __hash__ doesn't rebuild it on every call.
+        self.__identity_hash = hash((getattr(self, '_Movie__title', None), getattr(self, '_Movie__release_year', None)))
 
     def __init__(self, title: str, release_year: int, id: int = None):
 
@@ -91,17 +116,24 @@ class Movie:
         self.__actors = []
         self.__genres = []
         self.__runtime_minutes = None
-        self.__reviews = []
+        self.__rating = None
+        self.__votes = None
+        self.__revenue = None
+        self.__metascore = None
 
     # essential attributes
 
     @property
     def reviews(self) -> list:
-        return self.__reviews
+        # Most Movies are never reviewed, so a Movie's list of reviews is only made for its first one.
+        try:
+            return self.__reviews
+        except AttributeError:
+            return []
 
     @property
     def number_of_reviews(self) -> int:
-        return len(self.__reviews)
+        return len(self.reviews)
 
     @property
     def id(self) -> int:
@@ -175,7 +207,10 @@ class Movie:
             pass
 
     def add_review(self, review: 'Review'):
-        self.__reviews.append(review)
+        try:
+            self.__reviews.append(review)
+        except AttributeError:
+            self.__reviews = [review]
 
     @property
     def genres(self) -> list:
@@ -214,6 +249,53 @@ class Movie:
         else:
             raise ValueError(f'Movie.runtime_minutes setter: Value out of range {val}')
 
+    # scores; None when unknown
+
+    @property
+    def rating(self) -> float:
+        return self.__rating
+
+    @rating.setter
+    def rating(self, rating: float):
+        if type(rating) in (int, float) and 0 <= rating <= 10:
+            self.__rating = float(rating)
+        else:
+            self.__rating = None
+
+    @property
+    def votes(self) -> int:
+        return self.__votes
+
+    @votes.setter
+    def votes(self, votes: int):
+        if type(votes) is int and votes >= 0:
+            self.__votes = votes
+        else:
+            self.__votes = None
+
+    @property
+    def revenue(self) -> float:
+        # Box office revenue, in millions of dollars.
+        return self.__revenue
+
+    @revenue.setter
+    def revenue(self, revenue: float):
+        if type(revenue) in (int, float) and revenue >= 0:
+            self.__revenue = float(revenue)
+        else:
+            self.__revenue = None
+
+    @property
+    def metascore(self) -> int:
+        return self.__metascore
+
+    @metascore.setter
+    def metascore(self, metascore: int):
+        if type(metascore) is int and 0 <= metascore <= 100:
+            self.__metascore = metascore
+        else:
+            self.__metascore = None
+
     def __get_unique_string_rep(self):
         return f"{self.__title}, {self.__release_year}"
 
@@ -223,7 +305,7 @@ class Movie:
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
-        return self.__get_unique_string_rep() == other.__get_unique_string_rep()
+        return self.__title == other.__title and self.__release_year == other.__release_year
 
     def __lt__(self, other):
         if self.title == other.title:
@@ -231,12 +313,17 @@ class Movie:
         return self.title < other.title
 
     def __hash__(self):
-        return hash(self.__get_unique_string_rep())
+        try:
+            return self.__identity_hash
+        except AttributeError:
+            self.__set_identity_internal()
+            return self.__identity_hash
 
 
 class Review:
+    __slots__ = mapped_slots('__movie', '__review_text', '__rating', '__timestamp', '__user')
 
-    def __init__(self, movie: Movie, review_text: str, rating: int, user: 'User'):
+    def __init__(self, movie: Movie, review_text: str, rating: int, user: 'User', timestamp: datetime = None):
         if isinstance(movie, Movie):
             self.__movie = movie
         else:
@@ -249,7 +336,7 @@ class Review:
             self.__rating = rating
         else:
             self.__rating = None
-        self.__timestamp = datetime.today()
+        self.__timestamp = timestamp if isinstance(timestamp, datetime) else datetime.today()
         if isinstance(user, User):
             self.__user = user
         else:
@@ -285,6 +372,7 @@ class Review:
 
 
 class Genre:
+    __slots__ = mapped_slots('__genre_movies', '__genre_name')
 
     def __init__(self, genre_name: str):
         self.__genre_movies: List[Movie] = list()
@@ -327,6 +415,8 @@ class Genre:
 
 
 class User:
+    __slots__ = mapped_slots('__username', '__password', '__watched_movies', '__reviews',
+                             '__time_spent_watching_movies_minutes')
 
     def __init__(self, username: str, password: str):
         if username == "" or type(username) is not str:
@@ -432,10 +522,54 @@ class WatchList:
             return item_required
 
 
+class EntityRegistry:
+    """ Hands out one shared Actor, Director and Genre instance per name.
+
+    Loaders ask the registry for an entity instead of constructing it, so a name that appears on many rows is
+    represented by a single object.
+    """
+
+    def __init__(self):
+        self.__actors = dict()
+        self.__directors = dict()
+        self.__genres = dict()
+
+    @staticmethod
+    def __intern(entities: dict, entity_class, name: str):
+        key = name.strip() if type(name) is str else name
+        entity = entities.get(key)
+        if entity is None:
+            entity = entity_class(name)
+            entities[key] = entity
+        return entity
+
+    def actor(self, actor_full_name: str) -> Actor:
+        return self.__intern(self.__actors, Actor, actor_full_name)
+
+    def director(self, director_full_name: str) -> Director:
+        return self.__intern(self.__directors, Director, director_full_name)
+
+    def genre(self, genre_name: str) -> 'Genre':
+        return self.__intern(self.__genres, Genre, genre_name)
+
+    @property
+    def actors(self) -> list:
+        return list(self.__actors.values())
+
+    @property
+    def directors(self) -> list:
+        return list(self.__directors.values())
+
+    @property
+    def genres(self) -> list:
+        return list(self.__genres.values())
+
+
 class MovieFileCSVReader:
 
-    def __init__(self, file_name: str):
+    def __init__(self, file_name: str, registry: EntityRegistry = None):
         self.__file_name = file_name
+        self.__registry = registry if registry is not None else EntityRegistry()
         self.__dataset_of_ids = []
         self.__dataset_of_movies = []
         self.__dataset_of_actors = set()
@@ -449,22 +583,22 @@ class MovieFileCSVReader:
             for row in movie_file_reader:
                 movie = Movie(row['Title'], int(row['Year']))
                 movie.description = row['Description']
-                movie.__id = int(row['Rank'])
+                movie.id = int(row['Rank'])
                 movie.runtime_minutes = int(row['Runtime (Minutes)'])
 
-                director = Director(row['Director'])
+                director = self.__registry.director(row['Director'])
                 self.__dataset_of_directors.add(director)
                 movie.director = director
 
                 parsed_genres = row['Genre'].split(',')
                 for genre_string in parsed_genres:
-                    genre = Genre(genre_string)
+                    genre = self.__registry.genre(genre_string)
                     self.__dataset_of_genres.add(genre)
                     movie.add_genre(genre)
 
                 parsed_actors = row['Actors'].split(',')
                 for actor_string in parsed_actors:
-                    actor = Actor(actor_string)
+                    actor = self.__registry.actor(actor_string)
                     self.__dataset_of_actors.add(actor)
                     movie.add_actor(actor)
 
@@ -491,8 +625,8 @@ class ModelException(Exception):
     pass
 
 
-def add_review(review_text: str, user: User, movie: Movie, rating: int = None):
-    review = Review(movie, review_text, rating, user)
+def add_review(review_text: str, user: User, movie: Movie, rating: int = None, timestamp: datetime = None):
+    review = Review(movie, review_text, rating, user, timestamp)
     user.add_review(review)
     movie.add_review(review)
 
@@ -1,7 +1,7 @@
 from datetime import date
 
 from flask import Blueprint
-from flask import request, render_template, redirect, url_for, session
+from flask import request, render_template, redirect, url_for, session, jsonify, current_app
 
 from better_profanity import profanity
 from flask_wtf import FlaskForm
@@ -24,14 +24,44 @@ def home():
     return render_template('home/home.html', form=form, selected_movies=utilities.get_selected_movies())
 
 
+@home_blueprint.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    completions_per_kind = 10
+
+    # Read query parameters.
+    prefix = request.args.get('q', '')
+
+    # Return actor and director names that complete the prefix, as JSON.
+    completions = services.get_name_completions(prefix, completions_per_kind, repo.repo_instance)
+    return jsonify(completions)
+
+
+@home_blueprint.route('/costar_path', methods=['GET'])
+def costar_path():
+    max_depth = 6
+
+    # Read query parameters.
+    actor_name = request.args.get('from', '')
+    colleague_name = request.args.get('to', '')
+
+    # Return whether the actors worked together, and the shortest chain of co-stars between them, as JSON.
+    return jsonify(services.get_costar_path(actor_name, colleague_name, max_depth, repo.repo_instance))
+
+
 @home_blueprint.route('/movies_by_actor', methods=['GET', 'POST'])
-def movies_by_actor(form):
+def movies_by_actor(form=None):
+    if form is None:
+        # Submitted from the search form, or following a navigation link that names the actor as a query parameter.
+        form = SearchForm(request.form)
+        if not form.actor.data:
+            form.actor.data = request.args.get('actor', '')
     actor_name = form.actor.data
 
-    movies_per_page = 3
+    movies_per_page = current_app.config['MOVIES_PER_PAGE']
 
-    # Read query parameters.
-    cursor = request.args.get('cursor')
+    # Read query parameters. A page follows the movie key after, or precedes the movie key before.
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
     movie_to_show_reviews = request.args.get('view_reviews_for')
 
     if movie_to_show_reviews is None:
@@ -41,42 +71,31 @@ def movies_by_actor(form):
         # Convert movie_to_show_reviews from string to int.
         movie_to_show_reviews = int(movie_to_show_reviews)
 
-    if cursor is None:
-        # No cursor query parameter, so initialise cursor to start at the beginning.
-        cursor = 0
-    else:
-        # Convert cursor from string to int.
-        cursor = int(cursor)
-
-    # Retrieve movie ids for movie with genre_name.
-    movie_ids = services.get_movie_ids_by_actor(actor_name, repo.repo_instance)
-
-    # Retrieve the batch of movies to display on the Web page.
-    movies = services.get_movies_by_id(movie_ids[cursor:cursor + movies_per_page], repo.repo_instance)
+    # Retrieve the batch of movies starring the actor to display on the Web page, and the keys of the pages either
+    # side.
+    movies, previous_key, next_key = services.get_movies_by_actor_page(
+        actor_name, movies_per_page, after, before, repo.repo_instance)
 
     first_movie_url = None
     last_movie_url = None
     next_movie_url = None
     prev_movie_url = None
 
-    if cursor > 0:
+    if previous_key is not None:
         # There are preceding movies, so generate URLs for the 'previous' and 'first' navigation buttons.
-        prev_movie_url = url_for('home_bp.movies_by_actor', actor=actor_name, cursor=cursor - movies_per_page)
+        prev_movie_url = url_for('home_bp.movies_by_actor', actor=actor_name, before=previous_key)
         first_movie_url = url_for('home_bp.movies_by_actor', actor=actor_name)
 
-    if cursor + movies_per_page < len(movie_ids):
-        # There are further movies, so generate URLs for the 'next' and 'last' navigation buttons.
-        next_movie_url = url_for('home_bp.movies_by_actor', actor=actor_name, cursor=cursor + movies_per_page)
-
-        last_cursor = movies_per_page * int(len(movie_ids) / movies_per_page)
-        if len(movie_ids) % movies_per_page == 0:
-            last_cursor -= movies_per_page
-        last_movie_url = url_for('home_bp.movies_by_actor', actor=actor_name, cursor=last_cursor)
+    if next_key is not None:
+        # There are further movies, so generate a URL for the 'next' navigation button.
+        next_movie_url = url_for('home_bp.movies_by_actor', actor=actor_name, after=next_key)
 
     # Construct urls for viewing movie reviews and adding reviews.
     for movie in movies:
-        movie['view_review_url'] = url_for('home_bp.movies_by_actor', actor=actor_name, cursor=cursor,
+        movie['view_review_url'] = url_for('home_bp.movies_by_actor', actor=actor_name, after=after, before=before,
                                            view_comments_for=movie['id'])
+        if movie['id'] == movie_to_show_reviews:
+            movie['reviews'] = services.get_reviews_for_movie(movie['id'], repo.repo_instance)
         movie['add_review_url'] = url_for('home_bp.movies_by_actor', movie=movie['id'])
 
     # Generate the webpage to display the movies.
@@ -86,9 +105,8 @@ def movies_by_actor(form):
         movies=movies,
         form=form,
         movies_title='Movies starring actor: ' + actor_name,
-        selected_movies=utilities.get_selected_movies(len(movies) * 2),
+        selected_movies=utilities.get_selected_movies(len(movies) * 2, movies),
         handler_url=url_for('home_bp.movies_by_actor'),
-        actor_urls=utilities.get_actors_and_urls(),
         genre_urls=utilities.get_genres_and_urls(),
         first_movie_url=first_movie_url,
         last_movie_url=last_movie_url,
@@ -1,7 +1,7 @@
 from datetime import date
 
 from flask import Blueprint
-from flask import request, render_template, redirect, url_for, session
+from flask import request, render_template, redirect, url_for, session, current_app, abort
 
 from better_profanity import profanity
 from flask_wtf import FlaskForm
@@ -11,6 +11,8 @@ from wtforms import TextAreaField, HiddenField, SubmitField
 from wtforms.validators import DataRequired, Length, ValidationError
 
 import movie.adapters.repository as repo
+from movie.adapters.facets import FACET_NAMES
+from movie.adapters.repository import SCORE_NAMES
 import movie.utilities.utilities as utilities
 import movie.movies.services as services
 
@@ -49,8 +51,8 @@ def movies_by_year():
     # before and after the target year.
     target_year = int(target_year)
     movies = services.get_movies_by_release_year(target_year, repo.repo_instance)
-    previous_year = target_year - 1
-    next_year = target_year + 1
+    previous_year = services.get_previous_release_year(target_year, repo.repo_instance)
+    next_year = services.get_next_release_year(target_year, repo.repo_instance)
     first_movie_url = None
     last_movie_url = None
     next_movie_url = None
@@ -72,6 +74,8 @@ def movies_by_year():
         for movie in movies:
             movie['view_review_url'] = url_for('movies_bp.movies_by_year', year=str(target_year),
                                                view_comments_for=movie['id'])
+            if movie['id'] == movie_to_show_reviews:
+                movie['reviews'] = services.get_reviews_for_movie(movie['id'], repo.repo_instance)
             movie['add_review_url'] = url_for('movies_bp.review_on_movie', movie=str(movie['id']))
 
         # Generate the webpage to display the reviews.
@@ -80,7 +84,7 @@ def movies_by_year():
             title='Movies',
             movies_title=target_year,
             movies=movies,
-            selected_movies=utilities.get_selected_movies(len(movies) * 2),
+            selected_movies=utilities.get_selected_movies(len(movies) * 2, movies),
             genre_urls=utilities.get_genres_and_urls(),
             first_movie_url=first_movie_url,
             last_movie_url=last_movie_url,
@@ -95,11 +99,12 @@ def movies_by_year():
 
 @movies_blueprint.route('/movies_by_genre', methods=['GET'])
 def movies_by_genre():
-    movies_per_page = 3
+    movies_per_page = current_app.config['MOVIES_PER_PAGE']
 
-    # Read query parameters.
+    # Read query parameters. A page follows the movie key after, or precedes the movie key before.
     genre_name = request.args.get('genre')
-    cursor = request.args.get('cursor')
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
     movie_to_show_reviews = request.args.get('view_reviews_for')
 
     if movie_to_show_reviews is None:
@@ -109,18 +114,193 @@ def movies_by_genre():
         # Convert movie_to_show_reviews from string to int.
         movie_to_show_reviews = int(movie_to_show_reviews)
 
-    if cursor is None:
-        # No cursor query parameter, so initialise cursor to start at the beginning.
-        cursor = 0
-    else:
-        # Convert cursor from string to int.
-        cursor = int(cursor)
+    # Retrieve the batch of movies with genre_name to display on the Web page, and the keys of the pages either side.
+    movies, previous_key, next_key = services.get_movies_by_genre_page(
+        genre_name, movies_per_page, after, before, repo.repo_instance)
+
+    first_movie_url = None
+    last_movie_url = None
+    next_movie_url = None
+    prev_movie_url = None
+
+    if previous_key is not None:
+        # There are preceding movies, so generate URLs for the 'previous' and 'first' navigation buttons.
+        prev_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, before=previous_key)
+        first_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name)
+
+    if next_key is not None:
+        # There are further movies, so generate a URL for the 'next' navigation button.
+        next_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, after=next_key)
+
+    # Construct urls for viewing movie reviews and adding reviews.
+    for movie in movies:
+        movie['view_review_url'] = url_for('movies_bp.movies_by_genre', genre=genre_name, after=after, before=before,
+                                           view_comments_for=movie['id'])
+        if movie['id'] == movie_to_show_reviews:
+            movie['reviews'] = services.get_reviews_for_movie(movie['id'], repo.repo_instance)
+        movie['add_review_url'] = url_for('movies_bp.review_on_movie', movie=movie['id'])
+
+    # Generate the webpage to display the movies.
+    return render_template(
+        'movies/movies.html',
+        title='Movies',
+        movies_title='Movies by genre: ' + genre_name,
+        movies=movies,
+        selected_movies=utilities.get_selected_movies(len(movies) * 2, movies),
+        genre_urls=utilities.get_genres_and_urls(),
+        first_movie_url=first_movie_url,
+        last_movie_url=last_movie_url,
+        prev_movie_url=prev_movie_url,
+        next_movie_url=next_movie_url,
+        show_reviews_for_movie=movie_to_show_reviews
+    )
+
+
+@movies_blueprint.route('/top_movies', methods=['GET'])
+def top_movies():
+    movies_per_page = 10
+
+    # Read query parameters.
+    score = request.args.get('by', 'rating')
+    genre_name = request.args.get('genre')
+    release_year = request.args.get('year')
 
-    # Retrieve movie ids for movie with genre_name.
-    movie_ids = services.get_movie_ids_by_genre(genre_name, repo.repo_instance)
+    if score not in SCORE_NAMES:
+        # Nothing to rank by, so return the homepage.
+        return redirect(url_for('home_bp.home'))
 
-    # Retrieve the batch of movies to display on the Web page.
-    movies = services.get_movies_by_id(movie_ids[cursor:cursor + movies_per_page], repo.repo_instance)
+    if release_year is not None:
+        if not release_year.strip().isdecimal():
+            # Not a year, so the request is malformed.
+            abort(400)
+        # Convert release_year from string to int.
+        release_year = int(release_year)
+
+    # Retrieve the highest scoring movies.
+    movies = services.get_top_movies(score, movies_per_page, genre_name, release_year, repo.repo_instance)
+
+    # Construct urls for adding reviews.
+    for movie in movies:
+        movie['add_review_url'] = url_for('movies_bp.review_on_movie', movie=movie['id'])
+
+    # E.g. 'Highest rating: Sci-Fi, 2014'.
+    movies_title = f'Highest {score}'
+    filters = [str(value) for value in (genre_name, release_year) if value is not None]
+    if filters:
+        movies_title += ': ' + ', '.join(filters)
+
+    # Generate the webpage to display the movies.
+    return render_template(
+        'movies/movies.html',
+        title='Movies',
+        movies_title=movies_title,
+        movies=movies,
+        selected_movies=utilities.get_selected_movies(len(movies) * 2, movies),
+        genre_urls=utilities.get_genres_and_urls(),
+        first_movie_url=None,
+        last_movie_url=None,
+        prev_movie_url=None,
+        next_movie_url=None,
+        show_reviews_for_movie=-1
+    )
+
+
+@movies_blueprint.route('/browse', methods=['GET'])
+def browse():
+    movies_per_page = current_app.config['MOVIES_PER_PAGE']
+
+    # Read query parameters. Each facet may be given several times: genre=Drama&genre=Music matches either genre,
+    # all_genre=... matches every such genre, and not_genre=... matches none of them. A page follows the movie key
+    # after, or precedes the movie key before.
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
+    filters = {
+        prefix: {facet: _facet_values(facet, request.args.getlist(prefix + facet))
+                 for facet in FACET_NAMES if prefix + facet in request.args}
+        for prefix in ('', 'all_', 'not_')
+    }
+
+    # Retrieve the batch of matching movies to display on the Web page, the number of matches, the facet counts and
+    # the keys of the pages either side.
+    movies, number_of_matches, facet_counts, previous_key, next_key = services.browse_movies(
+        filters['all_'], filters[''], filters['not_'], movies_per_page, after, before, repo.repo_instance)
+
+    # The current filters, to carry over into navigation and facet URLs.
+    args = {name: request.args.getlist(name) for name in request.args if name not in ('after', 'before')}
+
+    first_movie_url = None
+    last_movie_url = None
+    next_movie_url = None
+    prev_movie_url = None
+
+    if previous_key is not None:
+        # There are preceding movies, so generate URLs for the 'previous' and 'first' navigation buttons.
+        prev_movie_url = url_for('movies_bp.browse', before=previous_key, **args)
+        first_movie_url = url_for('movies_bp.browse', **args)
+
+    if next_key is not None:
+        # There are further movies, so generate a URL for the 'next' navigation button.
+        next_movie_url = url_for('movies_bp.browse', after=next_key, **args)
+
+    # Construct urls for narrowing the matches down to each counted facet value.
+    facet_urls = {
+        facet: [(value, count, url_for('movies_bp.browse', **dict(
+            args, **{'all_' + facet: list(dict.fromkeys(args.get('all_' + facet, list()) + [str(value)]))})))
+                for value, count in counts]
+        for facet, counts in facet_counts.items()
+    }
+
+    # Construct urls for adding reviews.
+    for movie in movies:
+        movie['add_review_url'] = url_for('movies_bp.review_on_movie', movie=movie['id'])
+
+    # Generate the webpage to display the movies.
+    return render_template(
+        'movies/movies.html',
+        title='Movies',
+        movies_title=f'Browse ({number_of_matches} movies)',
+        movies=movies,
+        facet_urls=facet_urls,
+        selected_movies=utilities.get_selected_movies(len(movies) * 2, movies),
+        genre_urls=utilities.get_genres_and_urls(),
+        first_movie_url=first_movie_url,
+        last_movie_url=last_movie_url,
+        prev_movie_url=prev_movie_url,
+        next_movie_url=next_movie_url,
+        show_reviews_for_movie=-1
+    )
+
+
+def _facet_values(facet: str, values: list):
+    # Release years are ints, and values that aren't years are dropped; other facet values are names.
+    if facet == 'year':
+        return [int(value) for value in values if value.strip().isdecimal()]
+    return values
+
+
+@movies_blueprint.route('/search', methods=['GET'])
+def search():
+    movies_per_page = 3
+
+    # Read query parameters.
+    query = request.args.get('q')
+    # A cursor that isn't a number starts at the beginning, and one before the beginning starts there.
+    cursor = max(request.args.get('cursor', 0, type=int), 0)
+    movie_to_show_reviews = request.args.get('view_reviews_for')
+
+    if query is None or query.strip() == '':
+        # Nothing to search for, so return the homepage.
+        return redirect(url_for('home_bp.home'))
+
+    if movie_to_show_reviews is None:
+        # No view-reviews query parameter, so set to a non-existent movie id.
+        movie_to_show_reviews = -1
+    else:
+        # Convert movie_to_show_reviews from string to int.
+        movie_to_show_reviews = int(movie_to_show_reviews)
+
+    # Retrieve the batch of best matching movies to display on the Web page, and the number of matches.
+    movies, number_of_matches = services.search_movies(query, cursor, movies_per_page, repo.repo_instance)
 
     first_movie_url = None
     last_movie_url = None
@@ -129,31 +309,32 @@ def movies_by_genre():
 
     if cursor > 0:
         # There are preceding movies, so generate URLs for the 'previous' and 'first' navigation buttons.
-        prev_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, cursor=cursor - movies_per_page)
-        first_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name)
+        prev_movie_url = url_for('movies_bp.search', q=query, cursor=max(cursor - movies_per_page, 0))
+        first_movie_url = url_for('movies_bp.search', q=query)
 
-    if cursor + movies_per_page < len(movie_ids):
+    if cursor + movies_per_page < number_of_matches:
         # There are further movies, so generate URLs for the 'next' and 'last' navigation buttons.
-        next_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, cursor=cursor + movies_per_page)
+        next_movie_url = url_for('movies_bp.search', q=query, cursor=cursor + movies_per_page)
 
-        last_cursor = movies_per_page * int(len(movie_ids) / movies_per_page)
-        if len(movie_ids) % movies_per_page == 0:
+        last_cursor = movies_per_page * int(number_of_matches / movies_per_page)
+        if number_of_matches % movies_per_page == 0:
             last_cursor -= movies_per_page
-        last_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, cursor=last_cursor)
+        last_movie_url = url_for('movies_bp.search', q=query, cursor=last_cursor)
 
     # Construct urls for viewing movie reviews and adding reviews.
     for movie in movies:
-        movie['view_review_url'] = url_for('movies_bp.movies_by_genre', genre=genre_name, cursor=cursor,
-                                           view_comments_for=movie['id'])
+        movie['view_review_url'] = url_for('movies_bp.search', q=query, cursor=cursor, view_reviews_for=movie['id'])
+        if movie['id'] == movie_to_show_reviews:
+            movie['reviews'] = services.get_reviews_for_movie(movie['id'], repo.repo_instance)
         movie['add_review_url'] = url_for('movies_bp.review_on_movie', movie=movie['id'])
 
     # Generate the webpage to display the movies.
     return render_template(
         'movies/movies.html',
         title='Movies',
-        movies_title='Movies by genre: ' + genre_name,
+        movies_title=f'Search results for: {query} ({number_of_matches} movies)',
         movies=movies,
-        selected_movies=utilities.get_selected_movies(len(movies) * 2),
+        selected_movies=utilities.get_selected_movies(len(movies) * 2, movies),
         genre_urls=utilities.get_genres_and_urls(),
         first_movie_url=first_movie_url,
         last_movie_url=last_movie_url,
@@ -210,7 +391,7 @@ def review_on_movie():
         movie=movie,
         form=form,
         handler_url=url_for('movies_bp.review_on_movie'),
-        selected_movies=utilities.get_selected_movies(),
+        selected_movies=utilities.get_selected_movies(3, [movie]),
         genre_urls=utilities.get_genres_and_urls(),
         username=username
     )
@@ -1,6 +1,7 @@
 from typing import List, Iterable
 
-from movie.adapters.repository import AbstractRepository
+from movie.adapters.repository import AbstractRepository, MoviePage, page_movie_ids
+from movie.adapters.review_stats import ReviewStats
 from movie.domain.model import Movie, Review, Genre, Actor, User, add_review as make_review
 
 
@@ -41,11 +42,72 @@ def get_movie_ids_for_title(title, repo: AbstractRepository):
     return movie_ids
 
 
+def search_movies(query: str, cursor: int, movies_per_page: int, repo: AbstractRepository):
+    # Returns the page of matching movies starting at cursor, and the total number of matches.
+    movie_ids, total = repo.search_movie_ids(query, cursor, movies_per_page)
+
+    # Keep the ranked order, which get_movies_by_id doesn't promise.
+    movies = {movie.id: movie for movie in repo.get_movies_by_id(movie_ids)}
+    movies_as_dict = movies_to_dict([movies[id] for id in movie_ids if id in movies], repo)
+
+    return movies_as_dict, total
+
+
+def browse_movies(all_of: dict, any_of: dict, none_of: dict, movies_per_page: int, after: int, before: int,
+                  repo: AbstractRepository):
+    # Returns the page of movies matching the facet filters that follows after or precedes before, the number of
+    # matches, the most common values of each facet among the matches, and the keys of the pages either side.
+    movie_ids, facet_counts = repo.get_faceted_movie_ids(all_of, any_of, none_of)
+    page = page_movie_ids(movie_ids, movies_per_page, after, before)
+    movies_as_dict, previous_key, next_key = movies_page_to_dict(page, repo)
+
+    return movies_as_dict, len(movie_ids), facet_counts, previous_key, next_key
+
+
+def get_name_completions(prefix: str, limit: int, repo: AbstractRepository):
+    # Returns actor and director names starting with prefix, actors first.
+    actor_names = repo.get_actor_names_by_prefix(prefix, limit)
+    director_names = repo.get_director_names_by_prefix(prefix, limit)
+
+    return {'actors': actor_names, 'directors': director_names}
+
+
+def get_costar_path(actor_name: str, colleague_name: str, max_depth: int, repo: AbstractRepository):
+    # Returns the chain of co-stars linking the two actors, with the id and title of the Movie behind each link.
+    worked_with = repo.actors_worked_together(actor_name, colleague_name)
+    path = repo.get_costar_path(actor_name, colleague_name, max_depth)
+    if path is None:
+        return {'worked_with': worked_with, 'degrees': None, 'path': []}
+
+    movies = {movie.id: movie for movie in repo.get_movies_by_id([movie_id for name, movie_id in path[1:]])}
+    links = [{'actor': path[0][0], 'movie': None}]
+    for name, movie_id in path[1:]:
+        movie = movies.get(movie_id)
+        links.append({'actor': name, 'movie': {'id': movie_id, 'title': movie.title if movie else None}})
+    return {'worked_with': worked_with, 'degrees': len(path) - 1, 'path': links}
+
+
 def get_movie_ids_by_actor(actor_name, repo: AbstractRepository):
     movie_ids = repo.get_movie_ids_by_actor(actor_name)
     return movie_ids
 
 
+def get_movies_by_genre_page(genre_name: str, movies_per_page: int, after: int, before: int,
+                             repo: AbstractRepository):
+    # Returns the page of movies with the genre that follows after or precedes before, and the keys of the pages
+    # either side.
+    page = repo.get_movie_ids_by_genre_page(genre_name, movies_per_page, after, before)
+    return movies_page_to_dict(page, repo)
+
+
+def get_movies_by_actor_page(actor_name: str, movies_per_page: int, after: int, before: int,
+                             repo: AbstractRepository):
+    # Returns the page of movies starring the actor that follows after or precedes before, and the keys of the pages
+    # either side.
+    page = repo.get_movie_ids_by_actor_page(actor_name, movies_per_page, after, before)
+    return movies_page_to_dict(page, repo)
+
+
 def get_movie_ids_by_genre(genre, repo: AbstractRepository):
     movie_ids = repo.get_movie_ids_by_genre(genre)
 
@@ -98,19 +160,37 @@ def get_movies_by_release_year(target_year, repo: AbstractRepository):
     movies_dto = list()
     if len(movies) > 0:
         # Convert Movies to dictionary form.
-        movies_dto = movies_to_dict(movies)
+        movies_dto = movies_to_dict(movies, repo)
     return movies_dto
 
 
+def get_previous_release_year(release_year, repo: AbstractRepository):
+    return repo.get_previous_release_year(release_year)
+
+
+def get_next_release_year(release_year, repo: AbstractRepository):
+    return repo.get_next_release_year(release_year)
+
+
 def get_movies_by_id(id_list, repo: AbstractRepository):
     movies = repo.get_movies_by_id(id_list)
 
     # Convert Movies to dictionary form.
-    movies_as_dict = movies_to_dict(movies)
+    movies_as_dict = movies_to_dict(movies, repo)
 
     return movies_as_dict
 
 
+def get_top_movies(score: str, limit: int, genre_name: str, release_year: int, repo: AbstractRepository):
+    # Returns the Movies with the highest score, highest first.
+    movie_ids = repo.get_top_movie_ids(score, limit, genre_name, release_year)
+    ranks = {movie_id: rank for rank, movie_id in enumerate(movie_ids)}
+    movies = sorted(repo.get_movies_by_id(movie_ids), key=lambda movie: ranks[movie.id])
+
+    # Convert Movies to dictionary form.
+    return movies_to_dict(movies, repo)
+
+
 def get_reviews_for_movie(movie_id, repo: AbstractRepository):
     movie = repo.get_movie(movie_id)
 
@@ -137,7 +217,7 @@ def reviews_to_dict(reviews: Iterable[Review]):
     return [review_to_dict(review) for review in reviews]
 
 
-def movie_to_dict(movie: Movie):
+def movie_to_dict(movie: Movie, review_stats: ReviewStats = None):
     movie_dict = {
         'id': movie.id,
         'title': movie.title,
@@ -146,13 +226,30 @@ def movie_to_dict(movie: Movie):
         'actors': movie.actors,
         'genres': movie.genres,
         'description': movie.description,
-        'reviews': movie.reviews
+        'rating': movie.rating,
+        'votes': movie.votes,
+        'revenue': movie.revenue,
+        'metascore': movie.metascore
     }
+    if review_stats is None:
+        movie_dict['reviews'] = movie.reviews
+    else:
+        # Summarise the Movie's Reviews without loading them.
+        movie_dict['review_count'] = review_stats.count
+        movie_dict['review_average'] = review_stats.average
     return movie_dict
 
 
-def movies_to_dict(movies: Iterable[Movie]):
-    return [movie_to_dict(movie) for movie in movies]
+def movies_to_dict(movies: Iterable[Movie], repo: AbstractRepository):
+    movies = list(movies)
+    review_stats = repo.get_review_stats([movie.id for movie in movies])
+    return [movie_to_dict(movie, review_stats[movie.id]) for movie in movies]
+
+
+def movies_page_to_dict(page: MoviePage, repo: AbstractRepository):
+    # The page's movies, in order, and the keys of the pages either side.
+    movies = sorted(repo.get_movies_by_id(page.movie_ids), key=lambda movie: movie.id)
+    return movies_to_dict(movies, repo), page.previous_key, page.next_key
 
 
 def actor_to_dict(actor: Actor, repo: AbstractRepository):
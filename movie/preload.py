@@ -0,0 +1,29 @@
+"""Share a preloaded 'memory' repository between forked worker processes.
+
+A pre-forking server, such as gunicorn with preload_app, builds the application and its repository once in the master
+process, and forked workers share the master's memory pages until they write to them. CPython writes to an object when
+the cyclic garbage collector visits it, so left alone a worker's first collections copy most of the catalog. These hooks
+follow the gc.freeze() documentation: no collections while the catalog is built, so no freed holes are left for the
+workers to fill, then everything is frozen into the permanent generation right before forking.
+"""
+import gc
+
+import movie.adapters.repository as repo
+from movie.adapters.memory_repository import MemoryRepository
+
+
+def before_preload():
+    # Call before the application is created in the master process.
+    gc.disable()
+
+
+def before_fork():
+    # Call in the master process once the application is created, before the first worker is forked.
+    if isinstance(repo.repo_instance, MemoryRepository):
+        repo.repo_instance.compact_indexes()
+    gc.freeze()
+
+
+def after_fork():
+    # Call first thing in every worker process.
+    gc.enable()
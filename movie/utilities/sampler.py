@@ -0,0 +1,215 @@
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain, zip_longest
+from typing import Callable, List
+
+
+class MovieSampler:
+    """ A ring of random movie summaries, shuffled ahead of time, that the sidebar takes from without the repository.
+
+    sample(n) is expected to return summaries of up to n distinct random movies, as dicts. The ring holds one such
+    sample, shuffled; take() hands out the next few summaries and moves on round the ring. Once every summary has been
+    handed out, a background thread takes a fresh sample, while take() carries on round the old ring, and the new ring
+    replaces the old one whole. Only one refill runs at a time; a thread is started from whichever process takes, so
+    a forked worker refills its own ring, and starts from its own place in the ring it inherited.
+    """
+
+    def __init__(self, sample: Callable[[int], List[dict]], pool_size: int = 256):
+        self._sample = sample
+        self._pool_size = pool_size
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = os.getpid()
+
+        # Replaced, never changed, so summaries can be read from it without the lock.
+        self._ring = tuple()
+        self._position = 0
+        self._served_since_refill = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._served = 0
+        self._refills = 0
+        self._refill_errors = 0
+        self._refill_seconds = None
+
+    def take(self, quantity: int) -> List[dict]:
+        """ Returns copies of the next quantity summaries in the ring, or none if the ring is still empty. """
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._pid = os.getpid()
+                self._thread = None
+                self._position = random.randrange(len(self._ring)) if len(self._ring) > 0 else 0
+
+            ring = self._ring
+            if len(ring) == 0:
+                self._misses += 1
+                self._start_refill()
+                return list()
+
+            quantity = min(quantity, len(ring))
+            start = self._position
+            self._position = (start + quantity) % len(ring)
+            self._hits += 1
+            self._served += quantity
+            self._served_since_refill += quantity
+            if self._served_since_refill >= len(ring):
+                self._start_refill()
+
+        summaries = ring[start:start + quantity] + ring[:max(start + quantity - len(ring), 0)]
+        return [dict(summary) for summary in summaries]
+
+    def refill(self):
+        """ Replaces the ring with a fresh, shuffled sample. """
+        start = time.perf_counter()
+        try:
+            summaries = list(self._sample(self._pool_size))
+        except Exception:
+            with self._lock:
+                self._refill_errors += 1
+            raise
+        random.shuffle(summaries)
+
+        with self._lock:
+            self._ring = tuple(summaries)
+            self._position = 0
+            self._served_since_refill = 0
+            self._refills += 1
+            self._refill_seconds = time.perf_counter() - start
+
+    def _start_refill(self):
+        # Call holding the lock.
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._refill_in_background, name='movie-sampler', daemon=True)
+        self._thread.start()
+
+    def _refill_in_background(self):
+        try:
+            self.refill()
+        except Exception:
+            # Counted in refill_errors; the old ring is served until a later refill succeeds.
+            pass
+
+    def join(self):
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'pool_size': len(self._ring),
+                'hits': self._hits,
+                'misses': self._misses,
+                'served': self._served,
+                'refills': self._refills,
+                'refill_errors': self._refill_errors,
+                'last_refill_ms': None if self._refill_seconds is None else round(self._refill_seconds * 1000, 3)
+            }
+
+
+class SimilarMovieCache:
+    """ Summaries of the movies most similar to each movie, looked up in the background, for the sidebar.
+
+    similar(movie_id, n) is expected to return summaries of up to n movies similar to the movie, most similar first,
+    as dicts. get() only reads what is already cached: movies it has nothing for are queued, and a background thread
+    looks them up, so a page shows random movies until the movies like its own are ready. The summaries of up to
+    capacity movies are kept, least recently used first out. As with MovieSampler, one thread runs at a time, started
+    from whichever process gets.
+    """
+
+    def __init__(self, similar: Callable[[int, int], List[dict]], limit: int = 6, capacity: int = 4096):
+        self._similar = similar
+        self._limit = limit
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = os.getpid()
+
+        # Movie id to a tuple of its similar movies' summaries, least recently used first.
+        self._summaries = OrderedDict()
+        # Movie ids waiting to be looked up, oldest first.
+        self._pending = OrderedDict()
+
+        self._hits = 0
+        self._misses = 0
+        self._lookups = 0
+        self._lookup_errors = 0
+
+    def get(self, movie_ids: List[int], quantity: int) -> List[dict]:
+        """ Returns copies of up to quantity cached summaries of movies like the given ones, other than them.
+
+        The most similar movie to each given movie is taken in turn, then the second most similar, and so on.
+        """
+        similar = list()
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._pid = os.getpid()
+                self._thread = None
+
+            for movie_id in movie_ids:
+                summaries = self._summaries.get(movie_id)
+                if summaries is None:
+                    self._misses += 1
+                    self._pending[movie_id] = None
+                    self._pending.move_to_end(movie_id)
+                    if len(self._pending) > self._capacity:
+                        self._pending.popitem(last=False)
+                else:
+                    self._hits += 1
+                    self._summaries.move_to_end(movie_id)
+                    similar.append(summaries)
+            if len(self._pending) > 0 and self._thread is None:
+                self._thread = threading.Thread(target=self._look_up_pending, name='similar-movies', daemon=True)
+                self._thread.start()
+
+        selected = dict()
+        for summary in chain.from_iterable(zip_longest(*similar)):
+            if summary is not None and summary['id'] not in movie_ids and summary['id'] not in selected:
+                selected[summary['id']] = summary
+        return [dict(summary) for summary in list(selected.values())[:quantity]]
+
+    def _look_up_pending(self):
+        while True:
+            with self._lock:
+                if len(self._pending) == 0:
+                    self._thread = None
+                    return
+                movie_id = next(iter(self._pending))
+
+            try:
+                summaries = tuple(self._similar(movie_id, self._limit))
+            except Exception:
+                # Counted in lookup_errors; the movie is queued again the next time a page shows it.
+                summaries = None
+
+            with self._lock:
+                self._pending.pop(movie_id, None)
+                if summaries is None:
+                    self._lookup_errors += 1
+                    continue
+                self._summaries[movie_id] = summaries
+                self._summaries.move_to_end(movie_id)
+                if len(self._summaries) > self._capacity:
+                    self._summaries.popitem(last=False)
+                self._lookups += 1
+
+    def join(self):
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'cached': len(self._summaries),
+                'pending': len(self._pending),
+                'hits': self._hits,
+                'misses': self._misses,
+                'lookups': self._lookups,
+                'lookup_errors': self._lookup_errors
+            }
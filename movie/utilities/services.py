@@ -1,4 +1,5 @@
-from typing import Iterable
+from itertools import chain, zip_longest
+from typing import Iterable, List
 import random
 
 from movie.adapters.repository import AbstractRepository
@@ -8,31 +9,50 @@ from movie.domain.model import Movie
 def get_random_movies(quantity, repo: AbstractRepository):
 
     movie_count = repo.get_number_of_movies()
-    if quantity >= movie_count:
+    if quantity > movie_count:
         # Reduce the quantity of ids to generate if the repository has an insufficient number of movies.
-        quantity = movie_count - 1
+        quantity = movie_count
 
-    # Pick distinct and random articles.
-    random_ids = random.sample(range(1, movie_count), quantity)
+    # Pick distinct and random movies, from the first id to the last.
+    random_ids = random.sample(range(1, movie_count + 1), quantity)
     movies = repo.get_movies_by_id(random_ids)
 
     return movies_to_dict(movies)
 
 
+def get_similar_movies(movie_ids: List[int], quantity, repo: AbstractRepository):
+    # Take the most similar movie to each given movie in turn, then the second most similar, and so on.
+    similar_ids = [repo.get_similar_movie_ids(movie_id, quantity) for movie_id in movie_ids]
+    selected_ids = [id for id in dict.fromkeys(chain.from_iterable(zip_longest(*similar_ids)))
+                    if id is not None and id not in movie_ids][:quantity]
+
+    # Keep the order of similarity, which get_movies_by_id doesn't promise.
+    movies = {movie.id: movie for movie in repo.get_movies_by_id(selected_ids)}
+    return movies_to_dict([movies[id] for id in selected_ids if id in movies])
+
+
 # ============================================
 # Functions to convert dicts to model entities
 # ============================================
 
 def movie_to_dict(movie: Movie):
     movie_dict = {
+        'id': movie.id,
         'release_year': movie.release_year,
         'title': movie.title,
-        'genres': movie.genres,
-        'actors': movie.actors
+        'genres': names(movie.genres, 'genre_name'),
+        'actors': names(movie.actors, 'actor_full_name')
     }
     return movie_dict
 
 
+def names(values, name_attribute: str) -> List[str]:
+    # The database mapping gives a Movie's genres and actors as comma-separated text rather than Genres and Actors.
+    if isinstance(values, str):
+        return [name.strip() for name in values.split(',') if name.strip() != '']
+    return [getattr(value, name_attribute) for value in values]
+
+
 def movies_to_dict(movies: Iterable[Movie]):
     return [movie_to_dict(movie) for movie in movies]
 
@@ -1,21 +1,57 @@
-from flask import Blueprint, request, render_template, redirect, url_for, session
+from flask import Blueprint, request, render_template, redirect, url_for, session, jsonify
 
 import movie.adapters.repository as repo
 import movie.utilities.services as services
 
 # Configure Blueprint.
 from movie.adapters import database_repository
+from movie.utilities.sampler import MovieSampler, SimilarMovieCache
 
 utilities_blueprint = Blueprint(
     'utilities_bp', __name__)
 
+# The random movies for the sidebar, kept ready by a MovieSampler made in create_app.
+movie_sampler: MovieSampler = None
 
-def get_selected_movies(quantity=3):
-    movies = services.get_random_movies(quantity, repo.repo_instance)
-    movie_urls = dict()
+# The movies like those on a page, for the sidebar, looked up by a SimilarMovieCache made in create_app.
+similar_movie_cache: SimilarMovieCache = None
+
+
+@utilities_blueprint.route('/sidebar_stats', methods=['GET'])
+def sidebar_stats():
+    # Return how often the sidebar's random movies were served and refilled, and its similar movies found, as JSON.
+    return jsonify(dict(movie_sampler.stats(), similar=similar_movie_cache.stats()))
+
+
+def sample_movies(quantity):
+    # Runs on the sampler's own thread, outside any request, so closes that thread's database session when done.
+    try:
+        return services.get_random_movies(quantity, repo.repo_instance)
+    finally:
+        if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
+            repo.repo_instance.close_session()
+
+
+def similar_movies(movie_id, quantity):
+    # Runs on the similar movie cache's own thread, like sample_movies.
+    try:
+        return services.get_similar_movies([movie_id], quantity, repo.repo_instance)
+    finally:
+        if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
+            repo.repo_instance.close_session()
+
+
+def get_selected_movies(quantity=3, shown_movies=None):
+    # Recommend movies like those on the page, once they have been looked up, or else random movies. Neither makes a
+    # repository call.
+    movies = list()
+    if shown_movies:
+        movies = similar_movie_cache.get([movie['id'] for movie in shown_movies], quantity)
+    if not movies:
+        movies = movie_sampler.take(quantity)
     for movie in movies:
-        movie_urls['hyperlink'] = url_for('movies_bp.movies_by_year', year=movie['release_year'])
-    return movie_urls
+        movie['hyperlink'] = url_for('movies_bp.movies_by_year', release_year=movie['release_year'])
+    return movies
 
 
 def get_genres_and_urls():
@@ -81,11 +81,28 @@ def client():
         'TESTING': True,                                # Set to True during testing.
         'REPOSITORY': 'memory',                         # Set to 'memory' or 'database' depending on desired repository.
         'TEST_DATA_PATH': TEST_DATA_PATH_MEMORY,        # Path for loading test data into the repository.
-        'WTF_CSRF_ENABLED': False                       # test_client will not send a CSRF token, so disable validation.
+        'WTF_CSRF_ENABLED': False,                      # test_client will not send a CSRF token, so disable validation.
+        'MEMORY_SNAPSHOT_PATH': None,                   # Always populate from the test data, never from a snapshot.
+        'MEMORY_JOURNAL_PATH': None                     # Keep Users and Reviews added by tests out of any journal.
     })
 
     return my_app.test_client()
 
+@pytest.fixture
+def database_client(tmp_path):
+    my_app = create_app({
+        'TESTING': True,                                # Set to True during testing.
+        'REPOSITORY': 'database',                       # Serve from a database populated from the test data.
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "movie.db"}',
+        'SQLALCHEMY_ECHO': False,
+        'TEST_DATA_PATH': TEST_DATA_PATH_DATABASE,      # Path for loading test data into the repository.
+        'WTF_CSRF_ENABLED': False,                      # test_client will not send a CSRF token, so disable validation.
+        'MOVIE_FILE_RELOAD_SECONDS': 0                  # Leave the database as populated.
+    })
+
+    yield my_app.test_client()
+    clear_mappers()
+
 
 class AuthenticationManager:
     def __init__(self, client):
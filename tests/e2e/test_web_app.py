@@ -2,6 +2,8 @@ import pytest
 
 from flask import session
 
+import movie.utilities.utilities as utilities
+
 
 def test_register(client):
     # Check that we retrieve the register page.
@@ -123,3 +125,113 @@ def test_movies_with_genre(client):
     assert b'Movies by genre: Action' in response.data
     assert b'Guardians of the Galaxy' in response.data
     assert b'A group of intergalactic criminals are forced to work together to stop a fanatical warrior from taking control of the universe.' in response.data
+
+
+def test_search(client):
+    response = client.get('/search?q=guardians+galaxy')
+    assert response.status_code == 200
+    assert b'Search results for: guardians galaxy' in response.data
+    assert b'Guardians of the Galaxy' in response.data
+
+    for cursor in ('abc', '-3'):
+        response = client.get(f'/search?q=guardians+galaxy&cursor={cursor}')
+        assert response.status_code == 200
+        assert b'Guardians of the Galaxy' in response.data
+
+
+def test_search_without_query(client):
+    response = client.get('/search')
+    assert response.headers['Location'] == 'http://localhost/'
+
+
+def test_autocomplete(client):
+    response = client.get('/autocomplete?q=chris+pr')
+    assert response.status_code == 200
+    assert 'Chris Pratt' in response.get_json()['actors']
+
+
+def test_top_movies(client):
+    response = client.get('/top_movies?by=rating&genre=Sci-Fi&year=2014')
+    assert response.status_code == 200
+    assert b'Highest rating: Sci-Fi, 2014' in response.data
+    assert b'Interstellar' in response.data
+    assert b'Rating 8.6' in response.data
+
+    response = client.get('/top_movies?by=title')
+    assert response.headers['Location'] == 'http://localhost/'
+
+    response = client.get('/top_movies?by=rating&year=abc')
+    assert response.status_code == 400
+
+
+def test_browse(client):
+    response = client.get('/browse?all_genre=Sci-Fi&year=2014&not_actor=Chris+Pratt')
+    assert response.status_code == 200
+    assert b'Browse (16 movies)' in response.data
+    assert b'Guardians of the Galaxy' not in response.data
+    assert b'Sci-Fi (16)' in response.data
+
+    # Years that aren't numbers are dropped from the filters.
+    response = client.get('/browse?year=abc&year=2014')
+    assert response.status_code == 200
+    assert b'Browse (98 movies)' in response.data
+
+
+def test_listing_shows_review_totals_and_the_reviews_asked_for(client):
+    response = client.get('/search?q=Guardians')
+    assert b'2 reviews' in response.data
+    assert b'I love this movie' not in response.data
+
+    response = client.get('/search?q=Guardians&view_reviews_for=1')
+    assert b'I love this movie' in response.data
+
+
+def test_movies_by_genre_pages_from_keys(client):
+    response = client.get('/movies_by_genre?genre=Sci-Fi')
+    assert b'/movies_by_genre?genre=Sci-Fi&amp;after=13' in response.data
+    assert b'before=' not in response.data
+
+    response = client.get('/movies_by_genre?genre=Sci-Fi&after=13')
+    assert b'/movies_by_genre?genre=Sci-Fi&amp;before=' in response.data
+
+
+def test_sidebar_recommends_similar_movies(client):
+    # The movies like the page's are looked up in the background when the page is first shown.
+    client.get('/search?q=Guardians')
+    utilities.similar_movie_cache.join()
+
+    response = client.get('/search?q=Guardians')
+    sidebar = response.data[response.data.index(b'<aside'):]
+    assert b'Star Trek Into Darkness, (2013)' in sidebar
+    assert b'Guardians of the Galaxy' not in sidebar
+
+
+def test_database_repository_serves_the_home_page_with_a_sidebar(database_client):
+    response = database_client.get('/')
+    assert response.status_code == 200
+    assert b'<aside' in response.data
+
+    response = database_client.get('/movies_by_year?release_year=2014')
+    assert response.status_code == 200
+
+
+def test_sidebar_serves_random_movies_from_the_sampler(client):
+    hits = client.get('/sidebar_stats').get_json()['hits']
+    response = client.get('/')
+    sidebar = response.data[response.data.index(b'<aside'):]
+    assert sidebar.count(b'movie-container') == 3
+
+    stats = client.get('/sidebar_stats').get_json()
+    assert stats['hits'] == hits + 1
+    assert stats['pool_size'] > 0 and stats['refills'] >= 1
+
+
+def test_costar_path(client):
+    response = client.get('/costar_path?from=Chris+Pratt&to=Vin+Diesel')
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'worked_with': True,
+        'degrees': 1,
+        'path': [{'actor': 'Chris Pratt', 'movie': None},
+                 {'actor': 'Vin Diesel', 'movie': {'id': 1, 'title': 'Guardians of the Galaxy'}}]
+    }
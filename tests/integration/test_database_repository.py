@@ -1,10 +1,21 @@
+import csv
+import os
+import shutil
 from datetime import date, datetime
 
 import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, clear_mappers
 
+from movie.adapters import database_repository
 from movie.adapters.database_repository import SqlAlchemyRepository
+from movie.adapters.orm import metadata, map_model_to_tables
 from movie.domain.model import User, Movie, Genre, Review, add_review
 from movie.adapters.repository import RepositoryException
+from movie.adapters.review_stats import ReviewStats
+from movie.adapters.search import tokenize
+
+DATA_PATH_DATABASE = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'database')
 
 
 def test_repository_can_add_a_user(session_factory):
@@ -23,6 +34,7 @@ def test_repository_can_retrieve_a_user(session_factory):
 
     user = repo.get_user('fmercury')
     assert user == User('fmercury', '8734gfe2058v')
+    assert repo.get_user(username=' FMercury ') is user
 
 
 def test_repository_does_not_retrieve_a_non_existent_user(session_factory):
@@ -32,6 +44,35 @@ def test_repository_does_not_retrieve_a_non_existent_user(session_factory):
     assert user is None
 
 
+def test_repository_looks_users_up_by_normalized_username_once_a_session(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    statements = list()
+    event.listen(session_factory.kw['bind'], 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    user = repo.get_user(' FMercury')
+    assert user.username == 'fmercury'
+    assert 'normalized_username' in statements[-1]
+
+    statement_count = len(statements)
+    assert repo.get_user('fmercury') is user
+    assert len(statements) == statement_count
+
+    repo.close_session()
+    assert repo.get_user('fmercury') == user
+
+
+def test_normalized_usernames_are_added_to_an_older_database(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "movie.db"}')
+    engine.execute('CREATE TABLE users (username VARCHAR(255) NOT NULL UNIQUE, password VARCHAR(255) NOT NULL, '
+                   'id INTEGER PRIMARY KEY)')
+    engine.execute("INSERT INTO users (username, password) VALUES ('Thorke', 'aaa111')")
+
+    assert database_repository.add_normalized_usernames(engine)
+    assert not database_repository.add_normalized_usernames(engine)
+    assert engine.execute('SELECT normalized_username FROM users').fetchall() == [('thorke',)]
+
+
 def test_repository_can_retrieve_movie_count(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
@@ -54,6 +95,29 @@ def test_repository_can_add_movie(session_factory):
     assert repo.get_movie(new_movie_id) == movie
 
 
+def test_repository_indexes_an_added_movie(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert repo.get_actor_names_by_prefix('Zed M', 5) == []
+    assert repo.get_director_names_by_prefix('Ada Q', 5) == []
+    assert not repo.actors_worked_together('Zed Marlowe', 'Chris Pratt')
+    assert repo.get_faceted_movie_ids(all_of={'year': [2019]}).movie_ids == []
+    assert repo.get_similar_movie_ids(1001, 3) == []
+
+    # The database maps a Movie's director, actors and genres as comma-separated text.
+    movie = Movie('Rabbitville', 2019, 1001)
+    movie._Movie__director = 'Ada Quill'
+    movie._Movie__actors = 'Zed Marlowe, Chris Pratt'
+    movie._Movie__genres = 'Thriller,Sci-Fi'
+    repo.add_movie(movie)
+
+    assert repo.get_actor_names_by_prefix('Zed M', 5) == ['Zed Marlowe']
+    assert repo.get_director_names_by_prefix('Ada Q', 5) == ['Ada Quill']
+    assert repo.get_movie_ids_by_actor('Zed Marlow') == [1001]
+    assert repo.actors_worked_together('Zed Marlowe', 'Chris Pratt')
+    assert repo.get_faceted_movie_ids(all_of={'year': [2019]}).movie_ids == [1001]
+    assert len(repo.get_similar_movie_ids(1001, 3)) == 3
+
+
 def test_repository_can_retrieve_movie(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
@@ -98,6 +162,207 @@ def test_repository_does_not_retrieve_an_article_when_there_are_no_articles_for_
     assert len(movies) == 0
 
 
+def test_repository_can_get_neighbouring_release_years(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    assert repo.get_previous_release_year(2016) == 2015
+    assert repo.get_next_release_year(2000) == 2006
+    assert repo.get_previous_release_year(2006) is None
+    assert repo.get_next_release_year(2016) is None
+
+
+def test_repository_can_retrieve_movie_ids_by_release_year_range(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movie_ids = repo.get_movie_ids_by_release_year_range(2016, 2016)
+    assert len(movie_ids) == 297
+
+
+def test_repository_returns_movie_ids_for_title(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    assert repo.get_movie_ids_for_title('Prometheus') == [2]
+    assert repo.get_movie_ids_for_title('Not A Movie') == []
+
+
+def test_repository_can_search_movies(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movie_ids, total = repo.search_movie_ids('guardians galaxy', 0, 3)
+    assert movie_ids[0] == 1
+    assert total >= 1
+    assert repo.search_movie_ids('the', 0, 3) == ([], 0)
+
+
+@pytest.mark.parametrize('query', ['man', 'woman', 'guardians galaxy', 'the dark knight', 'young woman city'])
+def test_repository_ranks_searches_as_the_memory_repository_does(session_factory, in_memory_repo, query):
+    repo = SqlAlchemyRepository(session_factory)
+
+    for offset in (0, 7):
+        assert repo.search_movie_ids(query, offset, 10) == in_memory_repo.search_movie_ids(query, offset, 10)
+
+
+def test_repository_searches_whole_words(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    # Unlike a substring match, 'man' doesn't match 'woman'.
+    man_ids, total = repo.search_movie_ids('man', 0, 1000)
+    assert total == len(man_ids) > 0
+    for movie in repo.get_movies_by_id(man_ids):
+        assert 'man' in tokenize(f'{movie.title} {movie.description}')
+
+
+def test_repository_searches_an_added_movie(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    # The database maps a Movie's actors and genres as comma-separated text.
+    movie = Movie('Rabbitville', 2016, 1001)
+    movie.description = 'A rabbit joins the police.'
+    movie._Movie__actors = ''
+    movie._Movie__genres = ''
+    repo.add_movie(movie)
+
+    assert repo.search_movie_ids('rabbitville', 0, 3) == ([1001], 1)
+    assert repo.search_movie_ids('rabbit police', 0, 1)[0] == [1001]
+
+
+def test_search_index_is_added_to_an_older_database(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    engine = session_factory.kw['bind']
+    expected = repo.search_movie_ids('guardians galaxy', 0, 3)
+    engine.execute('DROP TABLE search_terms')
+
+    assert database_repository.add_search_index(engine)
+    assert not database_repository.add_search_index(engine)
+    assert repo.search_movie_ids('guardians galaxy', 0, 3) == expected
+
+
+def test_repository_completes_actor_and_director_names(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    assert 'Chris Pratt' in repo.get_actor_names_by_prefix('chris p', 10)
+    assert repo.get_director_names_by_prefix('gunn', 10) == ['James Gunn']
+
+
+def test_repository_returns_movie_ids_by_actor(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movie_ids = repo.get_movie_ids_by_actor('Chris Pratt')
+    assert movie_ids[0] == 1
+    assert repo.get_movie_ids_by_actor('Chris Prat') == movie_ids
+    assert repo.get_movie_ids_by_actor('Xqzv Wwwy') == []
+
+
+def test_repository_finds_co_star_paths(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    assert repo.actors_worked_together('Chris Pratt', 'Vin Diesel')
+    assert not repo.actors_worked_together('Chris Pratt', 'Xqzv Wwwy')
+    assert repo.get_costar_path('Chris Pratt', 'Vin Diesel') == [('Chris Pratt', None), ('Vin Diesel', 1)]
+    assert len(repo.get_costar_path('Jennifer Lawrence', 'Paul Walker')) <= 4
+
+
+def test_repository_returns_top_movie_ids(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    top_movie_ids = repo.get_top_movie_ids('rating', 3, 'Sci-Fi', 2014)
+    assert repo.get_movie(top_movie_ids[0]).title == 'Interstellar'
+    assert repo.get_movie(top_movie_ids[0]).rating == 8.6
+    assert repo.get_top_movie_ids('revenue', 1) == [51]
+    assert repo.get_top_movie_ids('rating', 3, 'No Such Genre') == []
+
+    with pytest.raises(RepositoryException):
+        repo.get_top_movie_ids('title', 3)
+
+
+def test_repository_returns_faceted_movie_ids(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    result = repo.get_faceted_movie_ids(all_of={'genre': ['Sci-Fi'], 'year': [2014]})
+    assert result.movie_ids[:3] == [1, 37, 110]
+    assert len(result.movie_ids) == 17
+    result = repo.get_faceted_movie_ids(all_of={'director': ['James Gunn']}, none_of={'actor': ['Chris Pratt']})
+    assert result.movie_ids == [909, 938]
+    assert result.facet_counts['director'] == [('James Gunn', 2)]
+
+    with pytest.raises(RepositoryException):
+        repo.get_faceted_movie_ids(all_of={'studio': ['Marvel']})
+
+
+def test_repository_returns_similar_movie_ids(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    similar_ids = repo.get_similar_movie_ids(1, 3)
+    assert len(similar_ids) == 3
+    assert 1 not in similar_ids
+    assert repo.get_similar_movie_ids(5000, 3) == []
+
+
+def test_repository_pages_movie_ids_by_genre_from_keys(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    page = repo.get_movie_ids_by_genre_page('Sci-Fi', 5)
+    assert page.previous_key is None and len(page.movie_ids) == 5
+
+    pages = [page.movie_ids]
+    while page.next_key is not None:
+        page = repo.get_movie_ids_by_genre_page('Sci-Fi', 5, after=page.next_key)
+        pages.append(page.movie_ids)
+    movie_ids = sum(pages, [])
+    assert movie_ids == sorted(movie_ids) and len(movie_ids) > 10
+    assert page.previous_key == page.movie_ids[0]
+
+    page = repo.get_movie_ids_by_genre_page('Sci-Fi', 5, before=page.previous_key)
+    assert page.movie_ids == pages[-2]
+    assert repo.get_movie_ids_by_genre_page('Annoying', 5) == ([], None, None)
+
+
+def test_repository_pages_movie_ids_by_actor_from_keys(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    assert repo.get_movie_ids_by_actor_page('Chris Prat', 2) == ([1, 10], None, 10)
+    assert repo.get_movie_ids_by_actor_page('Chris Pratt', 2, after=10) == ([39, 86], 39, 86)
+    assert repo.get_movie_ids_by_actor_page('Chris Pratt', 2, before=39) == ([1, 10], None, 10)
+    assert repo.get_movie_ids_by_actor_page('Chris Pratt', 10, after=407) == ([697], 697, None)
+
+
+def test_score_columns_are_added_to_an_older_database(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "movie.db"}')
+    engine.execute('CREATE TABLE movies (id INTEGER PRIMARY KEY, release_year INTEGER NOT NULL, '
+                   'title VARCHAR(255) NOT NULL, genres VARCHAR(1000), description VARCHAR(1024), '
+                   'director VARCHAR(255), actors VARCHAR(1024))')
+
+    assert database_repository.add_score_columns(engine)
+    assert not database_repository.add_score_columns(engine)
+    columns = [row[1] for row in engine.execute('PRAGMA table_info(movies)').fetchall()]
+    assert columns[-4:] == ['rating', 'votes', 'revenue', 'metascore']
+    assert 'movies_rating' in [row[1] for row in engine.execute('PRAGMA index_list(movies)').fetchall()]
+
+
+def test_indexes_are_added_to_an_older_database(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "movie.db"}')
+    metadata.create_all(engine)
+    engine.execute('DROP INDEX movie_genres_genre')
+
+    database_repository.add_indexes(engine)
+    database_repository.add_indexes(engine)
+    assert 'movie_genres_genre' in [row[1] for row in engine.execute('PRAGMA index_list(movie_genres)').fetchall()]
+
+
+def test_review_stats_are_added_to_an_older_database(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "movie.db"}')
+    engine.execute('CREATE TABLE reviews (id INTEGER PRIMARY KEY, user_id INTEGER, movie_id INTEGER, '
+                   'review VARCHAR(1024) NOT NULL, timestamp DATETIME NOT NULL)')
+    engine.execute("INSERT INTO reviews (user_id, movie_id, review, timestamp) VALUES "
+                   "(1, 1, 'Fun', '2020-02-28 14:31:26'), (2, 1, 'Long', '2020-02-28 14:39:51')")
+
+    assert database_repository.add_review_stats(engine)
+    assert not database_repository.add_review_stats(engine)
+    assert 'rating' in [row[1] for row in engine.execute('PRAGMA table_info(reviews)').fetchall()]
+    rows = engine.execute('SELECT movie_id, review_count, rating_count, latest_timestamp FROM review_stats').fetchall()
+    assert rows == [(1, 2, 0, '2020-02-28 14:39:51')]
+
+
 def test_repository_can_retrieve_genres(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
@@ -212,6 +477,30 @@ def test_repository_can_retrieve_reviews(session_factory):
     assert len(repo.get_reviews()) == 2
 
 
+def test_repository_totals_reviews_as_they_are_added(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    review_stats = repo.get_review_stats([1, 2])
+    assert (review_stats[1].count, review_stats[1].average) == (2, None)
+    assert review_stats[1].latest == datetime(2020, 2, 28, 14, 39, 51)
+    assert review_stats[2] == ReviewStats()
+    assert repo.get_review_stats([]) == {}
+
+    # Total Reviews the way add_review() does, in the session that stores them.
+    user = User('thorke', '902fjsdf')
+    session = session_factory()
+    for movie_id, rating, timestamp in [(1, 8, datetime(2021, 3, 1)), (1, 5, datetime(2021, 2, 1)), (2, None, None)]:
+        movie = Movie('Movie', 2020, movie_id)
+        SqlAlchemyRepository._add_to_review_stats(session, Review(movie, 'Review', rating, user, timestamp))
+    session.commit()
+
+    review_stats = repo.get_review_stats([1, 2])
+    assert (review_stats[1].count, review_stats[1].rating_count, review_stats[1].average) == (4, 2, 6.5)
+    assert review_stats[1].histogram[7] == 1 and review_stats[1].histogram[4] == 1
+    assert review_stats[1].latest == datetime(2021, 3, 1)
+    assert (review_stats[2].count, review_stats[2].average) == (1, None)
+
+
 def make_movie(new_movie_release_year):
     movie = Movie('The Promised Neverland', new_movie_release_year)
     return movie
@@ -232,3 +521,45 @@ def test_can_retrieve_a_movie_and_add_a_review_to_it(session_factory):
 
     assert review in movie_fetched.reviews
     assert review in author_fetched.reviews
+
+
+def test_reload_applies_changed_movie_rows(tmp_path):
+    data_path = tmp_path / 'data'
+    shutil.copytree(DATA_PATH_DATABASE, data_path)
+    engine = create_engine(f'sqlite:///{tmp_path / "movie.db"}')
+    clear_mappers()
+    metadata.create_all(engine)
+    map_model_to_tables()
+    database_repository.populate(engine, str(data_path))
+
+    movie_file = data_path / 'moviefile.csv'
+    with open(movie_file, encoding='utf-8-sig') as infile:
+        rows = list(csv.reader(infile))
+    del rows[1]
+    rows[1][1] = 'Prometheus Unbound'
+    rows.append(['1001', 'Rabbitville', 'Animation,Adventure', 'A rabbit joins the police.', 'Ron Clements',
+                 'Ellie Rabbit', '2016', '107', '7.6', '200000', '248.75', '81'])
+    with open(movie_file, 'w', newline='', encoding='utf-8') as outfile:
+        csv.writer(outfile).writerows(rows)
+
+    repo = SqlAlchemyRepository(sessionmaker(bind=engine))
+    assert 'Ellie Rabbit' not in repo.get_actor_names_by_prefix('ellie r', 5)
+    changes = database_repository.reload_movies(engine, str(data_path), repo)
+
+    assert (len(changes.inserted), len(changes.updated), changes.deleted) == (1, 1, [1])
+    assert repo.get_movie(1) is None
+    assert repo.get_movie(2).title == 'Prometheus Unbound'
+    assert repo.get_movie(1001).title == 'Rabbitville'
+    assert (repo.get_movie(1001).rating, repo.get_movie(1001).metascore) == (7.6, 81)
+    assert repo.get_number_of_movies() == 1000
+    assert 'Ellie Rabbit' in repo.get_actor_names_by_prefix('ellie r', 5)
+    assert repo.search_movie_ids('rabbit police', 0, 1)[0] == [1001]
+    assert repo.search_movie_ids('prometheus unbound', 0, 1) == ([2], 1)
+    assert engine.execute('SELECT COUNT(*) FROM reviews WHERE movie_id = 1').scalar() == 0
+    assert engine.execute(
+        "SELECT COUNT(*) FROM movie_genres JOIN genres ON genres.id = genre_id WHERE genre_name = 'Animation' "
+        "AND movie_id = 1001").scalar() == 1
+
+    assert database_repository.reload_movies(engine, str(data_path), repo) == ([], [], [])
+    metadata.drop_all(engine)
+    clear_mappers()
@@ -114,6 +114,14 @@ def test_saving_of_users(empty_session):
     assert rows == [("andrew", "aaa111")]
 
 
+def test_saving_of_users_normalizes_usernames(empty_session):
+    empty_session.add(make_user())
+    empty_session.commit()
+
+    rows = list(empty_session.execute('SELECT normalized_username FROM users'))
+    assert rows == [("andrew",)]
+
+
 def test_saving_of_users_with_common_username(empty_session):
     user = make_user()
     empty_session.add(user)
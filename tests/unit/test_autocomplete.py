@@ -0,0 +1,66 @@
+import copy
+
+from movie.adapters.autocomplete import PrefixIndex
+
+
+def make_index():
+    index = PrefixIndex()
+    for name in ('Chris Pratt', 'Chris Evans', 'Christian Bale', 'Zoe Saldana', 'Chris Pratt'):
+        index.add(name)
+    return index
+
+
+def test_prefix_index_completes_first_names():
+    assert make_index().complete('chris') == ['Chris Evans', 'Chris Pratt', 'Christian Bale']
+
+
+def test_prefix_index_completes_any_word_of_a_name():
+    index = make_index()
+
+    assert index.complete('pra') == ['Chris Pratt']
+    assert index.complete('Chris  P') == ['Chris Pratt']
+
+
+def test_prefix_index_limits_and_deduplicates_completions():
+    index = make_index()
+
+    assert len(index) == 4
+    assert index.complete('chris', limit=2) == ['Chris Evans', 'Chris Pratt']
+    assert index.complete('') == []
+    assert index.complete('xyz') == []
+
+
+def test_prefix_index_includes_names_added_after_a_lookup():
+    index = make_index()
+    index.complete('chris')
+
+    index.add('Chris Hemsworth')
+    assert index.complete('chris h') == ['Chris Hemsworth']
+
+
+def test_prefix_index_copy_changes_independently():
+    index = PrefixIndex()
+    index.add('Chris Pratt')
+    copy_of_index = copy.copy(index)
+
+    copy_of_index.add('Chris Pine')
+
+    assert index.complete('chris') == ['Chris Pratt']
+    assert copy_of_index.complete('chris') == ['Chris Pine', 'Chris Pratt']
+
+
+def test_prefix_index_copy_shares_chunks_it_does_not_add_to():
+    index = PrefixIndex()
+    for number in range(3 * PrefixIndex.CHUNK_SIZE):
+        index.add(f'Actor {number:04}')
+    copy_of_index = copy.copy(index)
+
+    copy_of_index.add('Actor 0000a')
+    copy_of_index.add('Zoe Saldana')
+
+    assert index.complete('actor 0000') == ['Actor 0000']
+    assert copy_of_index.complete('actor 0000') == ['Actor 0000', 'Actor 0000a']
+    assert copy_of_index.complete('actor 0767', limit=3) == ['Actor 0767']
+    assert copy_of_index.complete('sal') == ['Zoe Saldana']
+    assert len(index) == 3 * PrefixIndex.CHUNK_SIZE
+    assert len(copy_of_index) == len(index) + 2
@@ -0,0 +1,170 @@
+import csv
+import os
+import shutil
+import threading
+
+import pytest
+
+from movie.adapters import memory_repository
+from movie.adapters.catalog_reload import CatalogChanges, MovieFileWatcher, diff_movie_rows, row_digest
+from movie.adapters.memory_repository import MemoryRepository
+from movie.adapters.snapshot import DATA_FILES
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'memory')
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / 'data'
+    path.mkdir()
+    for file_name in DATA_FILES:
+        shutil.copy(os.path.join(DATA_PATH, file_name), path / file_name)
+    return str(path)
+
+
+def edit_movie_file(data_path, edit):
+    file_name = os.path.join(data_path, 'moviefile.csv')
+    with open(file_name, encoding='utf-8-sig') as infile:
+        rows = list(csv.reader(infile))
+    rows = [rows[0]] + edit(rows[1:])
+    with open(file_name, 'w', newline='', encoding='utf-8') as outfile:
+        csv.writer(outfile).writerows(rows)
+
+
+def change_catalog(rows):
+    # Remove Rank 1, retitle Rank 2 and add Rank 1001.
+    rows = rows[1:]
+    rows[0][1] = 'Prometheus Unbound'
+    rows.append(['1001', 'Rabbitville', 'Animation,Adventure', 'A rabbit joins the police.', 'Ron Clements',
+                 'Ellie Rabbit, Nick Fox', '2016', '107', '7.6', '200000', '248.75', '81'])
+    return rows
+
+
+def test_diff_movie_rows_by_rank():
+    rows = {1: ['1', 'A'], 2: ['2', 'B changed'], 4: ['4', 'D']}
+    digests = {1: row_digest(['1', 'A']), 2: row_digest(['2', 'B']), 3: row_digest(['3', 'C'])}
+
+    assert diff_movie_rows(digests, rows) == CatalogChanges([['4', 'D']], [['2', 'B changed']], [3])
+
+
+def test_reload_applies_only_changed_rows(data_path):
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo)
+    unchanged_movie = repo.get_movie(3)
+    edit_movie_file(data_path, change_catalog)
+
+    changes = memory_repository.reload_movies(data_path, repo)
+
+    assert (len(changes.inserted), len(changes.updated), changes.deleted) == (1, 1, [1])
+    assert repo.get_movie(3) is unchanged_movie
+    assert repo.get_number_of_movies() == 1000
+    assert repo.get_first_movie().id == 2 and repo.get_last_movie().id == 1001
+    assert len(repo.columns) == 1000
+
+
+def test_reload_updates_indexes(data_path):
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo)
+    reviews_of_prometheus = list(repo.get_movie(2).reviews)
+    edit_movie_file(data_path, change_catalog)
+
+    memory_repository.reload_movies(data_path, repo)
+
+    assert repo.get_movie(1) is None
+    assert all(review.movie.id != 1 for review in repo.get_reviews())
+    assert 1 not in repo.get_movie_ids_by_genre('Action')
+    assert 'Guardians of the Galaxy' not in [movie.title for movie in repo.get_movies_by_release_year(2014)]
+
+    assert repo.get_movie(2).title == 'Prometheus Unbound'
+    assert repo.get_movie(2).reviews == reviews_of_prometheus
+    assert repo.get_movie_ids_for_title('Prometheus') == []
+    assert repo.get_movie_ids_for_title('Prometheus Unbound') == [2]
+    assert repo.search_movie_ids('unbound', 0, 10) == ([2], 1)
+
+    assert repo.get_movie(1001).title == 'Rabbitville'
+    assert repo.get_movie_ids_by_genre('Animation')[-1] == 1001
+    assert repo.get_actor('Ellie Rabbit') is not None
+    assert repo.search_movie_ids('rabbitville', 0, 10) == ([1001], 1)
+
+
+def test_reload_is_invisible_to_a_pinned_request(data_path):
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo)
+    edit_movie_file(data_path, change_catalog)
+
+    repo.pin()
+    try:
+        movie = repo.get_movie(1)
+        thread = threading.Thread(target=memory_repository.reload_movies, args=(data_path, repo))
+        thread.start()
+        thread.join()
+        assert repo.get_movie(1) is movie
+    finally:
+        repo.unpin()
+    assert repo.get_movie(1) is None
+
+
+def test_reload_without_changes_changes_nothing(data_path):
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo)
+
+    movie = repo.get_movie(1)
+
+    changes = memory_repository.reload_movies(data_path, repo)
+
+    assert changes == CatalogChanges([], [], [])
+    assert repo.get_movie(1) is movie
+
+
+def test_reload_matches_movies_by_rank_when_ranks_have_gaps_and_are_unordered(data_path):
+    # Put Rank 4 before Rank 3, and leave out Rank 5.
+    edit_movie_file(data_path, lambda rows: [rows[0], rows[1], rows[3], rows[2]] + rows[5:])
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo)
+
+    assert (repo.get_movie(3).title, repo.get_movie(4).title) == ('Split', 'Sing')
+    assert repo.get_movie(5) is None and repo.get_movie(6).id == 6
+    assert memory_repository.reload_movies(data_path, repo) == CatalogChanges([], [], [])
+
+    def retitle_sing(rows):
+        rows[2][1] = 'Sing Again'
+        return rows
+
+    edit_movie_file(data_path, retitle_sing)
+    changes = memory_repository.reload_movies(data_path, repo)
+    assert (len(changes.inserted), len(changes.updated), changes.deleted) == (0, 1, [])
+    assert (repo.get_movie(3).title, repo.get_movie(4).title) == ('Split', 'Sing Again')
+
+
+def test_watcher_reloads_a_changed_file_once(tmp_path):
+    file_name = tmp_path / 'moviefile.csv'
+    file_name.write_text('Rank\n')
+    reloads = list()
+    watcher = MovieFileWatcher(str(file_name), lambda: reloads.append(1) or CatalogChanges([], [], []), interval=0)
+
+    watcher.check()
+    file_name.write_text('Rank\n1\n')
+    watcher.check()
+    watcher.check()
+
+    assert reloads == [1]
+
+
+def test_watcher_retries_a_failed_reload(tmp_path):
+    file_name = tmp_path / 'moviefile.csv'
+    file_name.write_text('Rank\n')
+    attempts = list()
+
+    def reload():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError('Half written')
+        return CatalogChanges([], [], [])
+
+    watcher = MovieFileWatcher(str(file_name), reload, interval=0)
+    file_name.write_text('Rank\n1\n')
+    watcher.check()
+    watcher.check()
+    watcher.check()
+
+    assert len(attempts) == 2
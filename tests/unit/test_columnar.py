@@ -0,0 +1,123 @@
+import copy
+import math
+
+from movie.adapters.columnar import MovieColumns
+from movie.domain.model import Movie
+
+
+def make_columns(count):
+    columns = MovieColumns(capacity=2)
+    for i in range(1, count + 1):
+        movie = Movie(f'Movie {i}', 2000 + i % 5, i)
+        movie.runtime_minutes = 90 + i
+        columns.append(movie)
+        columns.set_scores(i, rating=i / 2, votes=100 * i)
+    return columns
+
+
+def test_columns_grow_as_movies_are_appended():
+    columns = make_columns(10)
+
+    assert len(columns) == 10
+    assert columns.movie_ids() == list(range(1, 11))
+    assert columns.column('runtime_minutes').tolist() == list(range(91, 101))
+
+
+def test_columns_can_filter_on_ranges():
+    columns = make_columns(10)
+
+    mask = columns.filter(release_year=(2001, 2002), rating=(2.0, None))
+    assert columns.movie_ids(mask) == [6, 7]
+
+
+def test_columns_return_top_movie_ids():
+    columns = make_columns(10)
+
+    assert columns.top_movie_ids('rating', 3) == [10, 9, 8]
+    assert columns.top_movie_ids('votes', 2, descending=False) == [1, 2]
+    assert columns.top_movie_ids('rating', 2, columns.filter(release_year=(2000, 2000))) == [10, 5]
+
+
+def test_columns_skip_missing_values():
+    columns = make_columns(3)
+
+    assert columns.top_movie_ids('revenue', 3) == []
+    assert columns.stats('revenue')['count'] == 0
+    assert math.isclose(columns.stats('rating')['mean'], 1.0)
+
+
+def test_columns_skip_movies_with_unknown_votes_year_or_runtime():
+    columns = make_columns(3)
+    unknown = Movie('Movie 4', 1800, 4)
+    columns.append(unknown)
+
+    assert columns.column('votes')[3] == MovieColumns.MISSING
+    assert columns.top_movie_ids('votes', 4, descending=False) == [1, 2, 3]
+    assert columns.top_movie_ids('runtime_minutes', 4) == [3, 2, 1]
+    assert columns.movie_ids(columns.filter(release_year=(None, 2001), votes=(None, 1000))) == [1]
+    assert columns.stats('votes')['count'] == 3
+    assert columns.count_by('release_year') == {2001: 1, 2002: 1, 2003: 1}
+
+
+def test_columns_count_movies_by_year():
+    columns = make_columns(10)
+
+    assert columns.count_by('release_year') == {2000: 2, 2001: 2, 2002: 2, 2003: 2, 2004: 2}
+
+
+def test_columns_take_scores_from_movies():
+    columns = MovieColumns()
+    movie = Movie('Moana', 2016, 1)
+    movie.rating = 7.6
+    movie.votes = 118151
+    columns.append(movie)
+
+    assert columns.column('rating').tolist() == [7.6]
+    assert columns.column('votes').tolist() == [118151]
+    assert math.isnan(columns.column('revenue')[0])
+
+
+def test_columns_rank_rows_once_per_change():
+    columns = make_columns(10)
+    ranked_rows = columns.ranked_rows('rating')
+
+    assert columns.ranked_rows('rating') is ranked_rows
+    assert columns.top_movie_ids('rating', 2, columns.mask_of([3, 7, 8])) == [8, 7]
+
+    copy_of_columns = copy.copy(columns)
+    copy_of_columns.set_scores(1, rating=9.5)
+    assert copy_of_columns.top_movie_ids('rating', 2) == [1, 10]
+    assert columns.ranked_rows('rating') is ranked_rows
+    assert columns.top_movie_ids('rating', 2) == [10, 9]
+
+
+def test_repository_loads_scores_into_columns(in_memory_repo):
+    columns = in_memory_repo.columns
+
+    assert len(columns) == 1000
+    top_rated = in_memory_repo.get_movie(columns.top_movie_ids('rating', 1)[0])
+    assert top_rated.title == 'The Dark Knight'
+    assert columns.count_by('release_year')[2016] == 297
+
+
+def test_columns_copy_changes_independently():
+    columns = make_columns(3)
+    copy_of_columns = copy.copy(columns)
+
+    copy_of_columns.set_scores(1, rating=9.5)
+    copy_of_columns.append(Movie('Movie 4', 2004, 4))
+
+    assert len(columns) == 3 and len(copy_of_columns) == 4
+    assert columns.column('rating')[0] == 0.5
+    assert copy_of_columns.column('rating')[0] == 9.5
+
+
+def test_columns_and_copy_both_append():
+    columns = make_columns(3)
+    copy_of_columns = copy.copy(columns)
+
+    copy_of_columns.append(Movie('Movie 4', 2004, 4))
+    columns.append(Movie('Movie 5', 2005, 5))
+
+    assert columns.movie_ids() == [1, 2, 3, 5]
+    assert copy_of_columns.movie_ids() == [1, 2, 3, 4]
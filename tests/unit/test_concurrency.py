@@ -0,0 +1,127 @@
+import sys
+import threading
+
+import pytest
+
+from movie.domain.model import Movie, User, Genre, add_review
+
+
+@pytest.fixture
+def fast_switching():
+    # Switch threads as often as the interpreter allows, so that races show up within a short test.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def run_together(writers, readers):
+    # Starts a thread per writer and reader at the same moment. Readers are called until every writer has returned
+    # or raised. Returns the errors raised.
+    errors = list()
+    start = threading.Barrier(len(writers) + len(readers))
+    writing = [len(writers)]
+    writing_lock = threading.Lock()
+
+    def write(writer):
+        try:
+            start.wait()
+            writer()
+        except Exception as error:
+            errors.append(error)
+        finally:
+            with writing_lock:
+                writing[0] -= 1
+
+    def read(reader):
+        try:
+            start.wait()
+            while writing[0] > 0:
+                reader()
+            # Once more, after the last write.
+            reader()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in writers]
+    threads += [threading.Thread(target=read, args=(reader,)) for reader in readers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_readers_see_consistent_users_and_reviews_while_they_are_added(in_memory_repo, fast_switching):
+    writers, readers, additions = 4, 8, 100
+    movie_ids = list(range(1, 11))
+    reviews_before = len(in_memory_repo.get_reviews())
+    reviewed_before = sum(stats.count for stats in in_memory_repo.get_review_stats(movie_ids).values())
+
+    def writer(number):
+        def write():
+            for addition in range(additions):
+                user = User(f'concurrent{number}x{addition}', 'abcdefgh1')
+                in_memory_repo.add_user(user)
+                movie = in_memory_repo.get_movie(movie_ids[addition % len(movie_ids)])
+                in_memory_repo.add_review(add_review('Concurrent', user, movie, 1 + addition % 5))
+        return write
+
+    def reader():
+        held = list()
+
+        def read():
+            reviews = in_memory_repo.get_reviews()
+            stats = in_memory_repo.get_review_stats(movie_ids)
+            counts = {movie_id: movie_stats.count for movie_id, movie_stats in stats.items()}
+            # A User is published before any of their Reviews.
+            assert all(in_memory_repo.get_user(review.user.username) is not None for review in reviews[-5:])
+            # Stats read after the Reviews are at least as new as they are.
+            assert sum(counts.values()) - reviewed_before >= len(reviews) - reviews_before
+            if held:
+                held_reviews, held_length, held_stats, held_counts = held
+                # Versions are published in order, and what a reader was given never changes under it.
+                assert len(reviews) >= held_length
+                assert len(held_reviews) == held_length
+                assert {movie_id: movie_stats.count for movie_id, movie_stats in held_stats.items()} == held_counts
+            held[:] = reviews, len(reviews), stats, counts
+        return read
+
+    errors = run_together([writer(number) for number in range(writers)], [reader() for _ in range(readers)])
+
+    assert errors == []
+    added = writers * additions
+    assert len(in_memory_repo.get_reviews()) == reviews_before + added
+    assert sum(stats.count for stats in in_memory_repo.get_review_stats(movie_ids).values()) == reviewed_before + added
+    assert all(in_memory_repo.get_user(f'concurrent{number}x{addition}') is not None
+               for number in range(writers) for addition in range(additions))
+
+
+def test_movie_ids_stay_unique_when_movies_are_added_concurrently(in_memory_repo, fast_switching):
+    writers, additions = 8, 50
+    movies_before = in_memory_repo.get_number_of_movies()
+    added = [list() for _ in range(writers)]
+
+    def writer(number):
+        def write():
+            for addition in range(additions):
+                movie = Movie(f'Concurrent {number}-{addition}', 2020)
+                movie.add_genre(Genre('Sci-Fi'))
+                in_memory_repo.add_movie(movie)
+                added[number].append(movie)
+        return write
+
+    def read():
+        movie = in_memory_repo.get_last_movie()
+        assert in_memory_repo.get_movie(movie.id) is movie
+
+    errors = run_together([writer(number) for number in range(writers)], [read, read])
+
+    assert errors == []
+    movies = [movie for writer_movies in added for movie in writer_movies]
+    assert sorted(movie.id for movie in movies) == list(range(movies_before + 1, movies_before + len(movies) + 1))
+    assert all(in_memory_repo.get_movie(movie.id) is movie for movie in movies)
+    assert in_memory_repo.get_number_of_movies() == movies_before + len(movies)
+    # Each writer added its Movies one after another, so their ids rise.
+    assert all([movie.id for movie in writer_movies] == sorted(movie.id for movie in writer_movies)
+               for writer_movies in added)
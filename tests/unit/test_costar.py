@@ -0,0 +1,99 @@
+import random
+from collections import deque
+
+from movie.adapters.costar import CoStarGraph
+from movie.domain.model import Movie, Actor
+
+
+def make_graph():
+    # Pratt and Diesel in Movie 1; Pratt and Lawrence in 10; Diesel and Walker in 85; Streep on her own in 99.
+    return CoStarGraph({
+        'Chris Pratt': [1, 10],
+        'Vin Diesel': [1, 85],
+        'Jennifer Lawrence': [10],
+        'Paul Walker': [85],
+        'Meryl Streep': [99],
+    })
+
+
+def shortest_distance(movie_ids_by_actor, actor_name, colleague_name):
+    # Plain breadth first search over the actors' Movies, to check the graph against.
+    actors_by_movie = dict()
+    for name, movie_ids in movie_ids_by_actor.items():
+        for movie_id in movie_ids:
+            actors_by_movie.setdefault(movie_id, set()).add(name)
+    distances = {actor_name: 0}
+    queue = deque([actor_name])
+    while queue:
+        name = queue.popleft()
+        for movie_id in movie_ids_by_actor[name]:
+            for co_star in actors_by_movie[movie_id]:
+                if co_star not in distances:
+                    distances[co_star] = distances[name] + 1
+                    queue.append(co_star)
+    return distances.get(colleague_name)
+
+
+def test_graph_answers_worked_with():
+    graph = make_graph()
+
+    assert (len(graph), graph.edges) == (5, 3)
+    assert graph.worked_with('Chris Pratt', 'Vin Diesel')
+    assert graph.worked_with('Vin Diesel', 'Chris Pratt')
+    assert not graph.worked_with('Jennifer Lawrence', 'Paul Walker')
+    assert not graph.worked_with('Chris Pratt', 'Chris Pratt')
+    assert not graph.worked_with('Chris Pratt', 'Unknown Actor')
+    assert graph.shared_movie_id(graph.actor_id('Paul Walker'), graph.actor_id('Vin Diesel')) == 85
+
+
+def test_graph_finds_shortest_path_with_linking_movies():
+    graph = make_graph()
+
+    assert graph.path('Jennifer Lawrence', 'Paul Walker') == [
+        ('Jennifer Lawrence', None), ('Chris Pratt', 10), ('Vin Diesel', 1), ('Paul Walker', 85)
+    ]
+    assert graph.path('Chris Pratt', 'Chris Pratt') == [('Chris Pratt', None)]
+    assert graph.path('Jennifer Lawrence', 'Paul Walker', max_depth=2) is None
+    assert graph.path('Chris Pratt', 'Meryl Streep') is None
+    assert graph.path('Chris Pratt', 'Unknown Actor') is None
+
+
+def test_graph_ignores_an_actor_listed_twice_for_a_movie():
+    graph = CoStarGraph({'Chris Pratt': [1, 1], 'Vin Diesel': [1]})
+
+    assert graph.edges == 1
+    assert list(graph.co_stars(graph.actor_id('Chris Pratt'))) == [graph.actor_id('Vin Diesel')]
+
+
+def test_graph_paths_are_shortest_on_a_random_graph():
+    rng = random.Random(7)
+    movie_ids_by_actor = {f'Actor {number}': sorted(rng.sample(range(300), 2)) for number in range(400)}
+    graph = CoStarGraph(movie_ids_by_actor)
+
+    for number in range(50):
+        actor_name, colleague_name = rng.sample(sorted(movie_ids_by_actor), 2)
+        path = graph.path(actor_name, colleague_name)
+        distance = shortest_distance(movie_ids_by_actor, actor_name, colleague_name)
+        if distance is None:
+            assert path is None
+            continue
+        assert len(path) - 1 == distance
+        assert path[0][0] == actor_name and path[-1][0] == colleague_name
+        for (name, movie_id), (co_star, shared_movie_id) in zip(path, path[1:]):
+            assert shared_movie_id in movie_ids_by_actor[name] and shared_movie_id in movie_ids_by_actor[co_star]
+
+
+def test_repository_graph_follows_added_movies(in_memory_repo):
+    assert in_memory_repo.actors_worked_together('Chris Pratt', 'Vin Diesel')
+    assert not in_memory_repo.actors_worked_together('Chris Pratt', 'Ellie Rabbit')
+    assert in_memory_repo.get_costar_path('Chris Pratt', 'Ellie Rabbit') is None
+
+    movie = Movie('Rabbitville', 2016)
+    movie.add_actor(Actor('Ellie Rabbit'))
+    movie.add_actor(Actor('Vin Diesel'))
+    in_memory_repo.add_movie(movie)
+
+    assert in_memory_repo.actors_worked_together('Vin Diesel', 'Ellie Rabbit')
+    assert in_memory_repo.get_costar_path('Chris Pratt', 'Ellie Rabbit') == [
+        ('Chris Pratt', None), ('Vin Diesel', 1), ('Ellie Rabbit', movie.id)
+    ]
@@ -1,6 +1,9 @@
+import os
+import subprocess
+import sys
 from datetime import date
 
-from movie.domain.model import Movie, Genre, User, Review, add_review, WatchList
+from movie.domain.model import Movie, Genre, User, Review, add_review, WatchList, EntityRegistry, MovieFileCSVReader
 
 import pytest
 
@@ -53,6 +56,72 @@ def test_movie_less_than_operator():
     assert movie_1 > movie_2
 
 
+def test_movie_hash_and_equality_follow_title_and_release_year():
+    movie = Movie('Moana', 2016)
+    assert movie == Movie('Moana', 2016)
+    assert hash(movie) == hash(Movie('Moana', 2016))
+
+    movie.title = 'Frozen'
+    movie.release_year = 2013
+    assert movie == Movie('Frozen', 2013)
+    assert hash(movie) == hash(Movie('Frozen', 2013))
+    assert movie != Movie('Moana', 2016)
+
+
+def test_movie_scores_are_unknown_until_set(movie):
+    assert (movie.rating, movie.votes, movie.revenue, movie.metascore) == (None, None, None, None)
+
+    movie.rating = 7.6
+    movie.votes = 118151
+    movie.revenue = 248
+    movie.metascore = 81
+    assert (movie.rating, movie.votes, movie.revenue, movie.metascore) == (7.6, 118151, 248.0, 81)
+
+    movie.rating = 11
+    movie.votes = -1
+    movie.revenue = 'a lot'
+    movie.metascore = None
+    assert (movie.rating, movie.votes, movie.revenue, movie.metascore) == (None, None, None, None)
+
+
+def test_compact_model_instances_have_no_instance_dict():
+    script = (
+        "from movie.domain.model import Movie, User, Genre, Review\n"
+        "movie = Movie('Moana', 2016)\n"
+        "user = User('dbowie', '1234567890')\n"
+        "for entity in (movie, user, Genre('Action'), Review(movie, 'Cool', 5, user)):\n"
+        "    assert not hasattr(entity, '__dict__'), entity\n"
+        "assert movie in {Movie('Moana', 2016)}\n"
+    )
+    environment = dict(os.environ, COMPACT_MODEL='True')
+    subprocess.run([sys.executable, '-c', script], env=environment, check=True)
+
+
+
+MOVIE_FILE = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'memory', 'moviefile.csv')
+
+
+def test_movie_file_reader_gives_movies_their_rank_as_id():
+    reader = MovieFileCSVReader(MOVIE_FILE)
+    reader.read_csv_file()
+
+    movies = reader.dataset_of_movies
+    assert len(movies) == 1000
+    assert [movie.id for movie in movies[:2]] == [1, 2]
+    assert movies[0].title == 'Guardians of the Galaxy'
+
+
+def test_compact_model_movie_file_reader_reads_the_movie_file():
+    script = (
+        "import sys\n"
+        "from movie.domain.model import MovieFileCSVReader\n"
+        "reader = MovieFileCSVReader(sys.argv[1])\n"
+        "reader.read_csv_file()\n"
+        "assert [movie.id for movie in reader.dataset_of_movies[:2]] == [1, 2]\n"
+    )
+    environment = dict(os.environ, COMPACT_MODEL='True')
+    subprocess.run([sys.executable, '-c', script, MOVIE_FILE], env=environment, check=True)
+
 def test_genre_construction(genre):
     assert genre.genre_name == 'Action'
 
@@ -62,6 +131,19 @@ def test_genre_construction(genre):
     assert not genre.is_applied_to(Movie("", 0))
 
 
+def test_entity_registry_returns_one_instance_per_name():
+    registry = EntityRegistry()
+
+    actor = registry.actor('Chris Pratt')
+    assert registry.actor(' Chris Pratt') is actor
+    assert registry.director('James Gunn') is registry.director('James Gunn')
+    assert registry.genre('Action') is registry.genre('Action')
+    assert registry.genre('Action') is not registry.genre('Adventure')
+
+    assert registry.actors == [actor]
+    assert len(registry.genres) == 2
+
+
 def test_make_review_establishes_relationships(movie, user):
     review_text = 'Cool movie!'
     rating = 0
@@ -0,0 +1,149 @@
+import os
+import random
+
+import pytest
+
+from movie.adapters import memory_repository
+from movie.adapters.facets import FacetIndex, FACET_NAMES
+from movie.adapters.memory_repository import MemoryRepository
+from movie.adapters.repository import RepositoryException
+from movie.domain.model import Movie, Genre, Director, Actor
+
+
+def random_catalog(rng: random.Random, count: int):
+    # Each facet has a few common values, which get bitsets, and many rare ones, which keep arrays of ids.
+    values_by_movie = dict()
+    for movie_id in rng.sample(range(1, 3 * count), count):
+        values_by_movie[movie_id] = {
+            'genre': set(rng.sample(['Action', 'Drama', 'Comedy', 'Horror', 'Western'], rng.randint(0, 3))),
+            'year': {rng.randint(2006, 2016)},
+            'director': {f'Director {rng.randint(1, count // 4)}'},
+            'actor': {f'Actor {rng.randint(1, count)}' for number in range(rng.randint(0, 4))},
+        }
+    movie_ids_by_value = {facet: dict() for facet in FACET_NAMES}
+    for movie_id in sorted(values_by_movie):
+        for facet, values in values_by_movie[movie_id].items():
+            for value in values:
+                movie_ids_by_value[facet].setdefault(value, list()).append(movie_id)
+    return values_by_movie, movie_ids_by_value
+
+
+def matches(values_by_movie, all_of, any_of, none_of):
+    # Plain set tests, to check the index against.
+    return sorted(
+        movie_id for movie_id, values in values_by_movie.items()
+        if all(value in values[facet] for facet, facet_values in all_of.items() for value in facet_values)
+        and all(values[facet] & set(facet_values) for facet, facet_values in any_of.items())
+        and not any(value in values[facet] for facet, facet_values in none_of.items() for value in facet_values)
+    )
+
+
+def make_index():
+    return FacetIndex(range(1, 101), {
+        'genre': {'Action': list(range(1, 61)), 'Drama': list(range(41, 101)), 'Western': [7, 50]},
+        'year': {2014: list(range(1, 101, 2)), 2016: list(range(2, 101, 2))},
+        'director': {'James Gunn': [1, 50, 99]},
+        'actor': {'Chris Pratt': [1, 10, 50], 'Vin Diesel': [1, 85]},
+    })
+
+
+def test_index_keeps_common_values_as_bitsets_and_rare_ones_as_ids():
+    index = make_index()
+
+    assert len(index) == 100
+    assert index.values('genre') == ['Action', 'Drama', 'Western']
+    assert list(index.movie_ids('actor', 'Vin Diesel')) == [1, 85]
+    assert index.movie_ids('genre', 'Action').dtype != index.movie_ids('actor', 'Vin Diesel').dtype
+    assert len(index.movie_ids('actor', 'Unknown Actor')) == 0
+
+
+def test_query_combines_and_or_not():
+    index = make_index()
+
+    result = index.query(all_of={'genre': ['Action', 'Drama']}, none_of={'year': [2016]})
+    assert result.movie_ids == list(range(41, 61, 2))
+    result = index.query(any_of={'actor': ['Chris Pratt', 'Vin Diesel']}, none_of={'genre': ['Western']})
+    assert result.movie_ids == [1, 10, 85]
+    result = index.query(all_of={'genre': ['Drama'], 'director': ['James Gunn']}, any_of={'year': [2014, 2016]})
+    assert result.movie_ids == [50, 99]
+    assert index.query().movie_ids == list(range(1, 101))
+    assert index.query(all_of={'actor': ['Unknown Actor']}).movie_ids == []
+
+    with pytest.raises(KeyError):
+        index.query(all_of={'studio': ['Marvel']})
+
+
+def test_query_counts_the_most_common_values_of_the_matches():
+    index = make_index()
+
+    result = index.query(any_of={'actor': ['Chris Pratt', 'Vin Diesel']}, facet_limit=2)
+    assert result.facet_counts == {
+        'genre': [('Action', 3), ('Drama', 2)],
+        'year': [(2014, 2), (2016, 2)],
+        'director': [('James Gunn', 2)],
+        'actor': [('Chris Pratt', 3), ('Vin Diesel', 2)],
+    }
+
+
+def test_queries_match_set_operations_on_a_random_catalog():
+    rng = random.Random(11)
+    values_by_movie, movie_ids_by_value = random_catalog(rng, 2000)
+    index = FacetIndex(sorted(values_by_movie), movie_ids_by_value)
+
+    for number in range(200):
+        filters = [dict(), dict(), dict()]
+        for facet in rng.sample(FACET_NAMES, rng.randint(1, 3)):
+            values = rng.sample(sorted(movie_ids_by_value[facet]), rng.randint(1, 2))
+            filters[rng.randrange(3)].setdefault(facet, list()).extend(values)
+        all_of, any_of, none_of = filters
+
+        result = index.query(all_of, any_of, none_of, facet_limit=5)
+        assert result.movie_ids == matches(values_by_movie, all_of, any_of, none_of)
+        for facet in FACET_NAMES:
+            counts = dict()
+            for movie_id in result.movie_ids:
+                for value in values_by_movie[movie_id][facet]:
+                    counts[value] = counts.get(value, 0) + 1
+            expected = sorted(counts.values(), reverse=True)[:5]
+            assert [count for value, count in result.facet_counts[facet]] == expected
+            assert all(counts[value] == count for value, count in result.facet_counts[facet])
+
+
+def test_repository_facets_follow_added_movies(in_memory_repo):
+    result = in_memory_repo.get_faceted_movie_ids(all_of={'genre': ['Sci-Fi'], 'year': [2014]})
+    assert result.movie_ids[:3] == [1, 37, 110]
+    assert len(result.movie_ids) == 17
+    assert in_memory_repo.get_faceted_movie_ids(all_of={'director': ['James Gunn']}).movie_ids == [1, 909, 938]
+
+    movie = Movie('Rabbitville', 2014)
+    movie.add_genre(Genre('Sci-Fi'))
+    movie.director = Director('James Gunn')
+    movie.add_actor(Actor('Chris Pratt'))
+    in_memory_repo.add_movie(movie)
+
+    result = in_memory_repo.get_faceted_movie_ids(all_of={'director': ['James Gunn']},
+                                                  none_of={'actor': ['Vin Diesel']})
+    assert result.movie_ids == [909, 938, movie.id]
+    assert ('Chris Pratt', 1) in result.facet_counts['actor']
+
+    with pytest.raises(RepositoryException):
+        in_memory_repo.get_faceted_movie_ids(all_of={'studio': ['Marvel']})
+
+
+@pytest.mark.parametrize('prebuild_indexes', [False, True])
+def test_repository_builds_facet_and_similarity_indexes_on_first_use(prebuild_indexes, monkeypatch):
+    built = list()
+    for name in ('FacetIndex', 'SimilarityIndex'):
+        index_class = getattr(memory_repository, name)
+        monkeypatch.setattr(memory_repository, name,
+                            lambda *args, name=name, index_class=index_class: built.append(name) or index_class(*args))
+
+    repo = MemoryRepository()
+    data_path = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'memory')
+    memory_repository.populate(data_path, repo, prebuild_indexes=prebuild_indexes)
+    assert built == (['FacetIndex', 'SimilarityIndex'] if prebuild_indexes else [])
+
+    repo.get_faceted_movie_ids(all_of={'genre': ['Sci-Fi']})
+    repo.get_similar_movie_ids(1, 3)
+    repo.get_faceted_movie_ids(all_of={'year': [2014]})
+    assert built == ['FacetIndex', 'SimilarityIndex']
@@ -0,0 +1,48 @@
+import copy
+
+from movie.adapters.fuzzy import TrigramIndex, edit_distance, trigrams
+
+
+def make_index():
+    index = TrigramIndex()
+    for name in ('Chris Pratt', 'Chris Evans', 'Christian Bale', 'Zoe Saldana', 'Chris Pratt'):
+        index.add(name)
+    return index
+
+
+def test_trigrams_are_padded_and_lowercased():
+    assert trigrams('Ab') == {'  a', ' ab', 'ab '}
+
+
+def test_edit_distance():
+    assert edit_distance('kitten', 'sitting') == 3
+    assert edit_distance('', 'abc') == 3
+    assert edit_distance('same', 'same') == 0
+
+
+def test_trigram_index_finds_closest_string():
+    index = make_index()
+
+    assert len(index) == 4
+    assert index.closest('Chris Prat') == ['Chris Pratt']
+    assert index.closest('zoe saldanna') == ['Zoe Saldana']
+    assert index.closest('Chris Evens', limit=2, max_distance=5) == ['Chris Evans', 'Chris Pratt']
+
+
+def test_trigram_index_ignores_distant_strings():
+    index = make_index()
+
+    assert index.closest('Meryl Streep') == []
+    assert index.closest('Chris Prat', max_distance=0) == []
+    assert index.closest('') == []
+
+
+def test_trigram_index_copy_changes_independently():
+    index = TrigramIndex()
+    index.add('Chris Pratt')
+    copy_of_index = copy.copy(index)
+
+    copy_of_index.add('Chris Pine')
+
+    assert index.closest('Chris Pin') == []
+    assert copy_of_index.closest('Chris Pin') == ['Chris Pine']
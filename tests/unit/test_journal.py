@@ -0,0 +1,170 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from movie.adapters import journal as journal_module, memory_repository
+from movie.adapters.journal import Journal, JournalCompactor, read_records
+from movie.adapters.memory_repository import MemoryRepository
+from movie.adapters.snapshot import DATA_FILES
+from movie.domain.model import User, add_review
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'memory')
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / 'data'
+    path.mkdir()
+    for file_name in DATA_FILES:
+        shutil.copy(os.path.join(DATA_PATH, file_name), path / file_name)
+    return str(path)
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'repository.journal')
+
+
+def test_journal_numbers_records_across_opens(journal_path):
+    journal = Journal(journal_path)
+    assert journal.append({'type': 'user', 'username': 'dbowie'}) == 1
+    assert journal.append({'type': 'user', 'username': 'fmercury'}) == 2
+    journal.sync(2)
+    journal.close()
+
+    journal = Journal(journal_path)
+    assert list(journal.records()) == [(1, {'type': 'user', 'username': 'dbowie'}),
+                                       (2, {'type': 'user', 'username': 'fmercury'})]
+    assert list(journal.records(1)) == [(2, {'type': 'user', 'username': 'fmercury'})]
+    assert journal.append({'type': 'user', 'username': 'bmay'}) == 3
+    journal.close()
+
+
+def test_journal_cuts_off_an_incomplete_record(journal_path):
+    journal = Journal(journal_path)
+    journal.append({'type': 'user', 'username': 'dbowie'})
+    journal.append({'type': 'user', 'username': 'fmercury'})
+    journal.close()
+    with open(journal_path, 'r+b') as outfile:
+        outfile.truncate(os.path.getsize(journal_path) - 3)
+
+    journal = Journal(journal_path)
+    assert journal.append({'type': 'user', 'username': 'bmay'}) == 2
+    journal.close()
+    assert [record['username'] for sequence, record, end in read_records(journal_path)] == ['dbowie', 'bmay']
+
+
+def test_journal_commits_concurrent_records_in_groups(journal_path, monkeypatch):
+    journal = Journal(journal_path)
+    fsyncs = list()
+
+    def slow_fsync(descriptor):
+        fsyncs.append(descriptor)
+        threading.Event().wait(0.01)
+
+    monkeypatch.setattr(journal_module.os, 'fsync', slow_fsync)
+
+    def write(number):
+        journal.sync(journal.append({'type': 'user', 'username': f'user{number}'}))
+
+    threads = [threading.Thread(target=write, args=(number,)) for number in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(list(journal.records())) == 20
+    assert len(fsyncs) < 20
+    journal.close()
+
+
+def test_archived_records_are_still_read(journal_path):
+    journal = Journal(journal_path)
+    for number in range(5):
+        journal.append({'type': 'user', 'username': f'user{number}'})
+    journal.archive(3)
+
+    assert journal.logged == 2
+    assert [sequence for sequence, record, end in read_records(journal_path)] == [4, 5]
+    assert [sequence for sequence, record in journal.records()] == [1, 2, 3, 4, 5]
+    assert [sequence for sequence, record in journal.records(3)] == [4, 5]
+    journal.close()
+
+    journal = Journal(journal_path)
+    assert journal.append({'type': 'user', 'username': 'user5'}) == 6
+    journal.close()
+
+
+def test_repository_replays_its_journal(data_path, journal_path):
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo, journal_path=journal_path)
+    user = User('dbowie', '1234567890')
+    repo.add_user(user)
+    review = add_review('Ground control to Major Tom', user, repo.get_movie(2), 8)
+    repo.add_review(review)
+    repo.journal.close()
+
+    restarted = MemoryRepository()
+    memory_repository.populate(data_path, restarted, journal_path=journal_path)
+    replayed_user = restarted.get_user('dbowie')
+    assert replayed_user.password == '1234567890'
+    replayed_review = restarted.get_reviews()[-1]
+    assert replayed_review == review
+    assert replayed_review.user is replayed_user
+    assert replayed_review in restarted.get_movie(2).reviews
+    assert restarted.journal_sequence == 2
+    restarted.journal.close()
+
+
+def test_failed_addition_is_not_journaled(data_path, journal_path):
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo, journal_path=journal_path)
+    unattached_review = add_review('Unattached', User('dbowie', '1234567890'), repo.get_movie(2))
+    repo.get_movie(2).reviews.remove(unattached_review)
+
+    with pytest.raises(memory_repository.RepositoryException):
+        repo.add_review(unattached_review)
+    assert repo.journal.sequence == 0
+    repo.journal.close()
+
+
+def test_journal_is_compacted_into_the_snapshot(data_path, journal_path, tmp_path):
+    snapshot_path = str(tmp_path / 'repository.snapshot')
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo, snapshot_path, journal_path=journal_path, journal_compact_records=2)
+    for number in range(3):
+        repo.add_user(User(f'user{number}', '1234567890'))
+        repo._compactor.join()
+    repo.journal.close()
+
+    # Two records were compacted and archived, the third is still in the journal.
+    assert [sequence for sequence, record, end in read_records(journal_path)] == [3]
+    restarted = MemoryRepository()
+    memory_repository.populate(data_path, restarted, snapshot_path, journal_path=journal_path)
+    assert [restarted.get_user(f'user{number}') is not None for number in range(3)] == [True, True, True]
+    restarted.journal.close()
+
+    # Changed data files make the snapshot stale; the archived records are replayed on the rebuilt repository.
+    with open(os.path.join(data_path, 'users.csv'), 'a') as outfile:
+        outfile.write('99,bmay,pw99\n')
+    rebuilt = MemoryRepository()
+    memory_repository.populate(data_path, rebuilt, snapshot_path, journal_path=journal_path)
+    assert [rebuilt.get_user(f'user{number}') is not None for number in range(3)] == [True, True, True]
+    assert rebuilt.get_user('bmay') is not None
+    rebuilt.journal.close()
+
+
+def test_compactor_waits_for_enough_records(journal_path):
+    journal = Journal(journal_path)
+    compactions = list()
+    compactor = JournalCompactor(journal, lambda: compactions.append(journal.sequence), compact_records=3)
+
+    for number in range(4):
+        journal.append({'type': 'user', 'username': f'user{number}'})
+        compactor.notify()
+        compactor.join()
+
+    assert compactions == [3, 4]
+    journal.close()
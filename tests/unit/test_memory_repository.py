@@ -3,8 +3,9 @@ from typing import List
 
 import pytest
 
-from movie.domain.model import User, Movie, Genre, Review, add_review
+from movie.domain.model import User, Movie, Genre, Actor, Review, add_review
 from movie.adapters.repository import RepositoryException
+from movie.adapters.review_stats import ReviewStats
 
 
 def test_repository_can_add_a_user(in_memory_repo):
@@ -26,6 +27,42 @@ def test_repository_does_not_retrieve_a_non_existent_user(in_memory_repo):
     assert user is None
 
 
+def test_repository_user_lookup_returns_first_user_added_with_username(in_memory_repo):
+    first = User('Dave', '123456789')
+    second = User('dave', '987654321')
+    in_memory_repo.add_user(first)
+    in_memory_repo.add_user(second)
+    assert in_memory_repo.get_user('dave') is first
+
+
+def test_repository_can_retrieve_actor_and_director(in_memory_repo):
+    actor = in_memory_repo.get_actor('Chris Pratt')
+    assert actor.actor_full_name == 'Chris Pratt'
+
+    director = in_memory_repo.get_director('James Gunn')
+    assert director.director_full_name == 'James Gunn'
+
+    assert in_memory_repo.get_actor('Nobody Atall') is None
+    assert in_memory_repo.get_director('Nobody Atall') is None
+
+
+def test_repository_holds_one_instance_per_actor_director_and_genre(in_memory_repo):
+    actors = in_memory_repo.get_actors()
+    assert len(actors) == len(set(actors))
+    assert len(in_memory_repo.get_genres()) == 20
+
+    # Movies sharing an actor refer to the same Actor object.
+    guardians = in_memory_repo.get_movie(1)
+    pratt = next(actor for actor in guardians.actors if actor.actor_full_name == 'Chris Pratt')
+    assert in_memory_repo.get_actor('Chris Pratt') is pratt
+
+
+def test_repository_completes_actor_and_director_names(in_memory_repo):
+    assert 'Chris Pratt' in in_memory_repo.get_actor_names_by_prefix('chris p', 10)
+    assert in_memory_repo.get_director_names_by_prefix('gunn', 10) == ['James Gunn']
+    assert len(in_memory_repo.get_actor_names_by_prefix('c', 5)) == 5
+
+
 def test_repository_can_retrieve_movie_count(in_memory_repo):
     number_of_movies = in_memory_repo.get_number_of_movies()
 
@@ -75,6 +112,22 @@ def test_repository_does_not_retrieve_a_movie_when_there_are_no_movies_for_a_giv
     assert len(movies) == 0
 
 
+def test_repository_can_retrieve_movie_ids_by_release_year_range(in_memory_repo):
+    movie_ids = in_memory_repo.get_movie_ids_by_release_year_range(2015, 2016)
+    assert len(movie_ids) == len(in_memory_repo.get_movies_by_release_year(2015)) + 297
+    assert in_memory_repo.get_movie_ids_by_release_year_range(2017, 2020) == []
+
+
+def test_repository_can_get_neighbouring_release_years(in_memory_repo):
+    in_memory_repo.add_movie(Movie('Ben-Hur', 1959))
+
+    assert in_memory_repo.get_previous_release_year(2006) == 1959
+    assert in_memory_repo.get_next_release_year(1959) == 2006
+    assert in_memory_repo.get_next_release_year(1990) == 2006
+    assert in_memory_repo.get_previous_release_year(1959) is None
+    assert in_memory_repo.get_next_release_year(2016) is None
+
+
 def test_repository_can_get_first_movie(in_memory_repo):
     movie = in_memory_repo.get_first_movie()
     assert movie.title == 'Guardians of the Galaxy'
@@ -118,6 +171,52 @@ def test_repository_returns_an_empty_list_for_non_existent_genre(in_memory_repo)
     assert len(movie_ids) == 0
 
 
+def test_repository_returns_movie_ids_by_actor(in_memory_repo):
+    movie_ids = in_memory_repo.get_movie_ids_by_actor('Chris Pratt')
+
+    assert movie_ids[0] == 1
+    assert movie_ids == sorted(movie_ids)
+    assert in_memory_repo.get_movie_ids_by_actor('Nobody Atall') == []
+
+
+def test_repository_returns_movie_ids_for_misspelled_actor(in_memory_repo):
+    assert in_memory_repo.get_movie_ids_by_actor('Chris Prat') == in_memory_repo.get_movie_ids_by_actor('Chris Pratt')
+    assert in_memory_repo.get_movie_ids_by_actor('Xqzv Wwwy') == []
+
+
+def test_repository_search_falls_back_to_closest_title(in_memory_repo):
+    movie_ids, total = in_memory_repo.search_movie_ids('Promethues', 0, 3)
+    assert movie_ids == [2]
+    assert total == 1
+
+
+def test_repository_indexes_actors_and_genres_of_added_movie(in_memory_repo):
+    movie = Movie('Moana', 2016)
+    movie.add_actor(Actor('Dwayne Johnson'))
+    movie.add_genre(Genre('Animation'))
+    in_memory_repo.add_movie(movie)
+
+    assert in_memory_repo.get_movie_ids_by_actor('Dwayne Johnson')[-1] == 1001
+    assert in_memory_repo.get_movie_ids_by_genre('Animation')[-1] == 1001
+
+
+def test_repository_returns_movie_ids_for_title(in_memory_repo):
+    assert in_memory_repo.get_movie_ids_for_title('Prometheus') == [2]
+    assert in_memory_repo.get_movie_ids_for_title('Not A Movie') == []
+
+
+def test_repository_can_search_movies(in_memory_repo):
+    movie_ids, total = in_memory_repo.search_movie_ids('guardians galaxy', 0, 3)
+
+    assert movie_ids[0] == 1
+    assert total >= 1
+
+    new_movie = Movie('Rabbitville', 2016)
+    new_movie.description = 'A bunny cop and a cynical con artist fox.'
+    in_memory_repo.add_movie(new_movie)
+    assert in_memory_repo.search_movie_ids('rabbitville', 0, 3) == ([1001], 1)
+
+
 def test_repository_can_add_a_genre(in_memory_repo):
     genre = Genre('Annoying')
     in_memory_repo.add_genre(genre)
@@ -139,4 +238,87 @@ def test_repository_can_retrieve_reviews(in_memory_repo):
     assert len(in_memory_repo.get_reviews()) == 2
 
 
+def test_repository_totals_reviews_as_they_are_added(in_memory_repo):
+    user = User('thorke', '902fjsdf')
+    movie = in_memory_repo.get_movie(1)
+    in_memory_repo.add_review(add_review('Fun', user, movie, 8, datetime(2021, 3, 1)))
+    in_memory_repo.add_review(add_review('Too long', user, movie, 5, datetime(2021, 2, 1)))
+
+    review_stats = in_memory_repo.get_review_stats([1, 2, 5000])
+    assert (review_stats[1].count, review_stats[1].rating_count, review_stats[1].average) == (4, 2, 6.5)
+    assert review_stats[1].histogram[7] == 1 and review_stats[1].histogram[4] == 1
+    assert review_stats[1].latest == max(review.timestamp for review in movie.reviews)
+    assert review_stats[2] == ReviewStats()
+    assert review_stats[5000].count == 0
+
+
+
+
+
+def test_repository_compacted_indexes_return_the_same_ids(in_memory_repo):
+    genre_ids = list(in_memory_repo.get_movie_ids_by_genre('Sci-Fi'))
+    actor_ids = list(in_memory_repo.get_movie_ids_by_actor('Chris Pratt'))
+    year_ids = in_memory_repo.get_movie_ids_by_release_year_range(2010, 2012)
+
+    in_memory_repo.compact_indexes()
+
+    assert list(in_memory_repo.get_movie_ids_by_genre('Sci-Fi')) == genre_ids
+    assert list(in_memory_repo.get_movie_ids_by_actor('Chris Pratt')) == actor_ids
+    assert in_memory_repo.get_movie_ids_by_release_year_range(2010, 2012) == year_ids
+    assert in_memory_repo.get_movie_ids_by_genre('Sci-Fi')[1:3].tolist() == genre_ids[1:3]
+    assert in_memory_repo.get_movie_ids_for_title('Prometheus') == [2]
+
+    movie = Movie('Rabbitville', 2016)
+    movie.add_genre(Genre('Sci-Fi'))
+    in_memory_repo.add_movie(movie)
+    assert list(in_memory_repo.get_movie_ids_by_genre('Sci-Fi')) == genre_ids + [1001]
+
+
+def test_repository_returns_top_movie_ids(in_memory_repo):
+    sci_fi_of_2014 = [movie for movie in in_memory_repo.get_movies
+                      if movie.release_year == 2014 and Genre('Sci-Fi') in movie.genres and movie.rating is not None]
+    sci_fi_of_2014.sort(key=lambda movie: (-movie.rating, movie.id))
+
+    top_movie_ids = in_memory_repo.get_top_movie_ids('rating', 3, 'Sci-Fi', 2014)
+    assert top_movie_ids == [movie.id for movie in sci_fi_of_2014[:3]]
+    assert in_memory_repo.get_movie(top_movie_ids[0]).title == 'Interstellar'
+    assert in_memory_repo.get_top_movie_ids('revenue', 1) == [51]
+    assert in_memory_repo.get_top_movie_ids('rating', 3, 'No Such Genre') == []
+
+    with pytest.raises(RepositoryException):
+        in_memory_repo.get_top_movie_ids('title', 3)
+
+
+def test_repository_leaves_movies_with_unknown_votes_out_of_top_movie_ids(in_memory_repo):
+    movie = Movie('Rabbitville', 2016)
+    in_memory_repo.add_movie(movie)
+
+    top_movie_ids = in_memory_repo.get_top_movie_ids('votes', 2000, release_year=2016)
+    assert len(top_movie_ids) == 297
+    assert movie.id not in top_movie_ids
+
+
+def test_repository_pages_movie_ids_by_genre_from_keys(in_memory_repo):
+    movie_ids = in_memory_repo.get_movie_ids_by_genre('Sci-Fi')
+
+    page = in_memory_repo.get_movie_ids_by_genre_page('Sci-Fi', 5)
+    assert page == (movie_ids[:5], None, movie_ids[4])
+
+    pages = [page.movie_ids]
+    while page.next_key is not None:
+        page = in_memory_repo.get_movie_ids_by_genre_page('Sci-Fi', 5, after=page.next_key)
+        pages.append(page.movie_ids)
+    assert sum(pages, []) == movie_ids
+    assert page.previous_key == page.movie_ids[0]
+
+    page = in_memory_repo.get_movie_ids_by_genre_page('Sci-Fi', 5, before=page.previous_key)
+    assert page.movie_ids == pages[-2]
+    assert in_memory_repo.get_movie_ids_by_genre_page('Annoying', 5) == ([], None, None)
+
+
+def test_repository_pages_movie_ids_by_actor_from_keys(in_memory_repo):
+    page = in_memory_repo.get_movie_ids_by_actor_page('Chris Prat', 2)
+    assert page == ([1, 10], None, 10)
+    assert in_memory_repo.get_movie_ids_by_actor_page('Chris Pratt', 2, after=10) == ([39, 86], 39, 86)
+    assert in_memory_repo.get_movie_ids_by_actor_page('Chris Pratt', 2, before=39) == ([1, 10], None, 10)
 
@@ -0,0 +1,123 @@
+import os
+import shutil
+
+import pytest
+
+from movie.adapters import memory_repository
+from movie.adapters.memory_repository import MemoryRepository, read_csv_file
+from movie.adapters.movie_file import MovieFile, LazyMovieList
+from movie.domain.model import Movie, User, add_review
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'memory')
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / 'data'
+    path.mkdir()
+    for file_name in ('moviefile.csv', 'users.csv', 'reviews.csv'):
+        shutil.copy(os.path.join(DATA_PATH, file_name), path / file_name)
+    return str(path)
+
+
+@pytest.fixture
+def lazy_repo(data_path):
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo, lazy_movies=True, movie_cache_size=10)
+    return repo
+
+
+def test_movie_file_reads_the_same_rows_as_the_csv_reader(data_path):
+    file_name = os.path.join(data_path, 'moviefile.csv')
+    movie_file = MovieFile(file_name)
+
+    assert list(movie_file.rows()) == list(read_csv_file(file_name))
+    assert movie_file.row(1)[1] == 'Prometheus'
+    with pytest.raises(IndexError):
+        movie_file.row(len(movie_file))
+
+
+def test_movie_file_reuses_saved_offsets_until_the_file_changes(data_path, monkeypatch):
+    file_name = os.path.join(data_path, 'moviefile.csv')
+    MovieFile(file_name)
+    assert os.path.exists(file_name + MovieFile.OFFSETS_SUFFIX)
+
+    def fail_to_build(movie_file):
+        raise AssertionError('Offsets rebuilt')
+    with monkeypatch.context() as patch:
+        patch.setattr(MovieFile, '_build_offsets', fail_to_build)
+        assert len(MovieFile(file_name)) == 1000
+
+    with open(file_name, 'a', encoding='utf-8') as outfile:
+        outfile.write('1001,Rabbitville,Animation,"A bunny cop,\nand a fox.",Byron Howard,Ginnifer Goodwin,2016,108,'
+                      '8.0,1,N/A,78\n')
+    movie_file = MovieFile(file_name)
+    assert len(movie_file) == 1001
+    assert movie_file.row(1000)[3] == 'A bunny cop,\nand a fox.'
+
+
+def test_lazy_movie_list_evicts_least_recently_used_movies(data_path):
+    movie_file = MovieFile(os.path.join(data_path, 'moviefile.csv'))
+    movies = LazyMovieList(movie_file, lambda row: Movie(row[1], int(row[6])), cache_size=2)
+
+    first = movies[0]
+    assert first.id == 1 and first.title == 'Guardians of the Galaxy'
+    assert movies[0] is first
+    movies[1]
+    movies[2]
+    assert movies.cached == 2
+    assert movies[0] is not first and movies[0] == first
+
+    movies.pin(movies[3])
+    pinned = movies[3]
+    for index in range(4, 10):
+        movies[index]
+    assert movies[3] is pinned
+    assert movies[-1].title == movies[999].title
+
+
+def test_lazy_repository_matches_the_eager_repository(data_path, lazy_repo):
+    eager_repo = MemoryRepository()
+    memory_repository.populate(data_path, eager_repo)
+
+    assert lazy_repo.get_number_of_movies() == eager_repo.get_number_of_movies()
+    for movie_id in (1, 2, 500, 1000):
+        lazy_movie = lazy_repo.get_movie(movie_id)
+        eager_movie = eager_repo.get_movie(movie_id)
+        assert lazy_movie == eager_movie
+        assert lazy_movie.id == eager_movie.id
+        assert lazy_movie.actors == eager_movie.actors
+        assert lazy_movie.genres == eager_movie.genres
+    assert lazy_repo.get_movies_by_id([3, 1, 2000]) == eager_repo.get_movies_by_id([3, 1, 2000])
+    assert lazy_repo.get_movie_ids_by_genre('Sci-Fi') == eager_repo.get_movie_ids_by_genre('Sci-Fi')
+    assert lazy_repo.search_movie_ids('galaxy', 0, 5) == eager_repo.search_movie_ids('galaxy', 0, 5)
+    assert lazy_repo.get_last_movie() == eager_repo.get_last_movie()
+    assert lazy_repo.lazy_movies.cached <= 10
+
+
+def test_lazy_repository_keeps_reviewed_and_added_movies(lazy_repo):
+    movie = lazy_repo.get_movie(7)
+    review = add_review('Loved it', User('dbowie', '1234567890'), movie, 5)
+    lazy_repo.add_review(review)
+    new_movie = Movie('Rabbitville', 2016)
+    lazy_repo.add_movie(new_movie)
+
+    for movie_id in range(1, 100):
+        lazy_repo.get_movie(movie_id)
+    assert lazy_repo.get_movie(7) is movie
+    assert review in lazy_repo.get_movie(7).reviews
+    assert lazy_repo.get_movie(1001) is new_movie
+    assert lazy_repo.get_movies_by_id([1001]) == [new_movie]
+
+
+def test_lazy_repository_loads_from_a_snapshot(data_path, lazy_repo, tmp_path):
+    snapshot_path = str(tmp_path / 'repository.snapshot')
+    memory_repository.populate(data_path, MemoryRepository(), snapshot_path, lazy_movies=True)
+
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo, snapshot_path, lazy_movies=True, movie_cache_size=10)
+
+    assert repo.lazy_movies is not None
+    assert repo.get_movie(2) == lazy_repo.get_movie(2)
+    assert len(repo.get_reviews()) == len(lazy_repo.get_reviews())
+    assert repo.get_reviews()[0].movie is repo.get_movie(repo.get_reviews()[0].movie.id)
@@ -0,0 +1,25 @@
+from werkzeug.security import check_password_hash
+
+from movie.adapters.passwords import hash_passwords, password_workers
+
+
+PASSWORDS = ['cLQ^C#oFXloS', 'mvNNbc1eLA$i', 'ZrXnfvE5Z4sv', 'hunter22hunter']
+
+
+def test_password_workers_defaults_to_one_per_cpu():
+    assert password_workers(None) >= 1
+    assert password_workers(0) == password_workers(None)
+    assert password_workers(3) == 3
+
+
+def test_hash_passwords_keeps_the_order_of_the_passwords():
+    for workers in (1, 2):
+        hashes = hash_passwords(iter(PASSWORDS), workers)
+
+        assert len(hashes) == len(PASSWORDS)
+        for password, password_hash in zip(PASSWORDS, hashes):
+            assert check_password_hash(password_hash, password)
+
+
+def test_hash_passwords_of_no_passwords():
+    assert hash_passwords([], 4) == []
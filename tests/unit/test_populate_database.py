@@ -6,7 +6,8 @@ from movie.adapters.orm import metadata
 def test_database_populate_inspect_table_names(database_engine):
     # Get table information
     inspector = inspect(database_engine)
-    assert inspector.get_table_names() == ['genres', 'movie_genres', 'movies', 'reviews', 'users']
+    assert inspector.get_table_names() == ['genres', 'movie_genres', 'movies', 'review_stats', 'reviews',
+                                           'search_documents', 'search_terms', 'users']
 
 
 def test_database_populate_select_all_genres(database_engine):
@@ -28,7 +29,7 @@ def test_database_populate_select_all_genres(database_engine):
 def test_database_populate_select_all_users(database_engine):
     # Get table information
     inspector = inspect(database_engine)
-    name_of_users_table = inspector.get_table_names()[4]
+    name_of_users_table = inspector.get_table_names()[7]
 
     with database_engine.connect() as connection:
         # query for records in table users
@@ -45,7 +46,7 @@ def test_database_populate_select_all_users(database_engine):
 def test_database_populate_select_all_reviews(database_engine):
     # Get table information
     inspector = inspect(database_engine)
-    name_of_reviews_table = inspector.get_table_names()[3]
+    name_of_reviews_table = inspector.get_table_names()[4]
     print(name_of_reviews_table)
     with database_engine.connect() as connection:
         # query for records in table reviews
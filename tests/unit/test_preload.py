@@ -0,0 +1,22 @@
+import gc
+from array import array
+
+import movie.adapters.repository as repo
+from movie import preload
+
+
+def test_preload_freezes_the_catalog_until_the_fork(in_memory_repo, monkeypatch):
+    monkeypatch.setattr(repo, 'repo_instance', in_memory_repo)
+    try:
+        preload.before_preload()
+        assert not gc.isenabled()
+
+        preload.before_fork()
+        assert gc.get_freeze_count() > 0
+        assert type(in_memory_repo.get_movie_ids_by_genre('Sci-Fi')) is array
+
+        preload.after_fork()
+        assert gc.isenabled()
+    finally:
+        gc.unfreeze()
+        gc.enable()
@@ -0,0 +1,31 @@
+import copy
+import pickle
+from datetime import datetime
+
+from movie.adapters.review_stats import ReviewStats
+
+
+def test_review_stats_total_ratings_and_keep_the_latest_timestamp():
+    review_stats = ReviewStats()
+    assert (review_stats.count, review_stats.average, review_stats.latest) == (0, None, None)
+
+    review_stats.add(7, datetime(2020, 2, 28))
+    review_stats.add(None, datetime(2020, 3, 1))
+    review_stats.add(10, datetime(2020, 1, 1))
+
+    assert (review_stats.count, review_stats.rating_count, review_stats.rating_sum) == (3, 2, 17)
+    assert review_stats.average == 8.5
+    assert review_stats.histogram == [0, 0, 0, 0, 0, 0, 1, 0, 0, 1]
+    assert review_stats.latest == datetime(2020, 3, 1)
+
+
+def test_review_stats_copies_are_independent():
+    review_stats = ReviewStats()
+    review_stats.add(3, None)
+
+    copied = copy.copy(review_stats)
+    copied.add(3, None)
+    assert review_stats.histogram[2] == 1 and copied.histogram[2] == 2
+
+    assert pickle.loads(pickle.dumps(copied)) == copied
+    assert copied != review_stats
@@ -0,0 +1,139 @@
+import threading
+
+from movie.utilities.sampler import MovieSampler, SimilarMovieCache
+from movie.utilities import services
+
+
+def make_sampler(pool_size=5):
+    samples = list()
+
+    def sample(quantity):
+        samples.append(quantity)
+        return [{'id': movie_id, 'title': f'Movie {movie_id}'} for movie_id in range(1, quantity + 1)]
+
+    return MovieSampler(sample, pool_size), samples
+
+
+def test_sampler_serves_distinct_summaries_round_the_ring():
+    sampler, samples = make_sampler()
+    sampler.refill()
+
+    first, second = sampler.take(3), sampler.take(3)
+    assert len({summary['id'] for summary in first}) == 3
+    assert len({summary['id'] for summary in second}) == 3
+    assert len({summary['id'] for summary in first + second}) == 5
+    assert len(sampler.take(10)) == 5
+    assert samples[0] == 5
+
+
+def test_sampler_hands_out_copies():
+    sampler, samples = make_sampler()
+    sampler.refill()
+
+    summary = sampler.take(1)[0]
+    summary['hyperlink'] = '/movies_by_year'
+    assert all('hyperlink' not in summary for summary in sampler.take(5))
+
+
+def test_sampler_refills_in_the_background_once_every_summary_is_served():
+    sampler, samples = make_sampler()
+    sampler.refill()
+
+    sampler.take(4)
+    assert sampler.stats()['refills'] == 1
+    sampler.take(1)
+    sampler.join()
+    assert len(samples) == 2
+    assert sampler.stats() == {
+        'pool_size': 5, 'hits': 2, 'misses': 0, 'served': 5, 'refills': 2, 'refill_errors': 0,
+        'last_refill_ms': sampler.stats()['last_refill_ms']
+    }
+
+
+def test_sampler_misses_until_first_filled():
+    sampler, samples = make_sampler()
+
+    assert sampler.take(3) == list()
+    sampler.join()
+    assert len(sampler.take(3)) == 3
+    assert (sampler.stats()['misses'], sampler.stats()['hits']) == (1, 1)
+
+
+def test_sampler_keeps_serving_the_old_ring_when_a_refill_fails():
+    filled = threading.Event()
+
+    def sample(quantity):
+        if filled.is_set():
+            raise IOError('Repository unavailable')
+        filled.set()
+        return [{'id': 1}, {'id': 2}]
+
+    sampler = MovieSampler(sample, 2)
+    sampler.refill()
+    sampler.take(2)
+    sampler.join()
+
+    assert sampler.stats()['refill_errors'] == 1
+    assert len(sampler.take(2)) == 2
+
+
+def make_similar_movie_cache(capacity=4096):
+    lookups = list()
+
+    def similar(movie_id, quantity):
+        lookups.append(movie_id)
+        return [{'id': 10 * movie_id + rank} for rank in range(1, quantity + 1)]
+
+    return SimilarMovieCache(similar, 3, capacity), lookups
+
+
+def test_similar_movie_cache_looks_movies_up_in_the_background_once():
+    cache, lookups = make_similar_movie_cache()
+
+    assert cache.get([1, 2], 4) == list()
+    cache.join()
+    assert sorted(lookups) == [1, 2]
+
+    assert [summary['id'] for summary in cache.get([1, 2], 4)] == [11, 21, 12, 22]
+    assert [summary['id'] for summary in cache.get([1, 11], 2)] == [12, 13]
+    cache.join()
+    assert [summary['id'] for summary in cache.get([1, 11], 2)] == [111, 12]
+    assert sorted(lookups) == [1, 2, 11]
+    assert cache.stats() == {'cached': 3, 'pending': 0, 'hits': 5, 'misses': 3, 'lookups': 3, 'lookup_errors': 0}
+
+
+def test_similar_movie_cache_keeps_the_most_recently_used_movies():
+    cache, lookups = make_similar_movie_cache(capacity=2)
+    for movie_id in (1, 2, 1, 3):
+        cache.get([movie_id], 1)
+        cache.join()
+
+    assert cache.get([1], 1) == [{'id': 11}]
+    assert cache.get([2], 1) == list()
+    assert cache.stats()['cached'] == 2
+
+
+def test_similar_movie_cache_queues_a_movie_again_after_a_failed_lookup():
+    failures = [IOError('Repository unavailable')]
+
+    def similar(movie_id, quantity):
+        if failures:
+            raise failures.pop()
+        return [{'id': 2}]
+
+    cache = SimilarMovieCache(similar)
+    cache.get([1], 1)
+    cache.join()
+    assert cache.stats()['lookup_errors'] == 1
+
+    assert cache.get([1], 1) == list()
+    cache.join()
+    assert cache.get([1], 1) == [{'id': 2}]
+
+
+def test_random_movies_can_include_the_last_movie(in_memory_repo):
+    movie_count = in_memory_repo.get_number_of_movies()
+    movies = services.get_random_movies(movie_count + 10, in_memory_repo)
+
+    assert len(movies) == movie_count
+    assert movie_count in [movie['id'] for movie in movies]
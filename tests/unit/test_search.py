@@ -0,0 +1,77 @@
+import copy
+
+from movie.adapters.search import SearchIndex, tokenize
+from movie.domain.model import Movie
+
+
+def make_movie(id, title, description):
+    movie = Movie(title, 2016, id)
+    movie.description = description
+    return movie
+
+
+def make_index():
+    index = SearchIndex()
+    index.add(make_movie(1, 'Moana', 'A girl sails the ocean with a demigod.'))
+    index.add(make_movie(2, 'Ocean\'s Eleven', 'A crew robs three casinos.'))
+    index.add(make_movie(3, 'Frozen', 'A princess sets out to find her sister.'))
+    return index
+
+
+def test_tokenize_lowercases_and_drops_stop_words():
+    assert tokenize('The Girl with the Dragon Tattoo') == ['girl', 'dragon', 'tattoo']
+    assert tokenize(None) == []
+
+
+def test_search_ranks_title_matches_first():
+    ids, total = make_index().search('ocean')
+
+    assert ids == [2, 1]
+    assert total == 2
+
+
+def test_search_pages_through_matches():
+    index = make_index()
+    ranking, total = index.search('ocean princess', offset=0, limit=3)
+
+    assert total == 3
+    assert index.search('ocean princess', offset=0, limit=2) == (ranking[:2], 3)
+    assert index.search('ocean princess', offset=2, limit=2) == (ranking[2:], 3)
+
+
+def test_search_breaks_ties_at_the_end_of_a_page_by_id():
+    index = SearchIndex()
+    for id in (7, 3, 9, 1, 5):
+        index.add(make_movie(id, 'Heist', 'A crew robs a bank.'))
+
+    assert index.search('heist', limit=2) == ([1, 3], 5)
+    assert index.search('heist', offset=2, limit=2) == ([5, 7], 5)
+
+
+def test_search_returns_nothing_for_unknown_or_empty_queries():
+    index = make_index()
+
+    assert index.search('zombie') == ([], 0)
+    assert index.search('the') == ([], 0)
+
+
+def test_search_index_can_remove_and_reindex_a_movie():
+    index = make_index()
+
+    index.remove(2)
+    assert index.search('ocean') == ([1], 1)
+
+    index.add(make_movie(1, 'Moana', 'A girl and her rooster.'))
+    assert index.search('ocean') == ([], 0)
+    assert len(index) == 2
+
+
+def test_search_index_copy_changes_independently():
+    index = make_index()
+    copy_of_index = copy.copy(index)
+
+    copy_of_index.add(make_movie(4, 'Moana 2', 'The ocean calls again.'))
+    copy_of_index.remove(1)
+
+    assert index.search('moana') == ([1], 1)
+    assert copy_of_index.search('moana') == ([4], 1)
@@ -0,0 +1,79 @@
+import random
+
+from movie.adapters.similarity import SimilarityIndex
+from movie.domain.model import Movie, Genre, Actor
+
+
+def random_features(rng: random.Random, count: int):
+    # Movies in families that share most of their features, so each Movie has a few clearly similar ones.
+    features_by_movie = dict()
+    for movie_id in range(1, count + 1):
+        family = rng.randrange(count // 5)
+        features = {f'family {family} feature {number}' for number in range(8)}
+        features = set(rng.sample(sorted(features), 6)) | {f'genre {rng.randrange(10)}'}
+        features_by_movie[movie_id] = features
+    movie_ids_by_feature = dict()
+    for movie_id, features in features_by_movie.items():
+        for feature in sorted(features):
+            movie_ids_by_feature.setdefault(feature, list()).append(movie_id)
+    return features_by_movie, movie_ids_by_feature
+
+
+def jaccard(first: set, second: set) -> float:
+    return len(first & second) / len(first | second)
+
+
+def test_index_finds_movies_sharing_features():
+    index = SimilarityIndex([1, 2, 3, 4, 5], [[1, 2, 3], [1, 2], [1, 2, 4], [3, 4]])
+
+    assert len(index) == 5
+    assert index.similar_movie_ids(1, 1) == [2]
+    assert index.similar(2, 1) == [(1, 1.0)]
+    assert 5 not in index.similar_movie_ids(1)
+    assert index.similar_movie_ids(5) == []
+    assert index.similar_movie_ids(99) == []
+
+
+def test_index_ignores_features_of_unknown_movies():
+    index = SimilarityIndex([1, 2], [[1, 2, 3], [2, 3]])
+
+    assert index.similar_movie_ids(1) == [2]
+    assert index.similar_movie_ids(3) == []
+
+
+def test_index_estimates_jaccard_similarity_of_random_movies():
+    rng = random.Random(3)
+    features_by_movie, movie_ids_by_feature = random_features(rng, 2000)
+    index = SimilarityIndex(features_by_movie, movie_ids_by_feature.values(), limit=5)
+
+    errors = list()
+    for movie_id in rng.sample(sorted(features_by_movie), 200):
+        similar = index.similar(movie_id)
+        assert len(similar) > 0
+        assert [similarity for similar_id, similarity in similar] == sorted(
+            (similarity for similar_id, similarity in similar), reverse=True)
+        for similar_id, similarity in similar:
+            assert similar_id != movie_id
+            errors.append(abs(similarity - jaccard(features_by_movie[movie_id], features_by_movie[similar_id])))
+
+        # The most similar Movie found is about as similar as the most similar Movie there is.
+        best = max(jaccard(features_by_movie[movie_id], features) for other_id, features in features_by_movie.items()
+                   if other_id != movie_id)
+        assert jaccard(features_by_movie[movie_id], features_by_movie[similar[0][0]]) >= best - 0.3
+    assert sum(errors) / len(errors) < 0.1
+
+
+def test_repository_similar_movies_follow_added_movies(in_memory_repo):
+    similar_ids = in_memory_repo.get_similar_movie_ids(1, 3)
+    assert len(similar_ids) == 3
+    assert 1 not in similar_ids
+
+    movie = Movie('Guardians of the Galaxy Again', 2017)
+    for genre in ('Action', 'Adventure', 'Sci-Fi'):
+        movie.add_genre(Genre(genre))
+    for actor in ('Chris Pratt', 'Vin Diesel', 'Bradley Cooper', 'Zoe Saldana'):
+        movie.add_actor(Actor(actor))
+    in_memory_repo.add_movie(movie)
+
+    assert in_memory_repo.get_similar_movie_ids(movie.id, 1) == [1]
+    assert in_memory_repo.get_similar_movie_ids(1, 1) == [movie.id]
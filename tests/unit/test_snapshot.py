@@ -0,0 +1,82 @@
+import os
+import shutil
+
+import pytest
+
+from movie.adapters import memory_repository
+from movie.adapters.memory_repository import MemoryRepository
+from movie.adapters.snapshot import SnapshotException, data_checksum, read_snapshot, write_snapshot, DATA_FILES
+from movie.domain.model import Movie
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'memory')
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / 'data'
+    path.mkdir()
+    for file_name in DATA_FILES:
+        shutil.copy(os.path.join(DATA_PATH, file_name), path / file_name)
+    return str(path)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / 'repository.snapshot')
+
+
+def fail_to_load(data_path, repo):
+    raise AssertionError('Populated from CSV instead of the snapshot')
+
+
+def test_populate_writes_and_reuses_a_snapshot(data_path, snapshot_path, monkeypatch):
+    built = MemoryRepository()
+    memory_repository.populate(data_path, built, snapshot_path)
+    assert os.path.exists(snapshot_path)
+
+    monkeypatch.setattr(memory_repository, 'load_movies_and_ids', fail_to_load)
+    loaded = MemoryRepository()
+    memory_repository.populate(data_path, loaded, snapshot_path)
+
+    assert loaded.get_number_of_movies() == built.get_number_of_movies()
+    assert loaded.get_movie(2) == built.get_movie(2)
+    assert loaded.get_user('thorke').password == built.get_user('thorke').password
+    assert len(loaded.get_reviews()) == len(built.get_reviews())
+    assert loaded.get_movie_ids_by_actor('Chris Pratt') == built.get_movie_ids_by_actor('Chris Pratt')
+    assert loaded.search_movie_ids('guardians galaxy', 0, 3) == built.search_movie_ids('guardians galaxy', 0, 3)
+
+    # The loaded repository still takes new Movies.
+    loaded.add_movie(Movie('Rabbitville', 2016))
+    assert loaded.get_number_of_movies() == built.get_number_of_movies() + 1
+
+
+def test_populate_rebuilds_a_snapshot_of_changed_data(data_path, snapshot_path):
+    memory_repository.populate(data_path, MemoryRepository(), snapshot_path)
+
+    with open(os.path.join(data_path, 'moviefile.csv'), 'a', encoding='utf-8-sig') as outfile:
+        outfile.write('1001,Rabbitville,Animation,A bunny cop.,Byron Howard,Ginnifer Goodwin,2016,108,8.0,1,N/A,78\n')
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo, snapshot_path)
+
+    assert repo.get_movie(1001).title == 'Rabbitville'
+    assert read_snapshot(snapshot_path, data_checksum(data_path))['movies'][-1].title == 'Rabbitville'
+
+
+def test_populate_ignores_a_corrupt_snapshot(data_path, snapshot_path):
+    with open(snapshot_path, 'wb') as outfile:
+        outfile.write(b'not a snapshot')
+
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo, snapshot_path)
+
+    assert repo.get_number_of_movies() == 1000
+    assert read_snapshot(snapshot_path, data_checksum(data_path))['movies'][0] == repo.get_movie(1)
+
+
+def test_read_snapshot_rejects_a_stale_checksum(data_path, snapshot_path):
+    write_snapshot(snapshot_path, data_checksum(data_path), {'_movies': []})
+
+    with pytest.raises(SnapshotException):
+        read_snapshot(snapshot_path, bytes(32))
+    with pytest.raises(SnapshotException):
+        read_snapshot(snapshot_path + '.missing', data_checksum(data_path))
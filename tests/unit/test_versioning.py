@@ -0,0 +1,203 @@
+import copy
+import gc
+import pickle
+import threading
+import tracemalloc
+
+import pytest
+
+from movie.adapters.repository import RepositoryException
+from movie.adapters.versioning import CatalogVersion, SharedDict, SharedList
+from movie.domain.model import Movie, User, Actor, Genre, Review, add_review
+
+
+def test_repository_under_concurrent_reads_and_writes(in_memory_repo):
+    movies_before = in_memory_repo.get_number_of_movies()
+    reviews_before = len(in_memory_repo.get_reviews())
+    writers, readers, additions = 4, 8, 50
+    errors = list()
+    start = threading.Barrier(writers + readers)
+
+    def write(writer):
+        try:
+            start.wait()
+            for number in range(additions):
+                movie = Movie(f'Stress {writer}-{number}', 2020)
+                movie.add_genre(Genre('Sci-Fi'))
+                in_memory_repo.add_movie(movie)
+                in_memory_repo.add_movie_index(movie)
+                user = User(f'stress{writer}x{number}', 'abcdefgh1')
+                in_memory_repo.add_user(user)
+                in_memory_repo.add_review(add_review('Stressful', user, in_memory_repo.get_movie(1 + number), 3))
+        except Exception as error:
+            errors.append(error)
+
+    def read(reader):
+        try:
+            start.wait()
+            for number in range(additions * 4):
+                movie_ids = in_memory_repo.get_movie_ids_by_genre('Sci-Fi')
+                in_memory_repo.get_movies_by_id(movie_ids[-3:])
+                in_memory_repo.search_movie_ids('stress', 0, 10)
+                in_memory_repo.get_actor_names_by_prefix('chr', 5)
+                in_memory_repo.get_movie(1 + (reader * number) % movies_before)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(writers)]
+    threads += [threading.Thread(target=read, args=(reader,)) for reader in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    added = writers * additions
+    assert in_memory_repo.get_number_of_movies() == movies_before + added
+    added_ids = sorted(movie.id for movie in in_memory_repo.get_movies_by_id(range(1, movies_before + added + 1))
+                       if movie.title.startswith('Stress '))
+    assert added_ids == list(range(movies_before + 1, movies_before + added + 1))
+    assert in_memory_repo.search_movie_ids('stress', 0, 1)[1] == added
+    assert len(in_memory_repo.get_reviews()) == reviews_before + added
+    assert all(in_memory_repo.get_user(f'stress{writer}x{number}') is not None
+               for writer in range(writers) for number in range(additions))
+
+
+def test_catalog_version_copies_structures_on_first_change():
+    published = CatalogVersion(users=['dbowie'], movie_ids_by_genre={'Action': [1, 2]})
+    draft = published.derive()
+
+    draft.mutable('users').append('fmercury')
+    draft.mutable_entry('movie_ids_by_genre', 'Action').append(3)
+    draft.mutable_entry('movie_ids_by_genre', 'Comedy').append(4)
+
+    assert draft.number == published.number + 1
+    assert published.users == ['dbowie']
+    assert published.movie_ids_by_genre == {'Action': [1, 2]}
+    assert draft.users == ['dbowie', 'fmercury']
+    assert draft.movie_ids_by_genre == {'Action': [1, 2, 3], 'Comedy': [4]}
+
+
+def test_shared_list_copies_change_independently():
+    published = SharedList([1, 2, 3])
+    draft = copy.copy(published)
+    other_draft = copy.copy(published)
+
+    draft.append(4)
+    other_draft.append(5)
+    other_draft.insert(0, 0)
+
+    assert published == [1, 2, 3]
+    assert draft == [1, 2, 3, 4]
+    assert other_draft == [0, 1, 2, 3, 5]
+    assert published[-1] == 3
+    assert draft[1:] == [2, 3, 4]
+    with pytest.raises(IndexError):
+        published[3]
+    assert pickle.loads(pickle.dumps(draft)) == [1, 2, 3, 4]
+
+
+def test_shared_dict_copies_change_independently():
+    published = SharedDict((number, str(number)) for number in range(1000))
+    draft = copy.copy(published)
+
+    draft[1000] = '1000'
+    del draft[1]
+    draft[1] = 'one'
+    draft[2] = 'two'
+
+    assert len(published) == 1000
+    assert published[1] == '1' and published[2] == '2' and 1000 not in published
+    assert list(published) == list(range(1000))
+    assert len(draft) == 1001
+    assert draft[1] == 'one' and draft[2] == 'two' and draft.get(1000) == '1000'
+    # A key removed and added again comes last, as in a dict.
+    assert list(draft) == [0] + list(range(2, 1001)) + [1]
+    assert pickle.loads(pickle.dumps(draft)) == draft
+
+
+def test_writes_outside_a_batch_allocate_only_what_they_change(in_memory_repo):
+    with in_memory_repo.batch():
+        for number in range(10000):
+            in_memory_repo.add_user(User(f'bulk{number}', 'abcdefgh1'))
+            in_memory_repo.add_actor(Actor(f'Bulk Actor {number}'))
+            movie = Movie(f'Bulk {number}', 2000 + number % 20)
+            movie.add_genre(Genre('Drama'))
+            in_memory_repo.add_movie(movie)
+
+    def allocated(write) -> int:
+        tracemalloc.start()
+        try:
+            write()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # Copying the list of Users alone would take 80 KiB, and each of the dicts indexing them several times that.
+    user = User('dbowie', '1234567890')
+    assert allocated(lambda: in_memory_repo.add_user(user)) < 32 * 1024
+    assert allocated(lambda: in_memory_repo.add_review(add_review('Timed', user, in_memory_repo.get_movie(1), 3))) \
+        < 32 * 1024
+    assert allocated(lambda: in_memory_repo.add_actor(Actor('David Bowie'))) < 128 * 1024
+    assert allocated(lambda: in_memory_repo.add_movie(Movie('Labyrinth', 1986))) < 256 * 1024
+
+
+def test_pinned_reads_see_one_version_and_their_own_writes(in_memory_repo):
+    movie_count = in_memory_repo.get_number_of_movies()
+    in_memory_repo.pin()
+    try:
+        other_thread = threading.Thread(target=in_memory_repo.add_movie, args=(Movie('Rabbitville', 2016),))
+        other_thread.start()
+        other_thread.join()
+        assert in_memory_repo.get_number_of_movies() == movie_count
+
+        in_memory_repo.add_user(User('dbowie', '1234567890'))
+        assert in_memory_repo.get_number_of_movies() == movie_count + 1
+        assert in_memory_repo.get_user('dbowie') is not None
+    finally:
+        in_memory_repo.unpin()
+
+
+def test_batched_additions_are_published_together(in_memory_repo):
+    movie_count = in_memory_repo.get_number_of_movies()
+    counts_seen_elsewhere = list()
+
+    def count():
+        counts_seen_elsewhere.append(in_memory_repo.get_number_of_movies())
+
+    with in_memory_repo.batch():
+        in_memory_repo.add_movie(Movie('Rabbitville', 2016))
+        in_memory_repo.add_movie(Movie('Foxville', 2016))
+        assert in_memory_repo.get_number_of_movies() == movie_count + 2
+        other_thread = threading.Thread(target=count)
+        other_thread.start()
+        other_thread.join()
+
+    assert counts_seen_elsewhere == [movie_count]
+    assert in_memory_repo.get_number_of_movies() == movie_count + 2
+
+
+def test_failed_write_publishes_nothing(in_memory_repo):
+    version = in_memory_repo.version
+    review = Review(in_memory_repo.get_movie(1), 'Not attached', 3, User('dbowie', '1234567890'))
+
+    with pytest.raises(RepositoryException):
+        in_memory_repo.add_review(review)
+    assert in_memory_repo.version == version
+    assert review not in in_memory_repo.get_reviews()
+
+
+def test_unreferenced_versions_are_reclaimed(in_memory_repo):
+    gc.collect()
+    live_versions = in_memory_repo.live_versions
+
+    in_memory_repo.pin()
+    reviews = in_memory_repo.get_reviews()
+    for number in range(5):
+        in_memory_repo.add_user(User(f'user{number}', '1234567890'))
+    in_memory_repo.unpin()
+    gc.collect()
+
+    # Only the published version is left; the old list of reviews outlives its version.
+    assert in_memory_repo.live_versions <= live_versions
+    assert reviews is in_memory_repo.get_reviews()